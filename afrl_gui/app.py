@@ -16,18 +16,23 @@
 
 import sys
 
-from PySide6.QtWidgets import QApplication
-
-from afrl_gui.mainwindow import MainWindow
+from afrl_gui.startuptrace import startupTrace
 
 def run():
     """main app entry point"""
+    trace = startupTrace.fromEnvironment()
+    from PySide6.QtWidgets import QApplication
     app = QApplication(sys.argv)
+    trace.mark("QApplication")
 
     # Any 'Global' views?
 
     # Main Window
+    from afrl_gui.mainwindow import MainWindow
+    trace.mark("import mainwindow")
     window = MainWindow(app)
+    trace.mark("MainWindow")
+    trace.watch(window, app)
     window.show()
     return app.exec_()
 
@@ -15,12 +15,37 @@
 # ivv-itc@lists.nasa.gov
 
 import os.path
+import tempfile
 from string import Template
 
 PACKAGE_ROOT = os.path.dirname(os.path.abspath(__file__))
 RESOURCE_ROOT = os.path.join(PACKAGE_ROOT, "resources")
 PLUGIN_ROOT = os.path.join(PACKAGE_ROOT, "plugins")
-MAXIMUM_QEMU_INSTANCES = 8
+QEMU_BINARY = "./qemu-system-aarch64"  # Binary queried for machine, cpu and device capabilities
+QEMU_IMG_BINARY = "qemu-img"  # Creates the disk overlays of instances
+SYSFS_SYSTEM_ROOT = "/sys/devices/system"  # Host CPU and NUMA topology
+SYSFS_HUGEPAGES_ROOT = "/sys/kernel/mm/hugepages"  # Host hugepage pools
+PROC_MEMINFO = "/proc/meminfo"
+MEMORY_HEADROOM = 512 * 1024 * 1024  # Bytes of available host memory never promised to guest RAM
+TCG_TB_SIZE = 256  # MB of TCG translation cache per instance unless an instance sets its own
+CAPABILITY_CACHE_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "afrl_gui")
+SNAPSHOT_ROOT = os.path.join(CAPABILITY_CACHE_ROOT, "snapshots")  # Saved VM state restored instead of booting
+# qcow2 overlays holding the disk changes of instances, on disk rather than in the runtime directory
+OVERLAY_ROOT = os.path.join(os.path.expanduser("~"), ".local", "share", "afrl_gui", "overlays")
+SCHEMA_CACHE_SIZE = 256  # Number of device/machine property schemas kept in memory
+# Per instance runtime files (logs, sockets), kept off persistent storage when a runtime directory exists
+INSTANCE_RUNTIME_ROOT = os.path.join(os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir()), "afrl_gui")
+CONFIG_ROOT = os.path.join(INSTANCE_RUNTIME_ROOT, "configs")  # -readconfig files, named by their content hash
+CONSOLE_SCROLLBACK = 1024 * 1024  # Bytes of serial console output kept per instance, older output is overwritten
+BOOT_MARKER = "login:"  # Regular expression on the serial console that ends a boot, the cold boot a saved state is compared to
+CONSOLE_UPDATE_INTERVAL = 50  # Milliseconds between console view refreshes, output arriving in between is drawn at once
+TABLE_UPDATE_INTERVAL = 100  # Milliseconds between instance table refreshes, bounds view updates to 10 Hz
+TELEMETRY_INTERVAL = 1000  # Milliseconds between host resource samples of the running instances
+TELEMETRY_HISTORY = 120  # Samples of history kept per instance for the table sparklines
+BATCH_PARALLELISM = 4  # Fleet instances starting at once, later ones wait for a starting instance to come up
+BATCH_RAMP_UP = 2.0  # Fleet instances launched per second at most, 0 launches without a delay
+FLEET_MANIFEST_FILTERS = ["Fleet manifests (*.json *.yaml *.yml)",
+                          "All files (*)"]
 QEMU_IMAGE_FILTERS = ["Disc Image files (*.img *.ext4)",
                       "All files (*)"]
 
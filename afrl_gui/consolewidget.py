@@ -0,0 +1,111 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# View of the serial console of a QEMU instance
+# Output is not drawn as it arrives: the first notification after a refresh starts a CONSOLE_UPDATE_INTERVAL timer
+# and the refresh draws everything that arrived in between with one insert, so a guest printing several MB/s costs
+# at most one layout per interval. A view further behind than CONSOLE_RENDER_LIMIT skips to the newest output and
+# hidden views draw nothing until they are shown. Escape sequences are dropped rather than interpreted
+# Keys typed into the view are sent to the guest, which echoes them
+
+import codecs, re
+from PySide6.QtWidgets import QPlainTextEdit
+from PySide6.QtGui import QFontDatabase, QTextCursor
+from PySide6.QtCore import Qt, QTimer
+from afrl_gui.common import CONSOLE_UPDATE_INTERVAL
+
+CONSOLE_LINES = 10000  # Lines kept in the view, older ones are dropped from the top
+CONSOLE_RENDER_LIMIT = 256 * 1024  # Bytes drawn by one refresh at most
+ESCAPE_SEQUENCE = re.compile(rb"\x1b(\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(\x07|\x1b\\)|[ -/]*[0-Z\x5c^-~])")
+ESCAPE_LENGTH = 64  # Longest escape sequence kept back when a refresh ends inside one
+CONTROL_CHARACTERS = re.compile("[\x00-\x07\x0b-\x1f\x7f]")  # Everything but backspace, tab and newline
+KEY_SEQUENCES = {Qt.Key_Return: b"\r", Qt.Key_Enter: b"\r", Qt.Key_Backspace: b"\x7f", Qt.Key_Tab: b"\t",
+                 Qt.Key_Escape: b"\x1b", Qt.Key_Up: b"\x1b[A", Qt.Key_Down: b"\x1b[B", Qt.Key_Right: b"\x1b[C",
+                 Qt.Key_Left: b"\x1b[D", Qt.Key_Home: b"\x1b[H", Qt.Key_End: b"\x1b[F", Qt.Key_Delete: b"\x1b[3~"}
+
+
+class consoleWidget(QPlainTextEdit):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)  # Otherwise every insert is kept for undo
+        self.setMaximumBlockCount(CONSOLE_LINES)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.__console = None
+        self.__position = 0  # Buffer position following the last byte drawn
+        self.__decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.__refreshTimer = QTimer(self)
+        self.__refreshTimer.setSingleShot(True)
+        self.__refreshTimer.setInterval(CONSOLE_UPDATE_INTERVAL)
+        self.__refreshTimer.timeout.connect(self.refresh)
+
+    def console(self):
+        return self.__console
+
+    def setConsole(self, console):
+        ''' Shows the output of a serialConsole, replacing what was shown '''
+        if self.__console is not None:
+            self.__console.received.disconnect(self.__received)
+        self.__console = console
+        self.__position = 0
+        self.__decoder.reset()
+        self.clear()
+        if console is not None:
+            console.received.connect(self.__received)
+            self.__received()
+
+    def refresh(self):
+        ''' Draws the output received since the last refresh '''
+        self.__refreshTimer.stop()
+        if self.__console is None:
+            return
+        buffer = self.__console.buffer
+        if self.__position < buffer.start() or buffer.written - self.__position > CONSOLE_RENDER_LIMIT:
+            # Output was overwritten or is more than is drawn at once, skip to the newest
+            self.clear()
+            self.__decoder.reset()
+            self.__position = max(buffer.start(), buffer.written - CONSOLE_RENDER_LIMIT)
+        data = buffer.read(self.__position)
+        escape = data.rfind(b"\x1b", max(0, len(data) - ESCAPE_LENGTH))
+        if escape >= 0 and not ESCAPE_SEQUENCE.match(data, escape):
+            data = data[:escape]  # Drawn with the rest of the sequence by a later refresh
+        self.__position += len(data)
+        text = self.__decoder.decode(ESCAPE_SEQUENCE.sub(b"", data))
+        text = CONTROL_CHARACTERS.sub("", text.replace("\r\n", "\n"))
+        if text:
+            self.__insert(text)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def keyPressEvent(self, event):
+        data = KEY_SEQUENCES.get(event.key())
+        if data is None and event.text():
+            data = event.text().encode("utf-8")  # Control characters included, Ctrl+C reaches the guest
+        if data is not None and self.__console is not None and self.__console.isConnected():
+            self.__console.write(data)
+        else:
+            super().keyPressEvent(event)  # Scrolling and copying
+
+    def focusNextPrevChild(self, next):
+        return False  # Tab goes to the guest
+
+    def __received(self):
+        if not self.__refreshTimer.isActive() and self.isVisible():
+            self.__refreshTimer.start()
+
+    def __insert(self, text):
+        scrollBar = self.verticalScrollBar()
+        following = scrollBar.value() == scrollBar.maximum()  # Reading older output is not interrupted
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        # Guests erase a character by echoing backspace, space, backspace
+        for (i, part) in enumerate(text.split("\b")):
+            if i and not cursor.atBlockStart():
+                cursor.deletePreviousChar()
+            cursor.insertText(part)
+        cursor.endEditBlock()
+        if following:
+            scrollBar.setValue(scrollBar.maximum())
@@ -0,0 +1,48 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class deviceCatalogViewModel(QAbstractListModel):
+    ''' Flat list model over every device of every device type in a qemuDeviceList '''
+    DeviceTypeRole = Qt.UserRole + 1  # index of the device type the row belongs to
+
+    def __init__(self, deviceList, parent=None):
+        super().__init__(parent)
+        self.deviceList = deviceList
+        self.__rows = []  # (typeIdx, itemIdx) per row
+        self.__offsets = []  # first row of each device type
+        for typeIdx, paramList in enumerate(deviceList.deviceLists()):
+            self.__offsets.append(len(self.__rows))
+            self.__rows.extend((typeIdx, itemIdx) for itemIdx in range(0, len(paramList)))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.__rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        (typeIdx, itemIdx) = self.__rows[index.row()]
+        if role == Qt.DisplayRole:
+            return self.deviceList.deviceLists()[typeIdx].argumentList()[itemIdx]
+        elif role == Qt.ToolTipRole:
+            # Only built when the view asks for it
+            device = self.deviceList.deviceLists()[typeIdx][itemIdx]
+            return f"{self.deviceList.deviceTypeList()[typeIdx]}\n{device.toolTipText()}".strip()
+        elif role == self.DeviceTypeRole:
+            return typeIdx
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def deviceType(self, row):
+        ''' Returns the device type index of row without going through data() '''
+        return self.__rows[row][0]
+
+    def rowOf(self, typeIdx, itemIdx):
+        ''' Returns the model row of a device in the qemuDeviceList '''
+        return self.__offsets[typeIdx] + itemIdx
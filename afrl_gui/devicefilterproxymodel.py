@@ -0,0 +1,36 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import QSortFilterProxyModel
+
+
+class deviceFilterProxyModel(QSortFilterProxyModel):
+    ''' Filters a deviceCatalogViewModel down to one device type, or to ranked search results '''
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.__deviceType = 0
+        self.__searchRanks = None  # source row -> rank while a search is active
+
+    def setDeviceType(self, typeIdx):
+        ''' Shows only the devices of typeIdx, in catalog order, ending any search '''
+        self.__deviceType = typeIdx
+        self.__searchRanks = None
+        self.invalidate()
+        self.sort(-1)  # Restore source order
+
+    def setSearchResults(self, rows):
+        ''' Shows only the source rows given, across every device type, in the order given '''
+        self.__searchRanks = {row: rank for rank, row in enumerate(rows)}
+        self.invalidate()
+        self.sort(0)
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        if self.__searchRanks is not None:
+            return sourceRow in self.__searchRanks
+        return self.sourceModel().deviceType(sourceRow) == self.__deviceType
+
+    def lessThan(self, left, right):
+        if self.__searchRanks is None:
+            return left.row() < right.row()
+        return self.__searchRanks[left.row()] < self.__searchRanks[right.row()]
@@ -2,7 +2,6 @@
 
 from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, Slot
 from afrl_gui.qemuinstance import qemuInstance
-from afrl_gui.common import MAXIMUM_QEMU_INSTANCES
 
 
 class deviceListViewModel(QAbstractListModel):
@@ -0,0 +1,134 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Host memory capacity and admission control for QEMU guest RAM
+# Before launch the guest RAM of an instance, together with the RAM running instances have not touched yet,
+# is checked against MemAvailable (less MEMORY_HEADROOM) or against the free pages of a hugetlbfs pool,
+# so launches that would push the host into swap or fail a hugepage mapping are refused up front
+
+import glob, os
+from afrl_gui.common import PROC_MEMINFO, SYSFS_HUGEPAGES_ROOT, MEMORY_HEADROOM
+
+# Guest RAM backends, in the order of the launch wizard dropdown
+MEMORY_BACKEND_DEFAULT = ""  # Anonymous memory allocated by QEMU
+MEMORY_BACKEND_MEMFD = "memfd"  # memory-backend-memfd, shareable anonymous file
+MEMORY_BACKEND_HUGETLBFS = "hugetlbfs"  # memory-backend-file on a hugetlbfs mount
+MEMORY_BACKENDS = (MEMORY_BACKEND_DEFAULT, MEMORY_BACKEND_MEMFD, MEMORY_BACKEND_HUGETLBFS)
+
+MB = 1024 * 1024
+
+
+def readMeminfo(path=PROC_MEMINFO):
+    ''' Returns /proc/meminfo as a dict of field -> bytes (counts such as HugePages_Free unscaled) '''
+    info = {}
+    try:
+        with open(path, 'r', encoding="utf-8") as fin:
+            for line in fin:
+                (name, _, value) = line.partition(":")
+                fields = value.split()
+                if fields:
+                    info[name] = int(fields[0]) * (1024 if len(fields) > 1 and fields[1] == "kB" else 1)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: unable to read {path}: {e}")
+    return info
+
+
+def hugepagePools(root=SYSFS_HUGEPAGES_ROOT):
+    ''' Returns {page size in bytes: free pages not reserved by a mapping} for every hugepage size '''
+    pools = {}
+    for directory in glob.glob(os.path.join(root, "hugepages-*kB")):
+        try:
+            pageSize = int(os.path.basename(directory)[len("hugepages-"):-len("kB")]) * 1024
+            counts = []
+            for name in ("free_hugepages", "resv_hugepages"):
+                with open(os.path.join(directory, name), 'r', encoding="utf-8") as fin:
+                    counts.append(int(fin.read()))
+        except (OSError, ValueError):
+            continue
+        pools[pageSize] = counts[0] - counts[1]
+    return pools
+
+
+def hugetlbfsMounts(mounts="/proc/mounts", defaultPageSize=None):
+    ''' Returns [(mount point, page size in bytes)] of the mounted hugetlbfs file systems '''
+    if defaultPageSize is None:
+        defaultPageSize = readMeminfo().get("Hugepagesize", 2 * MB)
+    result = []
+    try:
+        with open(mounts, 'r', encoding="utf-8") as fin:
+            for line in fin:
+                fields = line.split()
+                if len(fields) < 4 or fields[2] != "hugetlbfs":
+                    continue
+                pageSize = defaultPageSize
+                for option in fields[3].split(","):
+                    if option.startswith("pagesize="):
+                        pageSize = parseSize(option[len("pagesize="):])
+                result.append((fields[1].replace("\\040", " "), pageSize))
+    except OSError:
+        pass
+    return result
+
+
+def parseSize(text):
+    ''' Returns the bytes of a size such as 2M, 1G or 2048K '''
+    units = {"K": 1024, "M": MB, "G": 1024 * MB}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text)
+
+
+def formatMegabytes(size):
+    return f"{size / MB:.0f} MB"
+
+
+class qemuMemoryAdmission:
+    def __init__(self, meminfoPath=PROC_MEMINFO, hugepagesRoot=SYSFS_HUGEPAGES_ROOT, mounts="/proc/mounts",
+                 headroom=MEMORY_HEADROOM):
+        self.__meminfoPath = meminfoPath
+        self.__hugepagesRoot = hugepagesRoot
+        self.__mounts = mounts
+        self.headroom = headroom  # Bytes of MemAvailable never promised to guests
+
+    def admit(self, qemu, running):
+        ''' Returns "" if the guest RAM of qemu fits next to the running instances, otherwise why it does not
+            Picks the hugetlbfs mount of hugepage backed instances that have none set '''
+        request = int(qemu.memory) * MB
+        if qemu.memoryBackend == MEMORY_BACKEND_HUGETLBFS:
+            return self.__admitHugepages(qemu, request)
+        meminfo = readMeminfo(self.__meminfoPath)
+        if "MemAvailable" not in meminfo:
+            return ""  # Capacity unknown, nothing to check against
+        # Guests take their RAM as they touch it, what the running ones have not touched yet is still owed
+        outstanding = sum(max(int(q.memory) * MB - self.__resident(q), 0) for q in running
+                          if q is not qemu and q.memoryBackend != MEMORY_BACKEND_HUGETLBFS)
+        available = meminfo["MemAvailable"] - self.headroom - outstanding
+        if request > available:
+            return (f"{qemu.name} needs {formatMegabytes(request)} of RAM but only {formatMegabytes(max(available, 0))} "
+                    f"is available ({formatMegabytes(meminfo['MemAvailable'])} free on the host, "
+                    f"{formatMegabytes(outstanding)} still owed to running instances)")
+        return ""
+
+    def __admitHugepages(self, qemu, request):
+        pools = hugepagePools(self.__hugepagesRoot)
+        mounts = hugetlbfsMounts(self.__mounts, readMeminfo(self.__meminfoPath).get("Hugepagesize", 2 * MB))
+        if qemu.hugepagePath:
+            mounts = [m for m in mounts if m[0] == qemu.hugepagePath] or [(qemu.hugepagePath, max(pools, default=0))]
+        if not mounts:
+            return f"{qemu.name} uses hugepages but no hugetlbfs file system is mounted"
+        # Free pages already exclude the reservations of running QEMUs mapping the pool
+        for (path, pageSize) in mounts:
+            if pageSize and request % pageSize == 0 and pools.get(pageSize, 0) * pageSize >= request:
+                qemu.hugepagePath = path
+                return ""
+        (path, pageSize) = mounts[0]
+        free = pools.get(pageSize, 0) * pageSize
+        if pageSize and request % pageSize:
+            return f"{qemu.name} RAM {formatMegabytes(request)} is not a multiple of the {formatMegabytes(pageSize)} hugepages of {path}"
+        return f"{qemu.name} needs {formatMegabytes(request)} of hugepages but {path} has {formatMegabytes(free)} free"
+
+    def __resident(self, qemu):
+        telemetry = qemu.telemetry
+        rss = telemetry.latest("rss") if telemetry is not None else None
+        return int(rss) if rss is not None else 0
@@ -0,0 +1,76 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Host CPU topology read from sysfs: logical CPUs grouped into physical cores (SMT siblings) and NUMA nodes
+# Only the CPUs this process may run on are included, so the topology honours taskset and cgroup cpusets
+
+import glob, os, re
+from afrl_gui.common import SYSFS_SYSTEM_ROOT
+
+
+def parseCpuList(text):
+    ''' Returns the CPU numbers of a sysfs CPU list such as "0-3,8,10-11" '''
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        (first, dash, last) = part.partition("-")
+        cpus.extend(range(int(first), int(last) + 1) if dash else [int(first)])
+    return cpus
+
+
+def formatCpuList(cpus):
+    ''' Returns CPU numbers as a compact CPU list, the inverse of parseCpuList '''
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{a}-{b}" if a != b else str(a) for (a, b) in ranges)
+
+
+class hostTopology:
+    def __init__(self, sysfsRoot=SYSFS_SYSTEM_ROOT, allowedCpus=None):
+        if allowedCpus is None:
+            allowedCpus = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else range(os.cpu_count() or 1)
+        self.cpus = sorted(allowedCpus)
+        self.nodes = {}  # NUMA node -> list of cores, a core is a tuple of its SMT sibling CPUs
+        nodeOf = self.__readNodes(sysfsRoot)
+        seen = set()
+        for cpu in self.cpus:
+            if cpu in seen:
+                continue
+            siblings = self.__readSiblings(sysfsRoot, cpu)
+            core = tuple(sorted(c for c in siblings if c in allowedCpus)) or (cpu,)
+            seen.update(core)
+            self.nodes.setdefault(nodeOf.get(cpu, 0), []).append(core)
+
+    def __repr__(self):
+        nodes = "; ".join(f"node {n}: " + " ".join(formatCpuList(c) for c in cores) for (n, cores) in self.nodes.items())
+        return f"Host topology: {len(self.cpus)} CPUs, {self.coreCount()} cores ({nodes})"
+
+    def coreCount(self):
+        return sum(len(cores) for cores in self.nodes.values())
+
+    def __readNodes(self, sysfsRoot):
+        nodeOf = {}
+        for path in glob.glob(os.path.join(sysfsRoot, "node", "node[0-9]*", "cpulist")):
+            node = int(re.search(r"node(\d+)", os.path.basename(os.path.dirname(path))).group(1))
+            try:
+                with open(path, 'r', encoding="utf-8") as fin:
+                    for cpu in parseCpuList(fin.read()):
+                        nodeOf[cpu] = node
+            except (OSError, ValueError):
+                continue
+        return nodeOf
+
+    def __readSiblings(self, sysfsRoot, cpu):
+        topology = os.path.join(sysfsRoot, "cpu", f"cpu{cpu}", "topology")
+        for name in ("core_cpus_list", "thread_siblings_list"):
+            try:
+                with open(os.path.join(topology, name), 'r', encoding="utf-8") as fin:
+                    return parseCpuList(fin.read())
+            except (OSError, ValueError):
+                continue
+        return [cpu]  # No topology, every CPU is its own core
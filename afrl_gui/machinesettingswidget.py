@@ -6,11 +6,14 @@ from afrl_gui.settingswidget import settingsWidget
 
 
 class machineSettingsWidget(settingsWidget):
-    def __init__(self, deviceStr, parent=None):
-        super().__init__(parent)
-        self.paramStr = "-machine"
+    schemaCommand = "qom-list-properties"
+    schemaTypeSuffix = "-machine"  # QOM type of a machine is <name>-machine
+    paramStr = "-machine"
+    headerPattern = re.compile(r"NULL")
+    infoDelimiter = ' ('
+    notesStrip = ')'
+
+    def __init__(self, deviceStr, parent=None, cache=None, schemaCache=None):
+        super().__init__(parent, cache, schemaCache)
         self.deviceStr = deviceStr
-        self.headerPattern = re.compile(r"NULL")
-        self.infoDelimiter = ' ('
-        self.notesStrip = ')'
         self.populateFormFields()
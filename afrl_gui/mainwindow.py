@@ -19,25 +19,23 @@ import datetime
 import os.path
 
 from PySide6.QtWidgets import QMainWindow, QLabel, QMessageBox, \
-    QGraphicsView, QGraphicsScene, QWidget, QDockWidget, QTableView
+    QGraphicsView, QGraphicsScene, QWidget, QDockWidget, QTableView, QMenu, QFileDialog
 from PySide6.QtGui import QGuiApplication, QIcon, QPixmap, QRegularExpressionValidator, \
-    QIntValidator, QAction
+    QIntValidator, QAction, QImageReader
 from PySide6.QtCore import Signal, Qt, Slot, QRect
 
 from afrl_gui import __version__
-from afrl_gui.common import RESOURCE_ROOT, MAXIMUM_QEMU_INSTANCES
+from afrl_gui.common import RESOURCE_ROOT, FLEET_MANIFEST_FILTERS, CONFIG_ROOT
 from afrl_gui.ui.ui_mainwindow import Ui_MainWindow
-from afrl_gui.qemulaunchwizard import QemuLaunchWizard
-from afrl_gui.qemuinstance import qemuInstance
-from afrl_gui.terminalwidget import terminalWidget
-from afrl_gui.qemutableviewmodel import qemuTableViewModel
+from afrl_gui.qemutableviewmodel import qemuTableViewModel, TELEMETRY_FIELDS, HISTORY_ROLE
 from afrl_gui.devicelistviewmodel import deviceListViewModel
-from afrl_gui.diskimagewidget import diskImageWidget
-from afrl_gui.errormsgbox import errorMsgBox
+# The instance runtime (supervisor, QMP, telemetry, consoles...), the launch wizard, disk image widget and
+# capability discovery are imported on first use to keep them off the startup path, see init_deferred
 
 class MainWindow(QMainWindow):
 
     kill_thread = Signal()
+    firstPainted = Signal()  # emitted once the window has been painted for the first time
 
     def __init__(self, app):
         self.app = app
@@ -47,8 +45,13 @@ class MainWindow(QMainWindow):
         self.deviceListModel = deviceListViewModel();
         self.window = []
         self.default_theme = QGuiApplication.palette()
-        self.qemuList = []
+        self.supervisor = None  # Instance runtime, created by init_runtime after the first paint
+        self.consoleViews = {}  # id(qemuInstance) -> consoleWidget, created when the instance first runs
+        self.capabilities = None  # Shared capability registry, created after the first paint
+        self.painted = False
         self.init_ui()
+        # Everything not needed to draw the first frame waits until it is on screen
+        self.firstPainted.connect(self.init_deferred, Qt.QueuedConnection)
 
     def init_ui(self):
         """init ui"""
@@ -57,75 +60,223 @@ class MainWindow(QMainWindow):
         self.ui.setupUi(self)
         self.setWindowTitle("AFRL-RWWN QEMU MANAGER")
 
-        # Update logos
-        logo = QPixmap(os.path.join(RESOURCE_ROOT, "golden-horde_seal-300x300.png"))
-        logo = logo.scaled(100, 100, Qt.KeepAspectRatio)
-        self.ui.ghLogoLabel.setPixmap(logo)
-
-        logo = QPixmap(os.path.join(RESOURCE_ROOT, "jstar_logo_final.jpg"))
-        logo = logo.scaled(200, 100, Qt.KeepAspectRatio)       # menus
-        self.ui.jstarLogoLabel.setPixmap(logo)
-
         # Setup Menu Actions
         self.ui.action_file_new_qemu_instance.triggered.connect(self.showLaunchWizard)
+        self.ui.action_file_launch_fleet.triggered.connect(self.launchFleetManifest)
         self.ui.actionModify_Image_Contents.triggered.connect(self.showDiskImageWidget)
+        self.ui.action_file_refresh_capabilities.triggered.connect(self.refreshCapabilities)
         self.ui.action_file_exit.triggered.connect(self.close)
         self.ui.action_help_about.triggered.connect(self.showAboutSplash)
 
         # Initialize QEMU Instance Table
         self.init_table()
 
-        # Load xterm terminal into the terminal widget
+        # Serial console tabs are added as instances start, a closed tab is reopened from the instance menu
         self.ui.terminalTabWidget.clear()  # clear the default tabs
-        self.init_terminalView(0, "QEMU 1")
-        self.init_terminalView(1, "QEMU 2")
+        self.ui.terminalTabWidget.setTabsClosable(True)
+        self.ui.terminalTabWidget.tabCloseRequested.connect(self.ui.terminalTabWidget.removeTab)
+
+    def init_deferred(self):
+        """finishes initialization once the first frame is on screen"""
+        # Decode the logos straight to their display size
+        self.ui.ghLogoLabel.setPixmap(self.loadLogo("golden-horde_seal-300x300.png", 100, 100))
+        self.ui.jstarLogoLabel.setPixmap(self.loadLogo("jstar_logo_final.jpg", 200, 100))
+        self.init_runtime()
+        self.capabilityRegistry().start()  # Probe in the background so the first wizard opens warm
+
+    def init_runtime(self):
+        """creates what launches and tracks the QEMU instances, importing it on first use"""
+        if self.supervisor is not None:
+            return
+        from afrl_gui.qemusupervisor import qemuSupervisor
+        from afrl_gui.qemutelemetry import qemuTelemetrySampler
+        from afrl_gui.qemuqmpclient import qemuQmpPool
+        from afrl_gui.qemucpuallocator import qemuCpuAllocator
+        from afrl_gui.hostmemory import qemuMemoryAdmission
+        from afrl_gui.qemusnapshotstore import qemuSnapshotStore
+        from afrl_gui.qemudiskoverlay import qemuOverlayManager
+        from afrl_gui.qemubatchlauncher import qemuBatchLauncher
+        from afrl_gui.sparklinedelegate import sparklineDelegate
+        from afrl_gui.qemuserialconsole import qemuConsolePool
+        self.qmp = qemuQmpPool(parent=self)  # One persistent QMP connection per running instance
+        self.cpuAllocator = qemuCpuAllocator(qmpPool=self.qmp, parent=self)  # Disjoint host CPUs per instance
+        # Launches and tracks the QEMU processes
+        self.snapshots = qemuSnapshotStore(self.qmp, parent=self)  # Saved guest state restored instead of booting
+        self.supervisor = qemuSupervisor(cpuAllocator=self.cpuAllocator, memoryAdmission=qemuMemoryAdmission(),
+                                         snapshots=self.snapshots, overlays=qemuOverlayManager(parent=self),
+                                         configRoot=CONFIG_ROOT, parent=self)
+        self.supervisor.statusChanged.connect(self.snapshots.updateInstance)
+        self.supervisor.statusChanged.connect(self.tableModel.updateQemuInstance)
+        self.telemetry = qemuTelemetrySampler(parent=self)  # Samples host resource use of the running instances
+        self.supervisor.statusChanged.connect(self.telemetry.updateInstance)
+        self.telemetry.sampled.connect(self.tableModel.updateTelemetry)
+        self.supervisor.statusChanged.connect(self.qmp.updateInstance)
+        self.qmp.eventReceived.connect(self.tableModel.updateQmpEvent)
+        self.qmp.runStateChanged.connect(self.tableModel.updateQemuInstance)
+        self.consoles = qemuConsolePool(parent=self)  # Serial console output of every instance, shown in the tabs
+        self.supervisor.statusChanged.connect(self.consoles.updateInstance)
+        self.consoles.opened.connect(self.showConsole)
+        self.launcher = qemuBatchLauncher(self.supervisor, self.qmp, parent=self)  # Starts fleets without a boot storm
+        self.launcher.finished.connect(self.reportFleetLaunch)
+        # The table is empty until the runtime exists, the telemetry columns are drawn as sparklines from now on
+        self.sparklines = sparklineDelegate(HISTORY_ROLE, self)
+        for column in TELEMETRY_FIELDS:
+            self.ui.qemuInstanceTable.setItemDelegateForColumn(column, self.sparklines)
+
+    def loadLogo(self, fileName, width, height):
+        """returns the logo in fileName decoded at the largest size fitting width x height"""
+        reader = QImageReader(os.path.join(RESOURCE_ROOT, fileName))
+        reader.setScaledSize(reader.size().scaled(width, height, Qt.KeepAspectRatio))
+        return QPixmap.fromImage(reader.read())
+
+    def capabilityRegistry(self):
+        """returns the shared capability registry, importing capability discovery on first use"""
+        if self.capabilities is None:
+            from afrl_gui.qemucapabilityregistry import qemuCapabilityRegistry
+            self.capabilities = qemuCapabilityRegistry.instance()
+        return self.capabilities
+
+    def refreshCapabilities(self):
+        """discards cached QEMU capabilities and probes the binary again"""
+        self.capabilityRegistry().refresh()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            self.firstPainted.emit()
 
     def init_table(self):
         """initializes table headers"""
         headerData = self.tableModel.headerData(0, Qt.Horizontal)
-        for row in range(0, MAXIMUM_QEMU_INSTANCES):
-            qemuNode = qemuInstance()
-            self.tableModel.insertQemuInstance(qemuNode)
         print(f"header data: {headerData}")
         self.ui.qemuInstanceTable.setModel(self.tableModel)
         self.ui.qemuInstanceTable.setColumnWidth(0, 186)
         self.ui.qemuInstanceTable.setColumnWidth(1, 186)
         self.ui.qemuInstanceTable.setColumnWidth(2, 130)
         self.ui.qemuInstanceTable.setColumnWidth(3, 30)
+        for column in TELEMETRY_FIELDS:
+            self.ui.qemuInstanceTable.setColumnWidth(column, 150)
+        self.ui.qemuInstanceTable.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.ui.qemuInstanceTable.customContextMenuRequested.connect(self.showInstanceMenu)
 
-    def init_terminalView(self, tabIndex, tabName):
-        """initializes tab view with terminal windows for QEMU instances"""
-        term = terminalWidget(self)
-        tabSize = self.ui.terminalTabWidget.size()
-        self.ui.terminalTabWidget.insertTab(tabIndex, term, tabName)
-        self.ui.terminalTabWidget.tabCloseRequested.connect(
-            term.termProcess.terminate)
-        term.resize(tabSize)
-        pid = term.startXterm()
-        print(
-            "Tab Size: " + str(tabSize)
-            + "    TerminalSize: " + str(term.size())
-            )
-        return pid
+    def showInstanceMenu(self, pos):
+        """context menu to control, save the state of, show the console of or remove the QEMU instance under the cursor"""
+        index = self.ui.qemuInstanceTable.indexAt(pos)
+        if not index.isValid():
+            return
+        qemu = self.tableModel.instance(index.row())
+        menu = QMenu(self)
+        stopAction = menu.addAction("Stop Instance")
+        stopAction.setEnabled(self.supervisor.isRunning(qemu))
+        stopAction.triggered.connect(lambda: self.supervisor.stop(qemu))
+        if qemu.runState == "paused":
+            resumeAction = menu.addAction("Resume Instance")
+            resumeAction.triggered.connect(lambda: self.qmp.resume(qemu))
+        else:
+            pauseAction = menu.addAction("Pause Instance")
+            pauseAction.setEnabled(self.qmp.isReady(qemu))
+            pauseAction.triggered.connect(lambda: self.qmp.pause(qemu))
+        saveAction = menu.addAction("Save State")
+        saveAction.setEnabled(self.qmp.isReady(qemu) and not self.snapshots.isSaving(qemu))
+        saveAction.triggered.connect(lambda: self.snapshots.save(qemu))
+        discardAction = menu.addAction("Discard Saved State")
+        discardAction.setEnabled(self.snapshots.hasSnapshot(qemu))
+        discardAction.triggered.connect(lambda: self.snapshots.remove(qemu))
+        consoleAction = menu.addAction("Show Console")
+        consoleAction.setEnabled(id(qemu) in self.consoleViews)
+        consoleAction.triggered.connect(lambda: self.showConsole(qemu))
+        removeAction = menu.addAction("Remove Instance")
+        removeAction.triggered.connect(lambda: self.removeQemuInstance(qemu))
+        menu.popup(self.ui.qemuInstanceTable.viewport().mapToGlobal(pos))
+
+    def addQemuInstance(self, qemu):
+        """adds a new instance to the table and launches it"""
+        self.init_runtime()
+        if not self.tableModel.insertQemuInstance(qemu):
+            from afrl_gui.errormsgbox import errorMsgBox
+            errorMsgBox(self, f"A QEMU instance named {qemu.name} already exists")
+            return
+        self.supervisor.launch(qemu)
+
+    def launchFleetManifest(self):
+        """adds every instance of a fleet manifest to the table and launches them in batches"""
+        from afrl_gui.errormsgbox import errorMsgBox
+        from afrl_gui.qemufleetmanifest import qemuFleetManifest, manifestError
+        fd = QFileDialog(self, "Open Fleet Manifest")
+        fd.setNameFilters(FLEET_MANIFEST_FILTERS)
+        if not fd.exec_():
+            return
+        try:
+            manifest = qemuFleetManifest.load(fd.selectedFiles()[0])
+            instances = manifest.instances()
+        except manifestError as e:
+            errorMsgBox(self, str(e))
+            return
+        duplicates = [q.name for q in instances if q.name in self.tableModel.registry]
+        if duplicates:
+            errorMsgBox(self, f"QEMU instances already exist: {', '.join(duplicates)}")
+            return
+        self.init_runtime()
+        for qemu in instances:
+            self.tableModel.insertQemuInstance(qemu)
+        self.launcher.start(instances, manifest.parallelism, manifest.rampUp)
+        self.ui.statusbar.showMessage(f"Launching {len(instances)} QEMU instances")
+
+    def reportFleetLaunch(self, report):
+        """shows the launch latencies of a finished fleet launch"""
+        for r in report["instances"]:
+            latency = f"{r['latency'] * 1000:.0f} ms" if r["latency"] is not None else "failed"
+            print(f"Fleet launch: {r['name']}: {latency} ({r['status']})")
+        message = f"Launched {report['launched']} QEMU instances in {report['elapsed']:.1f} s"
+        if report["launched"]:
+            message += f", launch latency median {report['median'] * 1000:.0f} ms, max {report['max'] * 1000:.0f} ms"
+        if report["failed"]:
+            message += f", {report['failed']} failed"
+        self.ui.statusbar.showMessage(message)
+
+    def removeQemuInstance(self, qemu):
+        """stops the instance if it is running and removes it from the table"""
+        self.supervisor.stop(qemu)
+        self.tableModel.removeQemuInstance(qemu.name)
+        self.consoles.remove(qemu)
+        view = self.consoleViews.pop(id(qemu), None)
+        if view is not None:
+            self.ui.terminalTabWidget.removeTab(self.ui.terminalTabWidget.indexOf(view))
+            view.deleteLater()
+
+    def showConsole(self, qemu, console=None):
+        """shows the serial console of an instance in its tab, creating the tab on first use"""
+        from afrl_gui.consolewidget import consoleWidget
+        tabs = self.ui.terminalTabWidget
+        view = self.consoleViews.get(id(qemu))
+        if view is None:
+            view = consoleWidget(tabs)
+            self.consoleViews[id(qemu)] = view
+        if console is not None:
+            view.setConsole(console)  # A new run, started with an empty view
+        if tabs.indexOf(view) < 0:
+            tabs.addTab(view, qemu.name)
+        if console is None:
+            tabs.setCurrentWidget(view)  # Asked for from the instance menu
+        return view
 
     def showLaunchWizard(self):
         """start qemu instance launch wizard in dock"""
-        if self.tableModel.validDataCount() < MAXIMUM_QEMU_INSTANCES:
-            dock = QDockWidget(self)
-            dock.setFloating(True)
-            launchWiz = QemuLaunchWizard(dock)
-            dock.setWidget(launchWiz)
-            self.addDockWidget(Qt.LeftDockWidgetArea, dock)
-            launchWiz.newQemuSignal.connect(self.tableModel.insertQemuInstance)
-            launchWiz.newDeviceSignal.connect(self.deviceListModel.insertDevice)
-            launchWiz.removeDeviceSignal.connect(self.deviceListModel.removeDevice)
-            launchWiz.ui.deviceListView.setModel(self.deviceListModel)
-        else:
-            print("Error: All QEMU Instances Used")
-            errorMsgBox(self, "All QEMU Instances Utilized")
+        from afrl_gui.qemulaunchwizard import QemuLaunchWizard
+        dock = QDockWidget(self)
+        dock.setFloating(True)
+        launchWiz = QemuLaunchWizard(dock)
+        dock.setWidget(launchWiz)
+        self.addDockWidget(Qt.LeftDockWidgetArea, dock)
+        launchWiz.newQemuSignal.connect(self.addQemuInstance)
+        launchWiz.newDeviceSignal.connect(self.deviceListModel.insertDevice)
+        launchWiz.removeDeviceSignal.connect(self.deviceListModel.removeDevice)
+        launchWiz.ui.deviceListView.setModel(self.deviceListModel)
 
     def showDiskImageWidget(self):
         '''Displays the widget for interacting iwth the guest disk image file'''
+        from afrl_gui.diskimagewidget import diskImageWidget
         print("Launching the disk image widget")
         self.diskImageWidget = diskImageWidget(self)
         self.diskImageWidget.setFloating(True)
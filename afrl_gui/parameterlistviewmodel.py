@@ -0,0 +1,33 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class parameterListViewModel(QAbstractListModel):
+    ''' Read only list model over a qemuParameterList, backs the machine and cpu dropdowns '''
+
+    def __init__(self, paramList, parent=None):
+        super().__init__(parent)
+        self.paramList = paramList
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.paramList)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.paramList.argumentList()[index.row()]
+        elif role == Qt.ToolTipRole:
+            # Only built when the view asks for it
+            item = self.paramList[index.row()]
+            if hasattr(item, "toolTipText"):
+                return item.toolTipText()
+            return item.description()
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
@@ -0,0 +1,72 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Accelerator selection for the -accel option of an instance
+# KVM is used when the host is an aarch64 machine with a usable /dev/kvm and the instance runs the host cpu model
+# (KVM rejects named models such as cortex-a53), guests run under TCG otherwise
+# Automatic TCG settings: one translation thread per vCPU (thread=multi) when the instance has more than one
+# vCPU and more than one host CPU to run them on, a single thread otherwise where MTTCG only adds locking,
+# and a translation cache of TCG_TB_SIZE MB, enough for a Linux boot without QEMU's 1 GB default per instance
+
+import os, platform
+from afrl_gui.common import TCG_TB_SIZE
+
+GUEST_ARCH = "aarch64"  # Architecture of the qemu-system binary
+KVM_DEVICE = "/dev/kvm"
+KVM_CPUS = ("", "host", "max")  # cpu models KVM runs, "" leaves the machine default which is host under KVM
+
+# Accelerator choices, in the order of the launch wizard dropdowns
+ACCEL_AUTO = ""
+ACCEL_TCG = "tcg"
+ACCEL_KVM = "kvm"
+ACCELERATORS = (ACCEL_AUTO, ACCEL_TCG, ACCEL_KVM)
+TCG_THREAD_AUTO = ""
+TCG_THREAD_MULTI = "multi"
+TCG_THREAD_SINGLE = "single"
+TCG_THREADS = (TCG_THREAD_AUTO, TCG_THREAD_MULTI, TCG_THREAD_SINGLE)
+
+
+def hostArch():
+    machine = platform.machine().lower()
+    return "aarch64" if machine == "arm64" else machine
+
+
+def kvmAvailable(guestArch=GUEST_ARCH):
+    ''' Returns True if guests of guestArch can run under KVM on this host '''
+    return hostArch() == guestArch and os.access(KVM_DEVICE, os.R_OK | os.W_OK)
+
+
+def kvmCpu(cpu):
+    ''' Returns True if KVM accepts the cpu model '''
+    return cpu in KVM_CPUS
+
+
+def vcpuCount(qemu):
+    ''' Returns the number of vCPUs an instance is launched with '''
+    if qemu.smpCores == "ALL":
+        return len(qemu.cpuSet) or os.cpu_count() or 1
+    try:
+        return max(int(qemu.smpCores), 1)
+    except ValueError:
+        return 1
+
+
+def hostCpuCount(qemu):
+    ''' Returns the number of host CPUs the vCPUs of an instance can run on '''
+    if qemu.cpuSet:
+        return len(qemu.cpuSet)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def acceleratorOption(qemu):
+    ''' Returns the -accel option value of an instance, its choices with "" resolved to the automatic setting '''
+    accelerator = qemu.accelerator or (ACCEL_KVM if kvmAvailable() and kvmCpu(qemu.cpu) else ACCEL_TCG)
+    if accelerator == ACCEL_KVM:
+        return ACCEL_KVM
+    threads = qemu.tcgThreads
+    if threads == TCG_THREAD_AUTO:
+        threads = TCG_THREAD_MULTI if vcpuCount(qemu) > 1 and hostCpuCount(qemu) > 1 else TCG_THREAD_SINGLE
+    tbSize = int(qemu.tbSize) or TCG_TB_SIZE
+    return f"{ACCEL_TCG},thread={threads},tb-size={tbSize}"
@@ -0,0 +1,126 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Launches a fleet of QEMU instances through qemuSupervisor without a boot storm
+# At most `parallelism` instances are starting at once and launches are spaced by the ramp up rate
+# An instance stops counting as starting once it is up: when its QMP connection answers and any saved
+# state is loaded if a qemuQmpPool is given, when its process is running otherwise, or when it or its
+# QMP connection failed
+# The time from launch to up is recorded per instance and reported when the batch finishes
+
+import statistics, time
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+from afrl_gui.common import BATCH_PARALLELISM, BATCH_RAMP_UP
+from afrl_gui.qemusupervisor import STATUS_STARTING, STATUS_RUNNING
+
+STATUS_QUEUED = "Queued"
+
+
+class qemuBatchLauncher(QObject):
+    instanceLaunched = Signal(object, float)  # qemuInstance and seconds from launch to up, negative if it failed
+    finished = Signal(dict)  # Batch report, see report()
+
+    def __init__(self, supervisor, qmpPool=None, parallelism=BATCH_PARALLELISM, rampUp=BATCH_RAMP_UP, parent=None):
+        super().__init__(parent)
+        self.__supervisor = supervisor
+        self.__qmpPool = qmpPool
+        self.parallelism = parallelism
+        self.rampUp = rampUp  # Launches per second, 0 is unlimited
+        self.__queue = []  # Instances waiting for a launch slot, next launch last
+        self.__starting = {}  # id(qemuInstance) -> (qemuInstance, launch time)
+        self.__results = []  # {name, status, latency} in the order instances came up
+        self.__batchStart = None
+        self.__lastLaunch = None
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.__dispatch)
+        supervisor.statusChanged.connect(self.__statusChanged)
+        if qmpPool is not None:
+            qmpPool.runStateChanged.connect(self.__qmpReady)
+            qmpPool.connectionFailed.connect(self.__qmpFailed)
+
+    def isActive(self):
+        ''' Returns True while instances are queued or starting '''
+        return bool(self.__queue or self.__starting)
+
+    def start(self, instances, parallelism=None, rampUp=None):
+        ''' Queues instances for launch, returns immediately, progress is reported through instanceLaunched '''
+        if parallelism is not None:
+            self.parallelism = max(int(parallelism), 1)
+        if rampUp is not None:
+            self.rampUp = max(float(rampUp), 0.0)
+        if not self.isActive():
+            self.__results = []
+            self.__batchStart = time.monotonic()
+        for qemu in instances:
+            qemu.status = STATUS_QUEUED
+        self.__queue[:0] = reversed(instances)
+        self.__dispatch()
+
+    def cancel(self):
+        ''' Drops the instances not launched yet, starting instances are left running '''
+        self.__queue = []
+        self.__timer.stop()
+        self.__finishIfDone()
+
+    def report(self):
+        ''' Returns the batch results: per instance latencies and their summary in seconds '''
+        latencies = [r["latency"] for r in self.__results if r["latency"] is not None]
+        report = {"parallelism": self.parallelism,
+                  "rampUp": self.rampUp,
+                  "instances": list(self.__results),
+                  "launched": len(latencies),
+                  "failed": len(self.__results) - len(latencies),
+                  "elapsed": time.monotonic() - self.__batchStart if self.__batchStart is not None else 0.0}
+        if latencies:
+            report.update({"min": min(latencies),
+                           "median": statistics.median(latencies),
+                           "max": max(latencies)})
+        return report
+
+    def __dispatch(self):
+        while self.__queue and len(self.__starting) < self.parallelism:
+            now = time.monotonic()
+            if self.rampUp > 0 and self.__lastLaunch is not None:
+                wait = self.__lastLaunch + 1.0 / self.rampUp - now
+                if wait > 0:
+                    self.__timer.start(int(wait * 1000) + 1)
+                    return
+            qemu = self.__queue.pop()
+            self.__lastLaunch = now
+            self.__starting[id(qemu)] = (qemu, now)
+            if not self.__supervisor.launch(qemu) and id(qemu) in self.__starting:
+                self.__done(qemu, None)  # Not started, e.g. already running
+
+    @Slot(object)
+    def __statusChanged(self, qemu):
+        if id(qemu) not in self.__starting or qemu.status == STATUS_STARTING:
+            return
+        if qemu.status != STATUS_RUNNING:
+            self.__done(qemu, None)  # Failed, crashed or exited before it came up
+        elif self.__qmpPool is None or not qemu.qmpSocket:
+            self.__done(qemu, time.monotonic())
+
+    @Slot(object)
+    def __qmpReady(self, qemu):
+        if id(qemu) in self.__starting and qemu.runState and qemu.runState != "inmigrate":
+            self.__done(qemu, time.monotonic())
+
+    @Slot(object)
+    def __qmpFailed(self, qemu):
+        if id(qemu) in self.__starting:
+            self.__done(qemu, None)  # Running, but never answered on its control channel
+
+    def __done(self, qemu, upTime):
+        (qemu, launched) = self.__starting.pop(id(qemu))
+        latency = upTime - launched if upTime is not None else None
+        self.__results.append({"name": qemu.name, "status": qemu.status, "latency": latency})
+        self.instanceLaunched.emit(qemu, latency if latency is not None else -1.0)
+        self.__dispatch()
+        self.__finishIfDone()
+
+    def __finishIfDone(self):
+        if not self.isActive() and self.__batchStart is not None:
+            report = self.report()
+            self.__batchStart = None
+            self.finished.emit(report)
@@ -0,0 +1,198 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Persistent on-disk cache of QEMU capability queries (machines, cpus, devices and property schemas)
+# Entries are keyed by the identity of the QEMU binary (path, size, mtime and content hash) and are
+# discarded automatically when the binary changes
+# Cache misses are answered by a single long lived QMP session, help text output is kept as a fallback
+
+import hashlib, json, os, subprocess, threading
+from afrl_gui.common import QEMU_BINARY, CAPABILITY_CACHE_ROOT
+from afrl_gui.qemuqmpsession import qemuQmpSession, qmpError
+from afrl_gui.qemuhelpparser import qemuHelpProcess
+
+CACHE_FORMAT_VERSION = 1
+QMP_UNAVAILABLE_KEY = "qmp unavailable"  # Set once the binary fails to start a QMP session
+
+
+class qemuCapabilityCache:
+    def __init__(self, binary=QEMU_BINARY, cacheRoot=CAPABILITY_CACHE_ROOT):
+        self.__binary = binary
+        self.__path = os.path.realpath(binary)
+        pathHash = hashlib.sha256(self.__path.encode("utf-8")).hexdigest()[:16]
+        self.__cacheFile = os.path.join(cacheRoot, f"capabilities-{pathHash}.json")
+        self.__identity = None
+        self.__entries = {}
+        self.__session = None  # Started on the first QMP cache miss
+        self.__lock = threading.RLock()  # Cache is shared by the concurrent capability probes
+        self.load()
+
+    def __repr__(self):
+        '''Returns string representation of the capability cache'''
+        return(f"Capability Cache: {self.__path} entries: {len(self.__entries)} file: {self.__cacheFile}")
+
+    def binary(self):
+        ''' Returns the QEMU binary the cache is keyed on '''
+        return self.__binary
+
+    def identity(self):
+        ''' Returns the identity (path, size, mtime, sha256) of the QEMU binary, None if the binary is missing '''
+        with self.__lock:
+            self.__validate()
+            return self.__identity
+
+    def load(self):
+        ''' Loads the cache file from disk, discarding it if it belongs to a different build of the binary '''
+        stored = None
+        try:
+            with open(self.__cacheFile, 'r', encoding="utf-8") as fin:
+                stored = json.load(fin)
+        except (OSError, ValueError):
+            stored = None
+        if stored is None or stored.get("version") != CACHE_FORMAT_VERSION:
+            stored = {"identity": None, "entries": {}}
+        with self.__lock:
+            self.__identity = stored["identity"]
+            self.__entries = stored["entries"]
+            self.__validate()
+
+    def save(self):
+        ''' Writes the cache to disk atomically '''
+        with self.__lock:
+            if self.__identity is None:
+                return  # Nothing meaningful to key the cache on
+            os.makedirs(os.path.dirname(self.__cacheFile), exist_ok=True)
+            tmpFile = f"{self.__cacheFile}.{os.getpid()}.tmp"
+            try:
+                with open(tmpFile, 'w', encoding="utf-8") as fout:
+                    json.dump({"version": CACHE_FORMAT_VERSION,
+                               "identity": self.__identity,
+                               "entries": self.__entries}, fout)
+                os.replace(tmpFile, self.__cacheFile)
+            except OSError as e:
+                print(f"ERROR: unable to write capability cache {self.__cacheFile}: {e}")
+
+    def invalidate(self):
+        ''' Drops every cached entry and removes the cache file '''
+        with self.__lock:
+            self.__entries = {}
+            try:
+                os.remove(self.__cacheFile)
+            except OSError:
+                pass
+
+    def get(self, key, default=None):
+        ''' Returns the cached value for key, or default if not cached for the current binary '''
+        with self.__lock:
+            self.__validate()
+            return self.__entries.get(key, default)
+
+    def put(self, key, value):
+        ''' Stores a JSON serializable value for key and persists the cache '''
+        with self.__lock:
+            self.__validate()
+            if self.__identity is None:
+                return
+            self.__entries[key] = value
+            self.save()
+
+    def session(self):
+        ''' Returns the QMP session used to answer cache misses '''
+        with self.__lock:
+            if self.__session is None:
+                self.__session = qemuQmpSession(self.__binary)
+            return self.__session
+
+    def close(self):
+        ''' Shuts down the QMP session if one was started '''
+        with self.__lock:
+            session = self.__session
+            self.__session = None
+        if session is not None:
+            session.close()
+
+    def query(self, command, arguments=None):
+        ''' Returns the result of a QMP command, only asking QEMU on a cache miss, None on failure '''
+        key = f"qmp {command}"
+        if arguments:
+            key += f" {json.dumps(arguments, sort_keys=True)}"
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        if self.get(QMP_UNAVAILABLE_KEY):
+            return None  # Callers fall back to the help text without spawning QEMU again
+        try:
+            result = self.session().execute(command, arguments)
+        except qmpError as e:
+            print(f"ERROR: {e}")
+            if self.session().startError() is not None:
+                self.put(QMP_UNAVAILABLE_KEY, True)  # Until the binary changes or the cache is refreshed
+            return None
+        self.put(key, result)
+        return result
+
+    def output(self, args):
+        ''' Returns the stdout text of running the QEMU binary with args, only running it on a cache miss '''
+        key = " ".join(args)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        # QEMU is run without holding the lock so concurrent probes are not serialized
+        try:
+            qemuOut = subprocess.run([self.__binary] + args, capture_output=True)
+        except OSError as e:
+            print(f"ERROR: unable to run {self.__binary}: {e}")
+            return None
+        if(qemuOut.returncode != 0):
+            print(f"ERROR: qemu-system-aarch64 {key} returned error code: {qemuOut.returncode}")
+            return None
+        outStr = qemuOut.stdout.decode("utf-8")
+        self.put(key, outStr)
+        return outStr
+
+    def stream(self, args, parser):
+        ''' Feeds the stdout of running the QEMU binary with args to parser as it is produced,
+            a cached copy is fed instead when present, returns False on failure '''
+        key = " ".join(args)
+        cached = self.get(key)
+        if cached is not None:
+            parser.feedText(cached)
+            parser.finish()
+            return True
+        outStr = qemuHelpProcess(self.__binary, args, parser).run()
+        if outStr is None:
+            return False
+        self.put(key, outStr)
+        return True
+
+    def __validate(self):
+        ''' Compares the binary on disk against the cached identity, invalidating the entries if it changed '''
+        try:
+            st = os.stat(self.__path)
+        except OSError:
+            self.__identity = None
+            self.__entries = {}
+            return
+        stored = self.__identity
+        if (stored is not None and stored["path"] == self.__path and
+                stored["size"] == st.st_size and stored["mtime"] == st.st_mtime_ns):
+            return  # Unchanged since last hashed, skip rehashing the binary
+        identity = {"path": self.__path,
+                    "size": st.st_size,
+                    "mtime": st.st_mtime_ns,
+                    "sha256": self.__hashBinary()}
+        if stored is None or stored.get("sha256") != identity["sha256"]:
+            if self.__entries:
+                print(f"QEMU binary {self.__path} changed, invalidating capability cache")
+            self.invalidate()
+        self.__identity = identity
+        if self.__entries:
+            self.save()  # Content unchanged (e.g. touched or copied), record the new stat data
+
+    def __hashBinary(self):
+        ''' Returns the sha256 hex digest of the binary contents '''
+        digest = hashlib.sha256()
+        with open(self.__path, 'rb') as fin:
+            for chunk in iter(lambda: fin.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
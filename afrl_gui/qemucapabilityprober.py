@@ -0,0 +1,39 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Runs the QEMU machine, cpu and device capability queries concurrently off of the GUI thread
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from afrl_gui.qemumachinelist import qemuMachineList
+from afrl_gui.qemucpulist import qemuCpuList
+from afrl_gui.qemudevicelist import qemuDeviceList
+
+
+class capabilityProbe(QRunnable):
+    ''' Builds a single capability list on a thread pool thread and hands it to a signal '''
+    def __init__(self, listClass, cache, resultSignal):
+        super().__init__()
+        self.listClass = listClass
+        self.cache = cache
+        self.resultSignal = resultSignal
+
+    def run(self):
+        # Signal is owned by a QObject on the GUI thread so the emit is queued back to it
+        self.resultSignal.emit(self.listClass(self.cache))
+
+
+class qemuCapabilityProber(QObject):
+    machinesReady = Signal(object)  # qemuMachineList
+    cpusReady = Signal(object)  # qemuCpuList
+    devicesReady = Signal(object)  # qemuDeviceList
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+
+    def start(self, threadPool=None):
+        ''' Starts every probe at once, each result is signaled as soon as its probe completes '''
+        pool = threadPool if threadPool is not None else QThreadPool.globalInstance()
+        pool.start(capabilityProbe(qemuDeviceList, self.cache, self.devicesReady))  # Slowest probe first
+        pool.start(capabilityProbe(qemuMachineList, self.cache, self.machinesReady))
+        pool.start(capabilityProbe(qemuCpuList, self.cache, self.cpusReady))
@@ -0,0 +1,111 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Application wide registry of QEMU capabilities shared by every wizard, settings widget and headless user
+# Capabilities are probed once per process and only re-probed when a refresh is requested
+
+from PySide6.QtCore import QObject, Signal, Slot
+from afrl_gui.common import QEMU_BINARY
+from afrl_gui.qemucapabilitycache import qemuCapabilityCache
+from afrl_gui.qemucapabilityprober import qemuCapabilityProber
+from afrl_gui.qemuschemacache import qemuSchemaCache
+from afrl_gui.qemumachinelist import qemuMachineList
+from afrl_gui.qemucpulist import qemuCpuList
+from afrl_gui.qemudevicelist import qemuDeviceList
+
+
+class qemuCapabilityRegistry(QObject):
+    machinesReady = Signal(object)  # qemuMachineList
+    cpusReady = Signal(object)  # qemuCpuList
+    devicesReady = Signal(object)  # qemuDeviceList
+
+    __instance = None
+
+    @classmethod
+    def instance(cls):
+        ''' Returns the process wide registry, creating it on first use '''
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
+
+    def __init__(self, binary=QEMU_BINARY, parent=None):
+        super().__init__(parent)
+        self.cache = qemuCapabilityCache(binary)
+        self.schemaCache = qemuSchemaCache(self.cache)
+        self.machineList = None  # Lists are None until probed
+        self.cpuList = None
+        self.deviceList = None
+        self.__probing = False
+        self.prober = qemuCapabilityProber(self.cache, self)
+        self.prober.machinesReady.connect(self.setMachineList)
+        self.prober.cpusReady.connect(self.setCpuList)
+        self.prober.devicesReady.connect(self.setDeviceList)
+
+    def isLoaded(self):
+        ''' Returns True once every capability list is available '''
+        return None not in (self.machineList, self.cpuList, self.deviceList)
+
+    def start(self):
+        ''' Starts probing in the background if nothing has been probed yet, results are signaled '''
+        if self.__probing or self.isLoaded():
+            return
+        self.__probing = True
+        self.prober.start()
+
+    def load(self):
+        ''' Probes synchronously on the calling thread, for headless use without an event loop '''
+        if self.machineList is None:
+            self.setMachineList(qemuMachineList(self.cache))
+        if self.cpuList is None:
+            self.setCpuList(qemuCpuList(self.cache))
+        if self.deviceList is None:
+            self.setDeviceList(qemuDeviceList(self.cache))
+
+    def refresh(self):
+        ''' Discards every cached capability and probes the QEMU binary again '''
+        if self.__probing:
+            print("Capability probe already in progress, refresh ignored")
+            return
+        self.cache.invalidate()
+        self.cache.close()  # Next query starts a fresh QMP session against the current binary
+        self.schemaCache.clear()
+        self.machineList = None
+        self.cpuList = None
+        self.deviceList = None
+        self.__probing = False
+        self.start()
+
+    def connectListeners(self, machineSlot, cpuSlot, deviceSlot):
+        ''' Connects slots to the ready signals, calling them immediately for lists that are already loaded '''
+        self.machinesReady.connect(machineSlot)
+        self.cpusReady.connect(cpuSlot)
+        self.devicesReady.connect(deviceSlot)
+        if self.machineList is not None:
+            machineSlot(self.machineList)
+        if self.cpuList is not None:
+            cpuSlot(self.cpuList)
+        if self.deviceList is not None:
+            deviceSlot(self.deviceList)
+        self.start()
+
+    @Slot(object)
+    def setMachineList(self, machineList):
+        self.machineList = machineList
+        self.__checkProbing()
+        self.machinesReady.emit(machineList)
+
+    @Slot(object)
+    def setCpuList(self, cpuList):
+        self.cpuList = cpuList
+        self.__checkProbing()
+        self.cpusReady.emit(cpuList)
+
+    @Slot(object)
+    def setDeviceList(self, deviceList):
+        self.deviceList = deviceList
+        self.__checkProbing()
+        self.devicesReady.emit(deviceList)
+
+    def __checkProbing(self):
+        if self.isLoaded():
+            self.__probing = False
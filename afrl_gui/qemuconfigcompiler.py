@@ -0,0 +1,166 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Compiles a qemuInstance into the QEMU options that launch it, as an exec-ready argument list or as a
+# -readconfig file plus the arguments a config file cannot hold
+# An instance is compiled once into qemuOptions (option, implied value, key/value pairs), which render either as
+# "-option value,key=value" arguments (commas in values doubled) or as '[group "id"]' INI sections
+# The guest definition (machine and kernel, accelerator, memory, vCPUs, devices) goes to the config file while the
+# cpu model (not a config group) and what differs per instance or per run (drive, QMP and serial sockets, incoming state)
+# stay on the command line; config files are named by the hash of their content so identical fleet members
+# share one file
+
+import hashlib, os
+from afrl_gui.qemuaccelerator import acceleratorOption
+from afrl_gui.qemudriveoptions import DRIVE_ID, driveOptions
+
+# Config file group and implied key of the options a config file can hold
+CONFIG_GROUPS = {"-machine": ("machine", "type"),
+                 "-accel": ("accel", "accel"),
+                 "-m": ("memory", "size"),
+                 "-smp": ("smp-opts", "cpus"),
+                 "-object": ("object", "qom-type"),
+                 "-device": ("device", "driver")}
+RAW_OPTIONS = ("-serial", "-incoming")  # Values QEMU does not parse as key=value lists, passed on unescaped
+CONFIG_VALUE_LENGTH = 1023  # Longest value QEMU reads from a config file
+
+
+class qemuOption:
+    def __init__(self, option, value=None, pairs=(), id=""):
+        self.option = option  # Command line option, e.g. -device
+        self.value = value  # Implied value, e.g. the device driver, None if there is none
+        self.pairs = list(pairs)  # (key, value) pairs, value None for a bare key
+        self.id = id
+
+    def arguments(self):
+        ''' Returns the option as command line arguments '''
+        if self.option in RAW_OPTIONS:
+            return [self.option, self.value]
+        parts = [escape(self.value)] if self.value is not None else []
+        if self.id:
+            parts.append(f"id={escape(self.id)}")
+        parts += [key if value is None else f"{key}={escape(value)}" for (key, value) in self.pairs]
+        return [self.option] + ([",".join(parts)] if parts else [])
+
+    def configSection(self):
+        ''' Returns the option as a config file section, None if config files cannot hold it '''
+        if self.option not in CONFIG_GROUPS:
+            return None
+        (group, impliedKey) = CONFIG_GROUPS[self.option]
+        pairs = ([(impliedKey, self.value)] if self.value is not None else []) + \
+                [(key, "on" if value is None else value) for (key, value) in self.pairs]
+        if any(invalidConfigText(text) for pair in pairs for text in pair) or invalidConfigText(self.id):
+            return None
+        header = f'[{group} "{self.id}"]' if self.id else f"[{group}]"
+        return "\n".join([header] + [f'  {key} = "{value}"' for (key, value) in pairs]) + "\n"
+
+
+def escape(value):
+    return str(value).replace(",", ",,")
+
+
+def invalidConfigText(text):
+    text = str(text)
+    return '"' in text or "\n" in text or len(text) > CONFIG_VALUE_LENGTH
+
+
+def splitSettings(settings):
+    ''' Returns "key=value" setting strings as (key, value) pairs, value None for a bare key '''
+    pairs = []
+    for s in settings:
+        (key, sep, value) = str(s).partition("=")
+        pairs.append((key, value if sep else None))
+    return pairs
+
+
+def compileOptions(qemu):
+    ''' Returns the qemuOptions launching an instance, in command line order '''
+    options = []
+    # Machine and kernel, guest RAM comes from the memory backend object if there is one
+    machinePairs = splitSettings(qemu.machineSettings)
+    if qemu.memoryBackend != "":
+        machinePairs.append(("memory-backend", "ram0"))
+    if qemu.kernel != "":
+        machinePairs.append(("kernel", qemu.kernel))
+    if qemu.machine != "" or machinePairs:
+        options.append(qemuOption("-machine", qemu.machine or None, machinePairs))
+
+    if qemu.cpu != "":
+        options.append(qemuOption("-cpu", qemu.cpu, splitSettings(qemu.cpuSettings)))
+
+    if qemu.smpCores == "ALL":
+        # Every host CPU assigned to the instance, every host CPU if it runs unpinned
+        options.append(qemuOption("-smp", str(len(qemu.cpuSet) or os.cpu_count())))
+    elif qemu.smpCores != "" and qemu.smpCores != "0":
+        options.append(qemuOption("-smp", str(qemu.smpCores)))
+
+    (accelerator, _, settings) = acceleratorOption(qemu).partition(",")
+    options.append(qemuOption("-accel", accelerator, splitSettings(settings.split(",") if settings else [])))
+
+    options.append(qemuOption("-m", f"{qemu.memory}M"))  # Always using MB for simplicity
+    prealloc = [("prealloc", "on")] if qemu.memoryPrealloc else []
+    if qemu.memoryBackend == "memfd":
+        options.append(qemuOption("-object", "memory-backend-memfd", [("size", f"{qemu.memory}M")] + prealloc, "ram0"))
+    elif qemu.memoryBackend == "hugetlbfs":
+        options.append(qemuOption("-object", "memory-backend-file",
+                                  [("size", f"{qemu.memory}M"), ("mem-path", qemu.hugepagePath or "/dev/hugepages")]
+                                  + prealloc, "ram0"))
+    elif qemu.memoryPrealloc:
+        options.append(qemuOption("-mem-prealloc"))
+
+    for (d, settings) in zip(qemu.devices, qemu.deviceSettings):
+        options.append(qemuOption("-device", d, splitSettings(settings)))
+
+    # Currently constrained to single zcu106 SD image setup, the instance's overlay when it has one
+    if qemu.overlay != "" or qemu.imageName != "":
+        drive = [("if", "sd"), ("format", "qcow2" if qemu.overlay != "" else "raw"), ("index", "1"),
+                 ("file", qemu.overlay or qemu.imageName)]
+        options.append(qemuOption("-drive", None, drive + splitSettings(driveOptions(qemu)), DRIVE_ID))
+
+    # Control channel, QEMU keeps running whether or not a client is connected
+    if qemu.qmpSocket != "":
+        options.append(qemuOption("-qmp", f"unix:{qemu.qmpSocket}", [("server", "on"), ("wait", "off")]))
+
+    # First serial port, the console view connects to it while the instance runs, output is dropped while it is not
+    if qemu.serialSocket != "":
+        options.append(qemuOption("-chardev", "socket", [("path", qemu.serialSocket), ("server", "on"), ("wait", "off")],
+                                  "serial0"))
+        options.append(qemuOption("-serial", "chardev:serial0"))
+
+    # Restore from a saved state, the guest runs from where it was saved instead of booting
+    if qemu.incoming != "":
+        options.append(qemuOption("-incoming", qemu.incoming))
+    return options
+
+
+def compileArguments(qemu):
+    ''' Returns the arguments launching an instance without a config file '''
+    return [argument for option in compileOptions(qemu) for argument in option.arguments()]
+
+
+def compileConfig(qemu):
+    ''' Returns the -readconfig file content of an instance and the arguments launching it alongside the file '''
+    sections = []
+    arguments = []
+    for option in compileOptions(qemu):
+        section = option.configSection()
+        if section is None:
+            arguments += option.arguments()
+        else:
+            sections.append(section)
+    return ("# qemu config file\n\n" + "\n".join(sections), arguments)
+
+
+def writeConfig(qemu, directory):
+    ''' Writes the config file of an instance to directory, named by the hash of its content so instances
+        compiling to the same file share it, returns the arguments launching the instance with it '''
+    (content, arguments) = compileConfig(qemu)
+    data = content.encode("utf-8")
+    path = os.path.join(directory, hashlib.sha256(data).hexdigest()[:32] + ".cfg")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as fout:
+            fout.write(data)
+        os.replace(temporary, path)  # Whole files only, another launch may be reading it
+    return ["-readconfig", path] + arguments
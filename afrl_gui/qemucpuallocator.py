@@ -0,0 +1,148 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Assigns disjoint sets of host CPUs to QEMU instances and pins their threads to them
+# CPUs are handed out as whole physical cores so no two instances share SMT siblings, an instance is kept
+# on one NUMA node when one has enough free cores (the node that fits tightest is used)
+# smpCores "ALL" takes every free core of the NUMA node with the most free cores
+# Every thread of the QEMU process is confined to its CPU set once it runs (sched_setaffinity only applies to
+# the thread given, threads QEMU created before then do not follow the main thread) and, once QMP answers,
+# each vCPU thread (thread ids from query-cpus-fast) is pinned to its own CPU of the set
+# When demand exceeds the free CPUs a warning is printed and the instance runs unpinned
+
+import os
+from PySide6.QtCore import QObject, Slot
+from afrl_gui.hosttopology import hostTopology, formatCpuList
+
+
+class qemuCpuAllocator(QObject):
+    def __init__(self, topology=None, qmpPool=None, parent=None):
+        super().__init__(parent)
+        self.__topology = topology  # Read from sysfs on first use, keeping it off the startup path
+        self.__qmpPool = qmpPool
+        self.__free = None  # NUMA node -> free cores
+        self.__allocations = {}  # id(qemuInstance) -> (qemuInstance, {node: [cores]})
+        self.__pinned = set()  # id(qemuInstance) of instances whose vCPU threads are pinned
+        if qmpPool is not None:
+            qmpPool.runStateChanged.connect(self.pinVcpus)
+
+    def topology(self):
+        if self.__topology is None:
+            self.__topology = hostTopology()
+        return self.__topology
+
+    def freeCpuCount(self):
+        return sum(len(core) for cores in self.__freeCores().values() for core in cores)
+
+    def allocate(self, qemu):
+        ''' Assigns host CPUs to an instance before launch, sets qemu.cpuSet
+            Returns False, leaving cpuSet empty, if not enough CPUs are free '''
+        self.release(qemu)
+        self.__freeCores()
+        if qemu.smpCores == "ALL":
+            node = max(self.__free, key=lambda n: len(self.__free[n]), default=None)
+            taken = {node: self.__take(node, self.freeCpuCount())} if node is not None and self.__free[node] else {}
+        else:
+            taken = self.__takeCpus(self.requestedCpus(qemu))
+        if not taken:
+            demand = "every free host CPU" if qemu.smpCores == "ALL" else f"{self.requestedCpus(qemu)} host CPUs"
+            print(f"WARNING: QEMU instance {qemu.name} needs {demand} but {self.freeCpuCount()} of "
+                  f"{len(self.topology().cpus)} are free, it runs unpinned and shares CPUs")
+            qemu.cpuSet = []
+            return False
+        self.__allocations[id(qemu)] = (qemu, taken)
+        qemu.cpuSet = sorted(cpu for cores in taken.values() for core in cores for cpu in core)
+        print(f"QEMU instance {qemu.name} assigned host CPUs {formatCpuList(qemu.cpuSet)}")
+        return True
+
+    def release(self, qemu):
+        ''' Returns the CPUs of an instance to the free pool '''
+        entry = self.__allocations.pop(id(qemu), None)
+        self.__pinned.discard(id(qemu))
+        if entry is None:
+            return
+        for (node, cores) in entry[1].items():
+            self.__free[node].extend(cores)
+            self.__free[node].sort()
+
+    def requestedCpus(self, qemu):
+        ''' Returns the number of vCPUs an instance is launched with, QEMU defaults to one '''
+        if qemu.smpCores == "ALL":
+            return len(qemu.cpuSet) or self.freeCpuCount()
+        try:
+            return max(int(qemu.smpCores), 1)
+        except ValueError:
+            return 1
+
+    def pinProcess(self, qemu):
+        ''' Confines every thread of a running instance to its CPU set, threads created later inherit it '''
+        if not qemu.cpuSet or not qemu.pid:
+            return
+        # Main thread first so the threads it creates from now on start confined, then the existing ones
+        # until no new thread shows up (a thread listed as unconfined may have created another meanwhile)
+        pinned = set()
+        threads = {qemu.pid}
+        while threads:
+            for tid in sorted(threads, key=lambda t: t != qemu.pid):
+                self.__setAffinity(qemu, tid, qemu.cpuSet)
+            pinned |= threads
+            threads = self.__threads(qemu.pid) - pinned
+
+    def __threads(self, pid):
+        try:
+            return {int(tid) for tid in os.listdir(f"/proc/{pid}/task")}
+        except OSError:
+            return set()  # Exited
+
+    @Slot(object)
+    def pinVcpus(self, qemu):
+        ''' Pins each vCPU thread of an instance to one CPU of its set, once its QMP connection answers '''
+        if not qemu.cpuSet or not qemu.runState or id(qemu) in self.__pinned or self.__qmpPool is None:
+            return
+        self.__pinned.add(id(qemu))
+
+        def pin(cpus, error):
+            if cpus is None:
+                print(f"ERROR: unable to find the vCPU threads of QEMU instance {qemu.name}: {error}")
+                return
+            for cpu in cpus:
+                self.__setAffinity(qemu, cpu["thread-id"], [qemu.cpuSet[cpu["cpu-index"] % len(qemu.cpuSet)]])
+        self.__qmpPool.queryCpus(qemu, pin)
+
+    def __setAffinity(self, qemu, tid, cpus):
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except ProcessLookupError:
+            pass  # The thread exited
+        except OSError as e:
+            print(f"ERROR: unable to pin QEMU instance {qemu.name} thread {tid} to CPUs {formatCpuList(cpus)}: {e}")
+
+    def __freeCores(self):
+        if self.__free is None:
+            self.__free = {node: list(cores) for (node, cores) in self.topology().nodes.items()}
+        return self.__free
+
+    def __take(self, node, cpuCount):
+        ''' Removes free cores of a node until they hold cpuCount CPUs, returns them '''
+        cores = []
+        while self.__free[node] and cpuCount > 0:
+            core = self.__free[node].pop(0)
+            cores.append(core)
+            cpuCount -= len(core)
+        return cores
+
+    def __takeCpus(self, cpuCount):
+        free = {node: sum(len(core) for core in cores) for (node, cores) in self.__free.items()}
+        if sum(free.values()) < cpuCount:
+            return {}
+        fitting = [node for node in free if free[node] >= cpuCount]
+        if fitting:
+            node = min(fitting, key=lambda n: free[n])  # Tightest fit keeps large nodes for large instances
+            return {node: self.__take(node, cpuCount)}
+        taken = {}
+        for node in sorted(free, key=lambda n: free[n], reverse=True):  # Spans nodes, fewest possible
+            if cpuCount <= 0:
+                break
+            taken[node] = self.__take(node, cpuCount)
+            cpuCount -= sum(len(core) for core in taken[node])
+        return taken
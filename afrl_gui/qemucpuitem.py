@@ -7,6 +7,15 @@ from afrl_gui.qemuparameter import qemuParameter
 
 
 class qemuCpuItem(qemuParameter):
+    __slots__ = ()
+
+    @classmethod
+    def fromCpuDefinitionInfo(cls, info):
+        ''' Creates an item from a QMP query-cpu-definitions CpuDefinitionInfo dict '''
+        desc = info.get("typename", "")
+        if info.get("deprecated"):
+            desc += " (deprecated)"
+        return cls(arg=info["name"], desc=desc, alias=info.get("alias-of", ""))
 
     def __repr__(self):
         '''Returns string representation of the qemu cpu options'''
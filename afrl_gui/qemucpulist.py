@@ -3,29 +3,27 @@
 
 # Class to maintain list of QEMU CPU options
 
-import subprocess
 from afrl_gui.qemuparameterlist import qemuParameterList
+from afrl_gui.qemucapabilitycache import qemuCapabilityCache
 from afrl_gui.qemucpuitem import qemuCpuItem
+from afrl_gui.qemuhelpparser import cpuHelpParser
 
 
 class qemuCpuList(qemuParameterList):
-    def __init__(self):
-        super().__init__()
-        self.initializeList()
-
-    def initializeList(self):
-        qemuOut = subprocess.run(["./qemu-system-aarch64", "-cpu", "?"], capture_output=True)
-        if(qemuOut.returncode != 0):
-            print(f"ERROR: qemu-system-aarch64 -cpu ? returned error code: {qemuOut.returncode}")
+    def __init__(self, cache=None, initialize=True):
+        super().__init__(qemuCpuItem)
+        if initialize:
+            self.initializeList(cache if cache is not None else qemuCapabilityCache())
+
+    def initializeList(self, cache):
+        cpus = cache.query("query-cpu-definitions")
+        if cpus is None:
+            self.insertParameter(qemuCpuItem())  # Insert empty parameter as default value
+            cache.stream(["-cpu", "?"], cpuHelpParser(self))
             return
-        outStr = qemuOut.stdout.decode("utf-8")
-        values = outStr.split('\n')
-        values = values[1:] # Trim off first line/header, TODO specify header for these returns to match and remove
         self.insertParameter(qemuCpuItem())  # Insert empty parameter as default value
-        for v in values:
-            if not v:
-                continue # skip empty strings
-            self.insertParameter(qemuCpuItem(arg=v.strip()))
+        for info in sorted(cpus, key=lambda c: c["name"]):
+            self.insertParameter(qemuCpuItem.fromCpuDefinitionInfo(info))
 
     def __repr__(self):
         '''Returns string representation of the qemu cpu option list '''
@@ -0,0 +1,79 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Search index over every device in a qemuDeviceList, across all device types
+# Device names and aliases are held in a prefix trie, every word of the name, alias, bus and description
+# is held in an inverted token index so a search term can match anywhere in the device listing
+
+import re
+from bisect import bisect_left
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class qemuDeviceIndex:
+    def __init__(self, deviceList):
+        self.__entries = []  # (typeIdx, itemIdx) for each indexed device, entry id is the position
+        self.__names = []  # lower case argument of each entry, used to order results
+        self.__trie = {}  # nested dicts keyed by character, the None key holds the ids under that prefix
+        self.__tokens = {}  # token -> set of entry ids
+        self.__vocabulary = []  # sorted tokens, for prefix ranges over the inverted index
+        for typeIdx, paramList in enumerate(deviceList.deviceLists()):
+            for itemIdx in range(0, len(paramList)):
+                self.__insert(typeIdx, itemIdx, paramList[itemIdx])
+        self.__vocabulary = sorted(self.__tokens)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def search(self, text):
+        ''' Returns the (typeIdx, itemIdx) of every device matching all words of text, name prefix matches first '''
+        terms = TOKEN_PATTERN.findall(text.lower())
+        if not terms:
+            return []
+        matches = None
+        for term in terms:
+            termMatches = self.__tokenPrefix(term)
+            matches = termMatches if matches is None else matches & termMatches
+            if not matches:
+                return []
+        # Devices whose name or alias starts with the query as typed are the most likely pick
+        nameMatches = self.__namePrefix(text.strip().lower()) & matches
+        ranked = sorted(nameMatches, key=self.__names.__getitem__)
+        ranked += sorted(matches - nameMatches, key=self.__names.__getitem__)
+        return [self.__entries[id] for id in ranked]
+
+    def __insert(self, typeIdx, itemIdx, device):
+        id = len(self.__entries)
+        self.__entries.append((typeIdx, itemIdx))
+        self.__names.append(device.argument().lower())
+        for key in (device.argument(), device.alias()):
+            if key:
+                self.__insertTrie(key.lower(), id)
+        words = " ".join((device.argument(), device.alias(), device.bus(), device.description()))
+        for token in TOKEN_PATTERN.findall(words.lower()):
+            self.__tokens.setdefault(token, set()).add(id)
+
+    def __insertTrie(self, key, id):
+        node = self.__trie
+        for c in key:
+            node = node.setdefault(c, {})
+            node.setdefault(None, set()).add(id)
+
+    def __namePrefix(self, prefix):
+        ''' Returns the ids of devices whose name or alias starts with prefix '''
+        node = self.__trie
+        for c in prefix:
+            node = node.get(c)
+            if node is None:
+                return set()
+        return node.get(None, set())
+
+    def __tokenPrefix(self, prefix):
+        ''' Returns the ids of devices with any token starting with prefix '''
+        ids = set()
+        idx = bisect_left(self.__vocabulary, prefix)
+        while idx < len(self.__vocabulary) and self.__vocabulary[idx].startswith(prefix):
+            ids |= self.__tokens[self.__vocabulary[idx]]
+            idx += 1
+        return ids
@@ -7,6 +7,7 @@ from afrl_gui.qemuparameter import qemuParameter
 
 
 class qemuDeviceItem(qemuParameter):
+    __slots__ = ()
 
     def __repr__(self):
         '''Returns string representation of the qemu machine options'''
@@ -3,17 +3,41 @@
 
 # Class to maintain list of QEMU machine (board) options
 
-import re, subprocess
 from afrl_gui.qemuparameterlist import qemuParameterList
+from afrl_gui.qemucapabilitycache import qemuCapabilityCache
 from afrl_gui.qemudeviceitem import qemuDeviceItem
+from afrl_gui.qemudeviceindex import qemuDeviceIndex
+from afrl_gui.qemuhelpparser import deviceHelpParser
+
+# QOM base types that place a device on a pluggable bus, mapped to (device type, bus) for the catalog
+# QMP has no notion of the -device help categories so devices are grouped by the bus they plug into
+DEVICE_BUS_TYPES = {
+    "pci-device": ("PCI", "PCI"),
+    "usb-device": ("USB", "usb-bus"),
+    "virtio-device": ("Virtio", "virtio-bus"),
+    "virtio-serial-port": ("Virtio", "virtio-serial-bus"),
+    "scsi-device": ("Storage", "SCSI"),
+    "ide-device": ("Storage", "IDE"),
+    "sd-card": ("Storage", "sd-bus"),
+    "i2c-slave": ("I2C", "i2c-bus"),
+    "ssi-peripheral": ("SSI", "SSI"),
+    "hda-codec": ("Sound", "HDA"),
+    "ccid-card": ("USB", "ccid-bus"),
+    "isa-device": ("ISA", "ISA"),
+}
+# Board internal QOM base types, these can not be created with -device
+INTERNAL_DEVICE_TYPES = ("sys-bus-device", "cpu")
+UNCATEGORIZED_DEVICE_TYPE = "Uncategorized"
 
 
 class qemuDeviceList():
-    def __init__(self):
+    def __init__(self, cache=None, initialize=True):
         super().__init__()
         self.__deviceTypeList = [] # List of each type of device
         self.__deviceLists = [] # A list of qemuParameterLists, each list corresponding to a type in __deviceTypeList
-        self.initializeList()
+        if initialize:
+            self.initializeList(cache if cache is not None else qemuCapabilityCache())
+        self.__index = qemuDeviceIndex(self)  # Built with the list, which is off the GUI thread when probed
 
     def deviceTypeList(self):
         return self.__deviceTypeList
@@ -21,40 +45,45 @@ class qemuDeviceList():
     def deviceLists(self):
         return self.__deviceLists
 
-    def initializeList(self):
-        qemuOut = subprocess.run(["./qemu-system-aarch64", "-device", "?"], capture_output=True)
-        if(qemuOut.returncode != 0):
-            print(f"ERROR: qemu-system-aarch64 -device ? returned error code: {qemuOut.returncode}")
+    def appendDeviceType(self, deviceType):
+        ''' Adds a device type and returns its empty list of devices '''
+        self.__deviceTypeList.append(deviceType)
+        self.__deviceLists.append(qemuParameterList(qemuDeviceItem))
+        return self.__deviceLists[-1]
+
+    def search(self, text):
+        ''' Returns the (typeIdx, itemIdx) of every device, in any device type, matching the search text '''
+        return self.__index.search(text)
+
+    def initializeList(self, cache):
+        types = cache.query("qom-list-types", {"implements": "device", "abstract": True})
+        if types is None:
+            cache.stream(["-device", "?"], deviceHelpParser(self))
             return
-        outStr = qemuOut.stdout.decode("utf-8")
-        # Parse out all the device candidates
-        values = outStr.split('\n')  # Split into lines, process each line
-        headerPattern = re.compile(r".+ devices")
-        for v in values:
-            if not v:
-                continue  # skip empty strings
-            # Check for a new device type
-            header = headerPattern.match(v)
-            if header is not None:
-                type = re.split(r"\sdevices:", v, maxsplit=1)
-                self.__deviceTypeList.append(type[0])
-                self.__deviceLists.append(qemuParameterList())
-                continue  # Check Next line
-            # Must be a device listing
-            listIdx = len(self.__deviceLists) - 1
-            params = v.split(',')
-            device = qemuDeviceItem()
-            for p in params:
-                p = p.strip()
-                if p.find("name") == 0:
-                    device.setArgument(p.replace('name "', '').strip('"').strip())
-                if p.find("bus") == 0:
-                    device.setBus(p.replace('bus ', '').strip())
-                if p.find("desc") == 0:
-                    device.setDescription(p.replace('desc "', '').strip('"').strip())
-                if p.find("alias") == 0:
-                    device.setAlias(p.replace('alias "', '').strip('"').strip())
-            self.__deviceLists[listIdx].insertParameter(device)
+        parents = {t["name"]: t.get("parent", "") for t in types}
+        categorized = {}
+        for t in sorted(types, key=lambda t: t["name"]):
+            if t.get("abstract"):
+                continue
+            (deviceType, bus) = self.classifyType(t["name"], parents)
+            if deviceType is None:
+                continue
+            if deviceType not in categorized:
+                categorized[deviceType] = qemuParameterList(qemuDeviceItem)
+            categorized[deviceType].insert(arg=t["name"], bus=bus)
+        for deviceType in sorted(categorized):
+            self.__deviceTypeList.append(deviceType)
+            self.__deviceLists.append(categorized[deviceType])
+
+    def classifyType(self, name, parents):
+        ''' Walks the QOM ancestry of name, returning its (device type, bus) or (None, None) for internal devices '''
+        while name:
+            if name in DEVICE_BUS_TYPES:
+                return DEVICE_BUS_TYPES[name]
+            if name in INTERNAL_DEVICE_TYPES:
+                return (None, None)
+            name = parents.get(name, "")
+        return (UNCATEGORIZED_DEVICE_TYPE, "")
 
     def __repr__(self):
         '''Returns string representation of the qemu device option list '''
@@ -0,0 +1,127 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Copy-on-write qcow2 overlays giving every instance its own writable view of a shared base image
+# The base image is only ever read, guest writes go to OVERLAY_ROOT/<instance>.qcow2 which holds only the
+# clusters the guest changed, so an instance costs a qemu-img run and a few hundred KB instead of an image copy
+# Overlays are created by qemu-img on the event loop before QEMU starts, "discard" overlays are deleted when
+# the instance stops and "keep" overlays are reused by its next launch so the guest sees its earlier changes
+# An instance restored from a saved state gets a new overlay over the disk saved with that state instead
+
+import os, re, struct
+from PySide6.QtCore import QObject, QProcess, Signal
+from afrl_gui.common import OVERLAY_ROOT, QEMU_IMG_BINARY
+
+# Disk change handling, in the order of the launch wizard dropdown
+OVERLAY_DISCARD = "discard"  # Overlay deleted when the instance stops
+OVERLAY_KEEP = "keep"  # Overlay kept and reused by the next launch
+OVERLAY_NONE = "none"  # No overlay, the guest writes to the image itself
+OVERLAY_MODES = (OVERLAY_DISCARD, OVERLAY_KEEP, OVERLAY_NONE)
+
+QCOW2_MAGIC = b"QFI\xfb"
+
+
+def imageFormat(path):
+    ''' Returns "qcow2" for qcow2 images, "raw" for anything else '''
+    try:
+        with open(path, 'rb') as fin:
+            return "qcow2" if fin.read(4) == QCOW2_MAGIC else "raw"
+    except OSError:
+        return "raw"
+
+
+def backingFile(path):
+    ''' Returns the backing file named in the header of a qcow2 image, "" if it has none or is not qcow2 '''
+    try:
+        with open(path, 'rb') as fin:
+            header = fin.read(20)
+            if len(header) < 20 or header[:4] != QCOW2_MAGIC:
+                return ""
+            (offset, size) = struct.unpack(">QI", header[8:20])
+            fin.seek(offset)
+            return fin.read(size).decode("utf-8", "replace") if offset else ""
+    except OSError:
+        return ""
+
+
+class qemuOverlayManager(QObject):
+    ready = Signal(object, str)  # qemuInstance whose overlay was being created, "" once it exists or the error
+
+    def __init__(self, overlayRoot=OVERLAY_ROOT, qemuImg=QEMU_IMG_BINARY, parent=None):
+        super().__init__(parent)
+        self.__overlayRoot = overlayRoot
+        self.__qemuImg = qemuImg
+        self.__creating = {}  # qemu-img QProcess -> (qemuInstance, overlay path), instance None once it stopped
+
+    def overlayPath(self, qemu):
+        return os.path.join(self.__overlayRoot, (re.sub(r"[^\w.-]", "_", qemu.name) or str(id(qemu))) + ".qcow2")
+
+    def prepare(self, qemu):
+        ''' Called by qemuSupervisor before launch, sets qemu.overlay, raises OSError if it cannot be created
+            Returns True while qemu-img creates the overlay, ready is emitted once it is done '''
+        qemu.overlay = ""
+        if qemu.imageName == "" or qemu.imageOverlay == OVERLAY_NONE:
+            return False
+        base = os.path.realpath(qemu.restoreDisk or qemu.imageName)
+        path = self.overlayPath(qemu)
+        qemu.overlay = path
+        if os.path.exists(path):
+            if qemu.imageOverlay == OVERLAY_KEEP and backingFile(path) == base and not qemu.restoreDisk:
+                return False  # Kept from the last run
+            if qemu.imageOverlay == OVERLAY_KEEP and qemu.restoreDisk:
+                print(f"WARNING: QEMU instance {qemu.name} restores its saved state, the changes kept in {path} are dropped")
+            elif qemu.imageOverlay == OVERLAY_KEEP:
+                print(f"WARNING: QEMU instance {qemu.name} image changed to {base}, the changes kept in {path} are dropped")
+            os.remove(path)
+        os.makedirs(self.__overlayRoot, exist_ok=True)
+        process = QProcess(self)
+        process.setProgram(self.__qemuImg)
+        # Absolute backing path so the overlay does not depend on the working directory
+        process.setArguments(["create", "-q", "-f", "qcow2", "-b", base, "-F", imageFormat(base), path])
+        process.setStandardInputFile(QProcess.nullDevice())
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        process.finished.connect(self.__created)
+        process.errorOccurred.connect(self.__error)
+        self.__creating[process] = (qemu, path)
+        process.start()
+        return True
+
+    def release(self, qemu):
+        ''' Called by qemuSupervisor once an instance stopped, deletes its overlay unless it is kept '''
+        for (process, (creating, path)) in self.__creating.items():
+            if creating is qemu:
+                self.__creating[process] = (None, path)  # Stopped before its overlay existed, removed once created
+                return
+        if qemu.overlay and qemu.imageOverlay != OVERLAY_KEEP:
+            self.__remove(qemu.overlay)
+
+    def __created(self, exitCode, exitStatus):
+        process = self.sender()
+        (qemu, path) = self.__creating.pop(process)
+        output = process.readAll().data().decode("utf-8", "replace").strip()
+        process.deleteLater()
+        if exitStatus != QProcess.NormalExit or exitCode != 0:
+            self.__remove(path)
+            if qemu is not None:
+                self.ready.emit(qemu, f"unable to create disk overlay {path}: {output or f'qemu-img exited with {exitCode}'}")
+        elif qemu is None:
+            self.__remove(path)
+        else:
+            self.ready.emit(qemu, "")
+
+    def __error(self, error):
+        if error != QProcess.FailedToStart:
+            return  # Failures once running are reported through finished
+        process = self.sender()
+        (qemu, path) = self.__creating.pop(process)
+        process.deleteLater()
+        if qemu is not None:
+            self.ready.emit(qemu, f"unable to run {self.__qemuImg}: {process.errorString()}")
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"ERROR: unable to remove disk overlay {path}: {e}")
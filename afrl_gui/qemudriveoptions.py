@@ -0,0 +1,55 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Block I/O settings of the guest drive: host page cache mode, asynchronous I/O engine, discard and zero
+# write detection, and per drive throttling; "" leaves a setting at the QEMU default
+# QEMU refuses aio=native without O_DIRECT (cache none or directsync) and detect-zeroes=unmap without
+# discard=unmap, driveOptionsError() reports those combinations before launch
+
+# Choices, in the order of the launch wizard dropdowns
+DRIVE_CACHE_NONE = "none"
+DRIVE_CACHES = ("", "writeback", DRIVE_CACHE_NONE, "writethrough", "directsync", "unsafe")
+DIRECT_CACHES = (DRIVE_CACHE_NONE, "directsync")  # Modes bypassing the host page cache with O_DIRECT
+DRIVE_AIO_NATIVE = "native"
+DRIVE_AIOS = ("", "threads", DRIVE_AIO_NATIVE, "io_uring")
+DETECT_ZEROES_UNMAP = "unmap"
+DETECT_ZEROES = ("", "on", DETECT_ZEROES_UNMAP)
+
+DRIVE_ID = "disk0"  # Id of the guest drive, the device QMP block jobs run on
+
+MB = 1024 * 1024
+
+
+def driveOptionsError(qemu):
+    ''' Returns "" if QEMU accepts the drive settings of an instance, otherwise what is wrong with them '''
+    if qemu.driveCache not in DRIVE_CACHES:
+        return f"drive cache must be one of {', '.join(c for c in DRIVE_CACHES if c)}"
+    if qemu.driveAio not in DRIVE_AIOS:
+        return f"drive aio must be one of {', '.join(a for a in DRIVE_AIOS if a)}"
+    if qemu.driveDetectZeroes not in DETECT_ZEROES:
+        return f"drive detect-zeroes must be one of {', '.join(z for z in DETECT_ZEROES if z)}"
+    if qemu.driveAio == DRIVE_AIO_NATIVE and qemu.driveCache not in DIRECT_CACHES:
+        return f"drive aio native needs cache {' or '.join(DIRECT_CACHES)}"
+    if qemu.driveDetectZeroes == DETECT_ZEROES_UNMAP and not qemu.driveDiscard:
+        return "drive detect-zeroes unmap needs discard"
+    if int(qemu.driveIops) < 0 or int(qemu.driveBandwidth) < 0:
+        return "drive throttling limits cannot be negative"
+    return ""
+
+
+def driveOptions(qemu):
+    ''' Returns the -drive suboptions of the block I/O settings of an instance '''
+    options = []
+    if qemu.driveCache:
+        options.append(f"cache={qemu.driveCache}")
+    if qemu.driveAio:
+        options.append(f"aio={qemu.driveAio}")
+    if qemu.driveDiscard:
+        options.append("discard=unmap")  # Guest TRIM frees overlay clusters and host blocks
+    if qemu.driveDetectZeroes:
+        options.append(f"detect-zeroes={qemu.driveDetectZeroes}")
+    if int(qemu.driveIops):
+        options.append(f"throttling.iops-total={int(qemu.driveIops)}")
+    if int(qemu.driveBandwidth):
+        options.append(f"throttling.bps-total={int(qemu.driveBandwidth) * MB}")
+    return options
@@ -0,0 +1,166 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Fleet manifest, a JSON (or YAML, when PyYAML is installed) description of many QEMU instances
+#
+#   {
+#     "defaults": {"machine": "xlnx-zcu102", "memory": 1024, "subnetMask": "255.255.255.0"},
+#     "launch": {"parallelism": 4, "rampUp": 2},
+#     "instances": [
+#       {"name": "node", "count": 16, "ipAddress": "10.0.0.10", "kernel": "images/Image",
+#        "devices": [{"type": "e1000", "settings": ["netdev=net{index}"]}],
+#        "overrides": {"0": {"memory": 2048}}},
+#       {"name": "gateway", "ipAddress": "10.0.0.1"}
+#     ]
+#   }
+#
+# Each group expands into `count` instances. Text fields may use {index} (0 based) and {number} (1 based),
+# a group name without either gets a "-{number}" suffix when count > 1, ipAddress increments by ipStep
+# per instance, overrides replace fields of single instances by index
+# Relative kernel and image paths are relative to the manifest file
+
+import ipaddress, json, os
+from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.common import BATCH_PARALLELISM, BATCH_RAMP_UP
+from afrl_gui.hostmemory import MEMORY_BACKENDS
+from afrl_gui.qemuaccelerator import ACCELERATORS, TCG_THREADS
+from afrl_gui.qemudiskoverlay import OVERLAY_MODES
+from afrl_gui.qemudriveoptions import driveOptionsError
+
+TEXT_FIELDS = ("name", "description", "machine", "cpu", "kernel", "application", "imageName", "interfaceName",
+               "imageOverlay", "driveCache", "driveAio", "driveDetectZeroes", "memoryBackend", "hugepagePath",
+               "accelerator", "tcgThreads")
+LIST_FIELDS = ("machineSettings", "cpuSettings")
+ADDRESS_FIELDS = ("ipAddress", "gateway", "subnetMask")
+PATH_FIELDS = ("kernel", "imageName")
+GROUP_KEYS = ("count", "ipStep", "overrides", "devices", "smpCores", "memory", "memoryPrealloc", "tbSize",
+              "driveDiscard", "driveIops", "driveBandwidth") + TEXT_FIELDS + LIST_FIELDS + ADDRESS_FIELDS
+
+
+class manifestError(Exception):
+    ''' Raised when a fleet manifest cannot be read or describes invalid instances '''
+
+
+class qemuFleetManifest:
+    def __init__(self, data, baseDirectory="", path=""):
+        self.path = path  # File the manifest was read from, "" if it was not
+        if not isinstance(data, dict) or not isinstance(data.get("instances"), list):
+            raise manifestError(f"{self.__source()} needs an 'instances' list")
+        defaults = data.get("defaults", {})
+        if not isinstance(defaults, dict):
+            raise manifestError(f"{self.__source()}: defaults is not a mapping")
+        # Checked like the groups, a misspelled default would otherwise be merged into every group and ignored
+        unknown = set(defaults) - set(GROUP_KEYS)
+        if unknown:
+            raise manifestError(f"{self.__source()}: defaults have unknown fields: {', '.join(sorted(unknown))}")
+        self.__data = data
+        self.baseDirectory = baseDirectory
+        launch = data.get("launch", {})
+        self.parallelism = int(launch.get("parallelism", BATCH_PARALLELISM))
+        self.rampUp = float(launch.get("rampUp", BATCH_RAMP_UP))  # Launches per second, 0 is unlimited
+        if self.parallelism < 1:
+            raise manifestError("launch parallelism must be at least 1")
+
+    @classmethod
+    def load(cls, path):
+        ''' Reads a manifest file, YAML if its extension is .yaml or .yml, JSON otherwise '''
+        yaml = None
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise manifestError("YAML manifests need PyYAML, install it or use JSON")
+        errors = (OSError, ValueError) + ((yaml.YAMLError,) if yaml is not None else ())
+        try:
+            with open(path, 'r', encoding="utf-8") as fin:
+                data = yaml.safe_load(fin) if yaml is not None else json.load(fin)
+        except errors as e:
+            raise manifestError(f"unable to read fleet manifest {path}: {e}")
+        return cls(data, os.path.dirname(os.path.abspath(path)), path)
+
+    def instances(self):
+        ''' Returns the qemuInstances described by the manifest, raises manifestError on invalid entries '''
+        defaults = self.__data.get("defaults", {})
+        instances = []
+        names = set()
+        for (groupIndex, group) in enumerate(self.__data["instances"]):
+            if not isinstance(group, dict):
+                raise manifestError(f"instance group {groupIndex} is not a mapping")
+            unknown = set(group) - set(GROUP_KEYS)
+            if unknown:
+                raise manifestError(f"{self.__source()}: instance group {groupIndex} has unknown fields: "
+                                    f"{', '.join(sorted(unknown))}")
+            template = dict(defaults, **group)
+            name = str(template.get("name", ""))
+            if not name:
+                raise manifestError(f"instance group {groupIndex} has no name")
+            try:
+                count = int(template.get("count", 1))
+                if count > 1 and "{index" not in name and "{number" not in name:
+                    template["name"] = name + "-{number}"
+                overrides = group.get("overrides", {})
+                for index in range(count):
+                    fields = dict(template, **overrides.get(str(index), {}))
+                    qemu = self.__instance(fields, index)
+                    if qemu.name in names:
+                        raise manifestError(f"instance name {qemu.name} is used more than once")
+                    names.add(qemu.name)
+                    instances.append(qemu)
+            except (TypeError, ValueError, KeyError, AttributeError) as e:
+                raise manifestError(f"instance group {name}: invalid value: {e}")
+        return instances
+
+    def __source(self):
+        return f"fleet manifest {self.path}" if self.path else "fleet manifest"
+
+    def __instance(self, fields, index):
+        def expand(value):
+            try:
+                return str(value).format(index=index, number=index + 1)
+            except (KeyError, IndexError, ValueError) as e:
+                raise manifestError(f"invalid placeholder in '{value}': {e}")
+
+        qemu = qemuInstance()
+        for field in TEXT_FIELDS:
+            if field in fields:
+                setattr(qemu, field, expand(fields[field]))
+        for field in PATH_FIELDS:
+            value = getattr(qemu, field)
+            if value and not os.path.isabs(value):
+                setattr(qemu, field, os.path.join(self.baseDirectory, value))
+        for field in LIST_FIELDS:
+            setattr(qemu, field, [expand(s) for s in fields.get(field, [])])
+        if "smpCores" in fields:
+            qemu.smpCores = str(fields["smpCores"])
+        if "memory" in fields:
+            qemu.memory = int(fields["memory"])
+        if qemu.memoryBackend not in MEMORY_BACKENDS:
+            raise manifestError(f"{qemu.name}: memoryBackend must be one of {', '.join(b for b in MEMORY_BACKENDS if b)}")
+        qemu.memoryPrealloc = bool(fields.get("memoryPrealloc", False))
+        if qemu.accelerator not in ACCELERATORS or qemu.tcgThreads not in TCG_THREADS:
+            raise manifestError(f"{qemu.name}: accelerator must be tcg or kvm, tcgThreads multi or single")
+        qemu.tbSize = int(fields.get("tbSize", 0))
+        if qemu.imageOverlay not in OVERLAY_MODES:
+            raise manifestError(f"{qemu.name}: imageOverlay must be one of {', '.join(OVERLAY_MODES)}")
+        qemu.driveDiscard = bool(fields.get("driveDiscard", False))
+        qemu.driveIops = int(fields.get("driveIops", 0))
+        qemu.driveBandwidth = int(fields.get("driveBandwidth", 0))
+        error = driveOptionsError(qemu)
+        if error:
+            raise manifestError(f"{qemu.name}: {error}")
+        for entry in fields.get("devices", []):
+            if isinstance(entry, str):
+                entry = {"type": entry}
+            qemu.devices.append(expand(entry["type"]))
+            qemu.deviceSettings.append([expand(s) for s in entry.get("settings", [])])
+        for field in ADDRESS_FIELDS:
+            if field not in fields:
+                continue
+            try:
+                address = ipaddress.ip_address(fields[field])
+                if field == "ipAddress":
+                    address += index * int(fields.get("ipStep", 1))
+            except ValueError as e:
+                raise manifestError(f"{qemu.name}: invalid {field}: {e}")
+            getattr(qemu, field).setAddress(str(address))
+        return qemu
@@ -0,0 +1,179 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Streaming parsers for QEMU help output ('-machine ?', '-cpu ?', '-device ?')
+# Output is fed in chunks as QEMU writes it, each complete line is parsed once and its entry inserted
+# straight into the parameter list, the full output is never split or copied for parsing
+
+import codecs, re
+from PySide6.QtCore import QObject, QProcess, Signal
+
+HELP_TIMEOUT = 30000  # Milliseconds to wait on a QEMU help process before giving up
+DEVICE_HEADER_SUFFIX = " devices:"
+# One 'key "quoted value"' or 'key value' field of a '-device ?' listing, including the trailing separator
+DEVICE_FIELD_PATTERN = re.compile(r'(\w+) (?:"([^"]*)"|([^,]*))(?:,\s*|$)')
+
+
+class qemuHelpParser:
+    def __init__(self, parseLine, headerLines=0):
+        self.__parseLine = parseLine  # called with each complete line of output
+        self.__decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.__partial = []  # pieces of a line split across chunks
+        self.__skip = headerLines  # leading lines to discard before parsing
+        self.__stopped = False
+
+    def feed(self, chunk):
+        ''' Parses a chunk of raw output bytes, a trailing partial line is held until the next chunk '''
+        self.feedText(self.__decoder.decode(chunk))
+
+    def feedText(self, text):
+        ''' Parses a chunk of already decoded output '''
+        start = 0
+        end = text.find("\n")
+        while end >= 0:
+            line = text[start:end]
+            if self.__partial:
+                self.__partial.append(line)
+                line = "".join(self.__partial)
+                self.__partial = []
+            self.__parse(line)
+            start = end + 1
+            end = text.find("\n", start)
+        if start < len(text):
+            self.__partial.append(text[start:])
+
+    def finish(self):
+        ''' Parses whatever is left once the output has ended '''
+        self.feedText(self.__decoder.decode(b"", final=True))
+        if self.__partial:
+            line = "".join(self.__partial)
+            self.__partial = []
+            self.__parse(line)
+
+    def stop(self):
+        ''' Ignores the rest of the output '''
+        self.__stopped = True
+
+    def __parse(self, line):
+        if self.__stopped:
+            return
+        if self.__skip:
+            self.__skip -= 1
+            return
+        self.__parseLine(line.rstrip("\r"))
+
+
+class machineHelpParser(qemuHelpParser):
+    def __init__(self, paramList):
+        super().__init__(self.__parseLine, headerLines=1)  # 'Supported machines are:'
+        self.__paramList = paramList
+
+    def __parseLine(self, line):
+        if not line:
+            return
+        v = line.split(maxsplit=1)
+        if len(v) != 2:  # Each machine should be a arg, description pair so stop parsing on error or end of pairs
+            self.stop()
+            return
+        self.__paramList.insert(arg=v[0], desc=v[1])
+
+
+class cpuHelpParser(qemuHelpParser):
+    def __init__(self, paramList):
+        super().__init__(self.__parseLine, headerLines=1)  # 'Available CPUs:'
+        self.__paramList = paramList
+
+    def __parseLine(self, line):
+        line = line.strip()
+        if line:
+            self.__paramList.insert(arg=line)
+
+
+class deviceHelpParser(qemuHelpParser):
+    def __init__(self, deviceList):
+        super().__init__(self.__parseLine)
+        self.__deviceList = deviceList
+        self.__paramList = None  # list of the device type currently being listed
+
+    def __parseLine(self, line):
+        if not line:
+            return
+        if line.endswith(DEVICE_HEADER_SUFFIX):
+            self.__paramList = self.__deviceList.appendDeviceType(line[:-len(DEVICE_HEADER_SUFFIX)])
+            return
+        fields = {}
+        for m in DEVICE_FIELD_PATTERN.finditer(line):
+            fields[m.group(1)] = m.group(2) if m.group(2) is not None else m.group(3).strip()
+        if "name" not in fields:
+            return
+        if self.__paramList is None:
+            self.__paramList = self.__deviceList.appendDeviceType("Uncategorized")
+        self.__paramList.insert(fields["name"], fields.get("desc", ""), fields.get("bus", ""), fields.get("alias", ""))
+
+
+class qemuHelpProcess(QObject):
+    finished = Signal(bool)  # True if QEMU exited normally
+
+    def __init__(self, binary, args, parser, parent=None):
+        super().__init__(parent)
+        self.__binary = binary
+        self.__args = args
+        self.__parser = parser
+        self.__chunks = []  # decoded output, kept for the capability cache
+        self.__decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.__ok = False
+        self.__process = QProcess(self)
+        self.__process.setProgram(binary)
+        self.__process.setArguments(args)
+        self.__process.setStandardErrorFile(QProcess.nullDevice())
+        self.__process.readyReadStandardOutput.connect(self.__read)
+        self.__process.finished.connect(self.__finish)
+        self.__process.errorOccurred.connect(self.__error)
+
+    def start(self):
+        ''' Starts QEMU, output is parsed as it arrives and finished is emitted at the end '''
+        self.__process.start()
+
+    def run(self):
+        ''' Runs QEMU to completion on the calling thread, for worker threads without an event loop
+            Returns the full output text, None on failure '''
+        self.__process.start()
+        if not self.__process.waitForStarted(HELP_TIMEOUT):
+            return None
+        while self.__process.waitForReadyRead(HELP_TIMEOUT):
+            pass  # readyRead is delivered to __read while waiting
+        if self.__process.state() != QProcess.NotRunning and not self.__process.waitForFinished(HELP_TIMEOUT):
+            print(f"ERROR: {self.__binary} {' '.join(self.__args)} timed out")
+            self.__process.kill()
+            self.__process.waitForFinished()
+            return None
+        return self.output()
+
+    def output(self):
+        ''' Returns the full output text once QEMU has exited normally, None otherwise '''
+        if not self.__ok:
+            return None
+        return "".join(self.__chunks)
+
+    def __read(self):
+        text = self.__decoder.decode(self.__process.readAllStandardOutput().data())
+        if text:
+            self.__chunks.append(text)
+            self.__parser.feedText(text)
+
+    def __finish(self, exitCode, exitStatus):
+        self.__read()
+        text = self.__decoder.decode(b"", final=True)
+        if text:
+            self.__chunks.append(text)
+            self.__parser.feedText(text)
+        self.__parser.finish()
+        self.__ok = exitStatus == QProcess.NormalExit and exitCode == 0
+        if exitStatus == QProcess.NormalExit and exitCode != 0:
+            print(f"ERROR: qemu-system-aarch64 {' '.join(self.__args)} returned error code: {exitCode}")
+        self.finished.emit(self.__ok)
+
+    def __error(self, error):
+        if error == QProcess.FailedToStart:
+            print(f"ERROR: unable to run {self.__binary}: {self.__process.errorString()}")
+            self.finished.emit(False)
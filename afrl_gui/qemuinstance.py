@@ -3,10 +3,15 @@
 
 from PySide6.QtCore import QObject
 from PySide6.QtNetwork import QHostAddress
-import subprocess
+import shlex
+from afrl_gui.common import CONFIG_ROOT
+from afrl_gui.qemuaccelerator import acceleratorOption
+from afrl_gui.qemudriveoptions import driveOptions
+from afrl_gui.qemuconfigcompiler import compileArguments, writeConfig
 
 class qemuInstance(QObject):
     def __init__(self):
+        super().__init__()
         self.name = ""
         self.description = ""
         self.interfaceName = ""
@@ -16,15 +21,44 @@ class qemuInstance(QObject):
         self.kernel = ""
         self.application = ""
         self.imageName = ""
+        self.imageOverlay = "discard"  # Guest disk writes go to an overlay, "discard" or "keep" it on shutdown, "none" writes the image
+        # Block I/O settings of the drive, see qemudriveoptions
+        self.driveCache = ""  # Host page cache mode (writeback, none, writethrough, directsync, unsafe)
+        self.driveAio = ""  # Asynchronous I/O engine (threads, native, io_uring)
+        self.driveDiscard = False  # Pass guest discards (TRIM) down to the image
+        self.driveDetectZeroes = ""  # Turn zero writes into zero clusters ("on") or discards ("unmap")
+        self.driveIops = 0  # I/O operations per second limit, 0 is unlimited
+        self.driveBandwidth = 0  # MB per second limit, 0 is unlimited
         self.machine = ""
         self.machineSettings = []
         self.cpu = ""
         self.smpCores = ""
         self.cpuSettings = []
-        self.memory = "4M"
+        self.memory = 4  # MB
+        self.accelerator = ""  # "tcg" or "kvm", "" picks KVM when the host can run the guest natively
+        self.tcgThreads = ""  # "multi" or "single" TCG translation threads, "" picks from the vCPU and host CPU counts
+        self.tbSize = 0  # MB of TCG translation cache, 0 uses TCG_TB_SIZE
+        self.memoryBackend = ""  # Guest RAM backend, "" (QEMU allocated), "memfd" or "hugetlbfs"
+        self.memoryPrealloc = False  # Touch all guest RAM at startup instead of on first use
+        self.hugepagePath = ""  # hugetlbfs mount of the "hugetlbfs" backend, picked at launch if empty
         self.devices = []
         self.deviceSettings = []  # List of deviceSetting lists, index match devices[] list
         self.status = ""
+        # Process details, maintained by qemuSupervisor
+        self.pid = 0
+        self.exitCode = None
+        self.error = ""
+        self.logFile = ""
+        self.cpuSet = []  # Host CPUs the instance is pinned to, assigned by qemuCpuAllocator
+        self.qmpSocket = ""  # QMP unix socket path, QEMU is launched listening on it
+        self.serialSocket = ""  # Unix socket path of the first serial port, QEMU is launched listening on it
+        self.runState = ""  # Guest run state reported over QMP (running, paused, shutdown...)
+        self.launchTime = 0.0  # time.monotonic() of the last launch
+        self.bootTime = None  # Seconds from the last launch until BOOT_MARKER was on the console, set by qemuConsolePool
+        self.overlay = ""  # qcow2 overlay over imageName the guest writes to, set by qemuOverlayManager
+        self.incoming = ""  # Migration URI of the saved state the guest is restored from, set by qemuSnapshotStore
+        self.restoreDisk = ""  # Saved disk state the overlay is created over instead of imageName, set by qemuSnapshotStore
+        self.telemetry = None  # telemetryHistory of host resource use, maintained by qemuTelemetrySampler
 
     def __repr__(self):
         '''Returns string representation of the qemu instance class'''
@@ -32,98 +66,37 @@ class qemuInstance(QObject):
                    \nDescription: {self.description}
                    \nMachine: {self.machine}
                    \nCPU: {self.cpu}
+                   \nAccel: {acceleratorOption(self)}
                    \nSMP Cores: {self.smpCores}
-                   \nMem: {self.memory}M
+                   \nHost CPUs: {self.cpuSet}
+                   \nMem: {self.memory}M {self.memoryBackend}{" prealloc" if self.memoryPrealloc else ""}
                    \nIP: {self.ipAddress.toString()}
-                   \nImage: {self.imageName}
+                   \nImage: {self.imageName} ({self.imageOverlay} changes) {",".join(driveOptions(self))}
                    \nKernel: {self.kernel}
                    \nApplication: {self.application}
                    \nStatus: {self.status}""")
 
-    def fieldCount(self):
-        '''Returns the number of displayable fields for table views, update as necessary'''
-        return 4
+    def statusText(self):
+        '''Returns the status with its process details for display'''
+        if self.pid and self.exitCode is None:
+            if self.runState and self.runState != "running":
+                return f"{self.status} (pid {self.pid}, {self.runState})"
+            return f"{self.status} (pid {self.pid})"
+        if self.exitCode is not None:
+            return f"{self.status} ({self.exitCode})"
+        if self.error:
+            return f"{self.status}: {self.error}"
+        return self.status
+
+    def arguments(self):
+        '''Generates the qemu-system-aarch64 arguments to launch this instance, one list entry per argument'''
+        return compileArguments(self)
 
     def commandLine(self):
-        '''Generates the qemu-system-aarch64 command line to launch this instance'''
-        cmdLine = "qemu-system-aarch64"
-        # Setup Machine
-        if self.machine != "":
-            cmdLine += f" -machine {self.machine}"
-            for s in self.machineSettings:
-                cmdLine += f",{s}"
-
-        # Setup CPU
-        if self.cpu != "":
-            cmdLine += f" -cpu {self.cpu}"
-            for s in self.cpuSettings:
-                cmdLine += f",{s}"
-
-        if self.smpCores == "ALL":
-            cmdLine += " -smp $(nproc)"
-        elif self.smpCores != "" and self.smpCores != "0":
-            cmdLine += f" -smp {self.smpCores}"
-
-        # Setup Memory
-        cmdLine += f" -m {self.memory}M"  # Always using MB for simplicity
-
-        # Setup devices
-        deviceIdx = 0
-        for d in self.devices:
-            cmdLine += f" -device {d}"
-            for s in self.deviceSettings[deviceIdx]:
-                cmdLine += f",{s}"
-            deviceIdx += 1
-
-        # Setup drive
-        # Currently constrained to single zcu106 SD image setup
-        if self.imageName != "":
-            cmdLine += f" -drive if=sd,format=raw,index=1,file={self.imageName}"
-        return cmdLine
-
-    def generateCfgFile(self):
-        ''' Generates an INI formatted config file for the -readconfig option '''
-        subprocess.run(["mkdir", "-p", "./configs"])
-        fout = open(f"{self.name}.cfg",'w',encoding="utf-8")
-        
-
-        # Setup Machine
-        if self.machine != "":
-            fout.write("[machine]\n")
-            fout.write(f"    type={self.machine}\n")
-            for s in self.machineSettings:
-                fout.write(f"    {s}")
-
-        # Setup CPU
-        if self.cpu != "":
-            fout.write(f"[cpu]\n")
-            fout.write(f"    type={self.cpu}\n")
-            for s in self.cpuSettings:
-                fout.write(f"    {s}")
-        if self.smpCores != "":
-            fout.write("[smp-opts]\n")
-            if self.smpCores == "ALL":
-                fout.write("    cpus=$(nproc)\n")
-            elif self.smpCores != "0":
-                fout.write(f"    cpus={self.smpCores}\n")
-
-        # Setup Memory
-        fout.write(f"[memory]\n    size={self.memory}M\n")  # Always using MB for simplicity
-
-        # Setup drive
-        # Currently constrained to single zcu106 SD image setup
-        if self.imageName != "":
-            fout.write("[drive]\n")
-            fout.write("    if=\"sd\"\n    format=\"raw\"\n    index=\"1\"\n")
-            fout.write(f"file={self.imageName}")
-
-        # Setup devices
-        deviceIdx = 0
-        for d in self.devices:
-            cmdLine += f" -device {d}"
-            for s in self.deviceSettings[deviceIdx]:
-                cmdLine += f",{s}"
-            deviceIdx += 1
-        
-
+        '''Generates the qemu-system-aarch64 command line to launch this instance, quoted for display'''
+        return shlex.join(["qemu-system-aarch64"] + self.arguments())
 
+    def generateCfgFile(self, directory=CONFIG_ROOT):
+        ''' Generates an INI formatted config file for the -readconfig option, shared by instances with the same
+            guest definition, returns the arguments launching this instance with it '''
+        return writeConfig(self, directory)
@@ -0,0 +1,78 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Registry of QEMU instances in table row order, indexed by name and by pid
+# Inserts and lookups are constant time, removal shifts the rows below the removed one up (linear in the rows
+# below it, cheap at table sizes) so every instance keeps its order; there is no fixed limit on the number of instances
+
+class qemuInstanceRegistry:
+    def __init__(self):
+        self.__instances = []  # qemuInstances in row order
+        self.__rows = {}  # instance name -> row
+        self.__pids = {}  # pid -> instance name, for instances with a running process
+        self.__pidOf = {}  # instance name -> pid it is indexed under
+
+    def __len__(self):
+        return len(self.__instances)
+
+    def __getitem__(self, row):
+        return self.__instances[row]
+
+    def __iter__(self):
+        return iter(self.__instances)
+
+    def __contains__(self, name):
+        return name in self.__rows
+
+    def add(self, qemu):
+        ''' Appends an instance, returns its row or -1 if the name is already registered '''
+        if qemu.name in self.__rows:
+            return -1
+        row = len(self.__instances)
+        self.__instances.append(qemu)
+        self.__rows[qemu.name] = row
+        self.updatePid(qemu)
+        return row
+
+    def remove(self, name):
+        ''' Removes the named instance, the rows below it move up by one
+            Returns the row removed from, -1 if name is not registered '''
+        row = self.__rows.pop(name, -1)
+        if row < 0:
+            return -1
+        pid = self.__pidOf.pop(name, 0)
+        if pid:
+            del self.__pids[pid]
+        del self.__instances[row]
+        for i in range(row, len(self.__instances)):
+            self.__rows[self.__instances[i].name] = i
+        return row
+
+    def rowOf(self, name):
+        ''' Returns the row of the named instance, -1 if not registered '''
+        return self.__rows.get(name, -1)
+
+    def find(self, name):
+        ''' Returns the named instance, None if not registered '''
+        row = self.__rows.get(name, -1)
+        return self.__instances[row] if row >= 0 else None
+
+    def findPid(self, pid):
+        ''' Returns the instance whose process has pid, None if no instance has it '''
+        name = self.__pids.get(pid)
+        return self.find(name) if name is not None else None
+
+    def updatePid(self, qemu):
+        ''' Re-indexes an instance after its process started or exited '''
+        if self.__rows.get(qemu.name, -1) < 0 or self.__instances[self.__rows[qemu.name]] is not qemu:
+            return
+        old = self.__pidOf.get(qemu.name, 0)
+        if old == qemu.pid:
+            return
+        if old:
+            del self.__pids[old]
+        if qemu.pid:
+            self.__pids[qemu.pid] = qemu.name
+            self.__pidOf[qemu.name] = qemu.pid
+        else:
+            self.__pidOf.pop(qemu.name, None)
@@ -20,13 +20,22 @@ from PySide6.QtWidgets import QFileDialog, QWizard, QPlainTextEdit,QComboBox
 from PySide6.QtCore import Qt, Signal, Slot, QSize
 from PySide6.QtGui import QIcon,QIntValidator
 
-from afrl_gui.common import RESOURCE_ROOT, QEMU_IMAGE_FILTERS, NETWORK_CFG
+from afrl_gui.common import RESOURCE_ROOT, QEMU_IMAGE_FILTERS, NETWORK_CFG, QEMU_BINARY
 from afrl_gui.ui.ui_qemulaunchwizard import Ui_qemuLaunchWizard
 from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.hostmemory import MEMORY_BACKENDS
+from afrl_gui.qemudiskoverlay import OVERLAY_MODES
+from afrl_gui.qemudriveoptions import DRIVE_CACHES, DRIVE_CACHE_NONE, DIRECT_CACHES, DRIVE_AIOS, DRIVE_AIO_NATIVE, \
+    DETECT_ZEROES, DETECT_ZEROES_UNMAP
+from afrl_gui.qemuaccelerator import ACCELERATORS, ACCEL_KVM, TCG_THREADS, acceleratorOption, kvmCpu
 
+from afrl_gui.qemucapabilityregistry import qemuCapabilityRegistry
 from afrl_gui.qemumachinelist import qemuMachineList
 from afrl_gui.qemucpulist import qemuCpuList
 from afrl_gui.qemudevicelist import qemuDeviceList
+from afrl_gui.parameterlistviewmodel import parameterListViewModel
+from afrl_gui.devicecatalogviewmodel import deviceCatalogViewModel
+from afrl_gui.devicefilterproxymodel import deviceFilterProxyModel
 from afrl_gui.devicesettingswidget import deviceSettingsWidget
 from afrl_gui.machinesettingswidget import machineSettingsWidget
 from afrl_gui.diskimagewidget import diskImageWidget
@@ -41,9 +50,11 @@ class QemuLaunchWizard(QWizard):
 
     def __init__(self, parent):
         super().__init__(parent)
-        self.machineList = qemuMachineList()  # The list of machine candidates to populate dropdown with
-        self.cpuList = qemuCpuList()  # The list of cpu candidates to populate dropdown with
-        self.deviceList = qemuDeviceList()  # The list of device candidates to populate dropdown with
+        self.capabilities = qemuCapabilityRegistry.instance()  # Shared by every wizard, probed once per process
+        # Candidate lists start empty and are filled in once the capability registry has them
+        self.machineList = qemuMachineList(initialize=False)  # The list of machine candidates to populate dropdown with
+        self.cpuList = qemuCpuList(initialize=False)  # The list of cpu candidates to populate dropdown with
+        self.deviceList = qemuDeviceList(initialize=False)  # The list of device candidates to populate dropdown with
         # Intermediate storage for device and machine specific settings
         self.machineSettings = []
         self.devices = []  # The list of devices configured to launch with the QEMU instance
@@ -52,6 +63,8 @@ class QemuLaunchWizard(QWizard):
         self.lastKernelDirectory = "~/"
         self.lastAppDirectory = "~/"
         self.lastImageDirectory = "~/"
+        self.capabilities.connectListeners(self.initMachineDropdown, self.initCpuDropdown,
+                                           self.initDeviceTypeDropdown)
 
     def init_ui(self):
         self.ui = Ui_qemuLaunchWizard()
@@ -78,10 +91,19 @@ class QemuLaunchWizard(QWizard):
         self.ui.smpAllCheckBox.stateChanged.connect(self.checkSmpState)
         self.ui.smpLineEdit.textChanged.connect(self.checkSmpText)
 
-        # Configure the dropdown menus
-        self.initMachineDropdown()
-        self.initCpuDropdown()
-        self.initDeviceTypeDropdown()
+        # Configure the dropdown menus, they show a loading state until the capability probes complete
+        for comboBox in (self.ui.machineComboBox, self.ui.cpuComboBox,
+                         self.ui.deviceTypeComboBox, self.ui.deviceComboBox):
+            comboBox.setPlaceholderText("Loading...")
+            comboBox.setEnabled(False)
+        self.ui.addDevicePushButton.setEnabled(False)
+        self.ui.deviceSearchLineEdit.setEnabled(False)
+        # Device dropdown shows a filtered view of the whole catalog, switching type only changes the filter
+        self.deviceProxyModel = deviceFilterProxyModel(self)
+        self.ui.deviceComboBox.setModel(self.deviceProxyModel)
+        self.ui.cpuComboBox.activated.connect(self.selectCpu)
+        self.ui.deviceTypeComboBox.activated.connect(self.selectDeviceType)
+        self.ui.deviceSearchLineEdit.textChanged.connect(self.filterDevices)
         # Monitor machine selection to disable CPU selection if machine is selected
         self.ui.machineComboBox.currentTextChanged.connect(self.setCpuSelectionStatus)
 
@@ -90,10 +112,11 @@ class QemuLaunchWizard(QWizard):
             "instanceName*", self.ui.nameLineEdit)
         self.ui.qemuLaunchWizardNamePage.registerField(
             "description", self.ui.descriptionPlainTextEdit, "plainText")
+        # Mandatory until the probes populate the dropdowns, blocks leaving the page while loading
         self.ui.qemuLaunchWizardMachineCpuPage.registerField(
-            "machine", self.ui.machineComboBox)
+            "machine*", self.ui.machineComboBox)
         self.ui.qemuLaunchWizardMachineCpuPage.registerField(
-            "cpu", self.ui.cpuComboBox)
+            "cpu*", self.ui.cpuComboBox)
         self.ui.smpLineEdit.setValidator(QIntValidator(1,256))
         self.ui.qemuLaunchWizardMachineCpuPage.registerField(
             "smp", self.ui.smpLineEdit)
@@ -101,8 +124,32 @@ class QemuLaunchWizard(QWizard):
             "smpAll", self.ui.smpAllCheckBox)
         self.ui.qemuLaunchWizardMachineCpuPage.registerField(
             "memory", self.ui.memorySpinBox)
+        self.ui.qemuLaunchWizardMachineCpuPage.registerField(
+            "memoryBackend", self.ui.memoryBackendComboBox)
+        self.ui.qemuLaunchWizardMachineCpuPage.registerField(
+            "memoryPrealloc", self.ui.memoryPreallocCheckBox)
+        self.ui.qemuLaunchWizardAccelPage.registerField(
+            "accelerator", self.ui.accelComboBox)
+        self.ui.qemuLaunchWizardAccelPage.registerField(
+            "tcgThreads", self.ui.tcgThreadComboBox)
+        self.ui.qemuLaunchWizardAccelPage.registerField(
+            "tbSize", self.ui.tbSizeSpinBox)
         self.ui.qemuLaunchWizardImagePage.registerField(
             "image*", self.ui.imageLineEdit)
+        self.ui.qemuLaunchWizardImagePage.registerField(
+            "imageOverlay", self.ui.imageOverlayComboBox)
+        self.ui.qemuLaunchWizardDrivePage.registerField(
+            "driveCache", self.ui.driveCacheComboBox)
+        self.ui.qemuLaunchWizardDrivePage.registerField(
+            "driveAio", self.ui.driveAioComboBox)
+        self.ui.qemuLaunchWizardDrivePage.registerField(
+            "driveDiscard", self.ui.driveDiscardCheckBox)
+        self.ui.qemuLaunchWizardDrivePage.registerField(
+            "driveDetectZeroes", self.ui.driveDetectZeroesComboBox)
+        self.ui.qemuLaunchWizardDrivePage.registerField(
+            "driveIops", self.ui.driveIopsSpinBox)
+        self.ui.qemuLaunchWizardDrivePage.registerField(
+            "driveBandwidth", self.ui.driveBandwidthSpinBox)
         self.ui.qemuLaunchWizardNetworkPage.registerField(
             "ifaceName*", self.ui.ifaceLineEdit)
         self.ui.qemuLaunchWizardNetworkPage.registerField(
@@ -121,6 +168,18 @@ class QemuLaunchWizard(QWizard):
         self.ui.memorySpinBox.valueChanged.connect(self.adjustMemoryValue)
         self.ui.memorySpinBox.lineEdit().setReadOnly(True)
 
+        # Show the -accel option the accelerator page resolves to, automatic settings depend on the vCPU count
+        self.ui.accelComboBox.currentIndexChanged.connect(self.updateAccelSummary)
+        self.ui.tcgThreadComboBox.currentIndexChanged.connect(self.updateAccelSummary)
+        self.ui.tbSizeSpinBox.valueChanged.connect(self.updateAccelSummary)
+        self.currentIdChanged.connect(self.updateAccelSummary)
+
+        # Keep the drive settings to combinations QEMU accepts
+        self.ui.driveCacheComboBox.currentIndexChanged.connect(self.checkDriveOptions)
+        self.ui.driveAioComboBox.currentIndexChanged.connect(self.checkDriveOptions)
+        self.ui.driveDiscardCheckBox.toggled.connect(self.checkDriveOptions)
+        self.ui.driveDetectZeroesComboBox.currentIndexChanged.connect(self.checkDriveOptions)
+
     def openKernelFileBrowser(self):
         (filename, dir) = self.openFileBrowser(
                         "Open Kernel File", ["Bin files (*.bin)",
@@ -160,34 +219,83 @@ class QemuLaunchWizard(QWizard):
             return (filename, dir)
 
 
-    def initMachineDropdown(self):
-        for idx in range(0, len(self.machineList)):
-            self.ui.machineComboBox.addItem(self.machineList[idx].argument())
-            self.ui.machineComboBox.setItemData(idx, self.machineList[idx].description(), role=Qt.ToolTipRole)
-
-    def initCpuDropdown(self):
-        self.ui.cpuComboBox.addItems(self.cpuList.argumentList())
-        self.ui.cpuComboBox.activated.connect(self.selectCpu)
+    def initParameterDropdown(self, comboBox, paramList, emptyText):
+        ''' Shows a probed parameter list in a dropdown, returns False and shows emptyText if the probe found nothing '''
+        # Registry may be refreshed while the wizard is open, swapping the model replaces the old entries
+        comboBox.setModel(parameterListViewModel(paramList, self))
+        if not any(paramList.argumentList()):
+            # Only the empty default entry, the binary is missing or failed, the mandatory field explains itself
+            comboBox.setPlaceholderText(emptyText)
+            comboBox.setCurrentIndex(-1)
+            comboBox.setToolTip(f"Check that {QEMU_BINARY} runs, then use File > Refresh QEMU Capabilities")
+            return False
+        comboBox.setToolTip("")
+        comboBox.setCurrentIndex(0)  # Placeholder text keeps the index at -1 otherwise
+        return True
+
+    @Slot(object)
+    def initMachineDropdown(self, machineList):
+        self.machineList = machineList
+        found = self.initParameterDropdown(self.ui.machineComboBox, machineList, "No machines found (is QEMU installed?)")
+        self.ui.machineComboBox.setEnabled(found)
+
+    @Slot(object)
+    def initCpuDropdown(self, cpuList):
+        self.cpuList = cpuList
+        self.initParameterDropdown(self.ui.cpuComboBox, cpuList, "No CPUs found (is QEMU installed?)")
+        self.setCpuSelectionStatus(self.ui.machineComboBox.currentText())
 
     def selectCpu(self, idx):
         print(f"Selected CPU is: {self.cpuList[idx].argument()}")
 
-    def initDeviceTypeDropdown(self):
+    @Slot(object)
+    def initDeviceTypeDropdown(self, deviceList):
+        self.deviceList = deviceList
+        self.ui.deviceTypeComboBox.clear()
+        self.deviceProxyModel.setSourceModel(deviceCatalogViewModel(self.deviceList, self))
+        if len(self.deviceList.deviceTypeList()) == 0:
+            return  # Leave the device selection disabled, nothing to select
         self.ui.deviceTypeComboBox.addItems(self.deviceList.deviceTypeList())
-        self.ui.deviceTypeComboBox.activated.connect(self.populateDeviceDropdown)
-        self.populateDeviceDropdown(0)
+        self.ui.deviceTypeComboBox.setCurrentIndex(0)
+        self.ui.deviceTypeComboBox.setEnabled(True)
+        self.ui.deviceComboBox.setEnabled(True)
+        self.ui.addDevicePushButton.setEnabled(True)
+        self.ui.deviceSearchLineEdit.setEnabled(True)
+        self.filterDevices(self.ui.deviceSearchLineEdit.text())
+
+    def selectDeviceType(self, typeIdx):
+        if self.ui.deviceSearchLineEdit.text():
+            self.ui.deviceSearchLineEdit.clear()  # textChanged repopulates with the selected device type
+        else:
+            self.populateDeviceDropdown(typeIdx)
+
+    @Slot(str)
+    def filterDevices(self, text):
+        ''' Lists the devices of every device type matching the search text, or the selected type if empty '''
+        if not text.strip():
+            self.populateDeviceDropdown(max(self.ui.deviceTypeComboBox.currentIndex(), 0))
+            return
+        catalog = self.deviceProxyModel.sourceModel()
+        matches = self.deviceList.search(text)
+        self.deviceProxyModel.setSearchResults([catalog.rowOf(typeIdx, itemIdx) for (typeIdx, itemIdx) in matches])
+        if matches:
+            self.ui.deviceComboBox.setCurrentIndex(0)
+            deviceLists = self.deviceList.deviceLists()
+            self.capabilities.schemaCache.prefetch(deviceSettingsWidget, [deviceLists[typeIdx][itemIdx].argument()
+                                                   for (typeIdx, itemIdx) in matches])
 
     def populateDeviceDropdown(self, typeIdx):
-        deviceList = self.deviceList.deviceLists()[typeIdx]
-        self.ui.deviceComboBox.clear()
-        for idx in range(0, len(deviceList)):
-            self.ui.deviceComboBox.addItem(deviceList[idx].argument())
-            self.ui.deviceComboBox.setItemData(idx, deviceList[idx].toolTipText(), role=Qt.ToolTipRole)
+        self.deviceProxyModel.setDeviceType(typeIdx)
+        self.ui.deviceComboBox.setCurrentIndex(0)
+        # Warm the settings dialogs for the devices the user is choosing between
+        self.capabilities.schemaCache.prefetch(deviceSettingsWidget,
+                                               self.deviceList.deviceLists()[typeIdx].argumentList())
 
     def openDeviceSettings(self):
         '''Populates a form for configuring device settings '''
         deviceStr = self.ui.deviceComboBox.currentText()
-        self.deviceSettingsWidget = deviceSettingsWidget(deviceStr)
+        self.deviceSettingsWidget = deviceSettingsWidget(deviceStr, cache=self.capabilities.cache,
+                                                         schemaCache=self.capabilities.schemaCache)
         self.deviceSettingsWidget.settingsSignal.connect(self.applyDeviceSettings)
         self.deviceSettingsWidget.show()
 
@@ -211,7 +319,8 @@ class QemuLaunchWizard(QWizard):
     def openMachineSettings(self):
         '''Populates a form for configuring device settings '''
         machineStr = self.ui.machineComboBox.currentText()
-        self.machineSettingsWidget = machineSettingsWidget(machineStr)
+        self.machineSettingsWidget = machineSettingsWidget(machineStr, cache=self.capabilities.cache,
+                                                           schemaCache=self.capabilities.schemaCache)
         self.machineSettingsWidget.settingsSignal.connect(self.applyMachineSettings)
         self.machineSettingsWidget.show()
 
@@ -228,8 +337,9 @@ class QemuLaunchWizard(QWizard):
             self.ui.cpuComboBox.setCurrentIndex(0)  # Clear out any CPU setting, idx 0 is default/empty
             self.ui.cpuSettings_PushButton.setEnabled(False)
         else:
-            self.ui.cpuComboBox.setEnabled(True)
-            self.ui.cpuSettings_PushButton.setEnabled(True)
+            cpusLoaded = any(self.cpuList.argumentList())
+            self.ui.cpuComboBox.setEnabled(cpusLoaded)
+            self.ui.cpuSettings_PushButton.setEnabled(cpusLoaded)
 
     @Slot(int)
     def adjustMemoryValue(self, value):
@@ -253,23 +363,73 @@ class QemuLaunchWizard(QWizard):
         if self.ui.smpLineEdit.text() != "":
             self.ui.smpAllCheckBox.setChecked(False)
 
+    def applyAccelSettings(self, qemu):
+        '''Sets the vCPU count and accelerator settings of an instance from the wizard fields'''
+        if self.ui.qemuLaunchWizardMachineCpuPage.field("smpAll"):
+            qemu.smpCores = "ALL"
+        else:
+            qemu.smpCores = self.ui.qemuLaunchWizardMachineCpuPage.field("smp")
+        qemu.smpAll = self.ui.qemuLaunchWizardMachineCpuPage.field("smpAll")
+        qemu.accelerator = ACCELERATORS[self.ui.qemuLaunchWizardAccelPage.field("accelerator")]
+        qemu.tcgThreads = TCG_THREADS[self.ui.qemuLaunchWizardAccelPage.field("tcgThreads")]
+        qemu.tbSize = self.ui.qemuLaunchWizardAccelPage.field("tbSize")
+
+    @Slot()
+    def updateAccelSummary(self):
+        '''Shows the resolved -accel option, TCG settings are disabled while KVM is selected'''
+        qemu = qemuInstance()
+        qemu.cpu = self.ui.cpuComboBox.currentText()
+        self.applyAccelSettings(qemu)
+        tcg = qemu.accelerator != ACCEL_KVM
+        for widget in (self.ui.tcgThreadComboBox, self.ui.tbSizeSpinBox):
+            widget.setEnabled(tcg)
+        summary = f"Launches with -accel {acceleratorOption(qemu)}"
+        if not tcg and not kvmCpu(qemu.cpu):
+            summary += f", KVM does not run cpu {qemu.cpu}, select host or max"
+        self.ui.accelSummaryLabel.setText(summary)
+
+    @Slot()
+    def checkDriveOptions(self):
+        '''Native AIO needs an O_DIRECT cache mode and unmapping zero writes needs discard,
+           the setting not being changed gives way'''
+        changed = self.sender()
+        cache = DRIVE_CACHES[self.ui.driveCacheComboBox.currentIndex()]
+        if DRIVE_AIOS[self.ui.driveAioComboBox.currentIndex()] == DRIVE_AIO_NATIVE and cache not in DIRECT_CACHES:
+            if changed is self.ui.driveCacheComboBox:
+                self.ui.driveAioComboBox.setCurrentIndex(DRIVE_AIOS.index(""))
+            else:
+                self.ui.driveCacheComboBox.setCurrentIndex(DRIVE_CACHES.index(DRIVE_CACHE_NONE))
+        zeroes = DETECT_ZEROES[self.ui.driveDetectZeroesComboBox.currentIndex()]
+        if zeroes == DETECT_ZEROES_UNMAP and not self.ui.driveDiscardCheckBox.isChecked():
+            if changed is self.ui.driveDiscardCheckBox:
+                self.ui.driveDetectZeroesComboBox.setCurrentIndex(DETECT_ZEROES.index("on"))
+            else:
+                self.ui.driveDiscardCheckBox.setChecked(True)
+
     def launchQemuInstance(self):
         '''Verify QEMU model data and launch instance'''
         qemu = qemuInstance()
         qemu.name = self.ui.qemuLaunchWizardNamePage.field("instanceName")
         qemu.description = self.ui.qemuLaunchWizardNamePage.field("description")
-        qemu.machine = self.machineList[self.ui.qemuLaunchWizardMachineCpuPage.field("machine")].argument()
+        machine = self.machineList.find(self.ui.machineComboBox.currentText())
+        qemu.machine = machine.argument() if machine is not None else ""
         qemu.machineSettings = self.machineSettings
-        qemu.cpu = self.cpuList[self.ui.qemuLaunchWizardMachineCpuPage.field("cpu")].argument()
-        if self.ui.qemuLaunchWizardMachineCpuPage.field("smpAll"):
-            qemu.smpCores = "ALL"
-        else:
-            qemu.smpCores = self.ui.qemuLaunchWizardMachineCpuPage.field("smp")
-        qemu.smpAll = self.ui.qemuLaunchWizardMachineCpuPage.field("smpAll")
+        cpu = self.cpuList.find(self.ui.cpuComboBox.currentText())
+        qemu.cpu = cpu.argument() if cpu is not None else ""
+        self.applyAccelSettings(qemu)
         qemu.memory = self.ui.qemuLaunchWizardMachineCpuPage.field("memory")
+        qemu.memoryBackend = MEMORY_BACKENDS[self.ui.qemuLaunchWizardMachineCpuPage.field("memoryBackend")]
+        qemu.memoryPrealloc = self.ui.qemuLaunchWizardMachineCpuPage.field("memoryPrealloc")
         qemu.devices = self.devices
         qemu.deviceSettings = self.deviceSettings
         qemu.imageName = self.ui.qemuLaunchWizardImagePage.field("image")
+        qemu.imageOverlay = OVERLAY_MODES[self.ui.qemuLaunchWizardImagePage.field("imageOverlay")]
+        qemu.driveCache = DRIVE_CACHES[self.ui.qemuLaunchWizardDrivePage.field("driveCache")]
+        qemu.driveAio = DRIVE_AIOS[self.ui.qemuLaunchWizardDrivePage.field("driveAio")]
+        qemu.driveDiscard = self.ui.qemuLaunchWizardDrivePage.field("driveDiscard")
+        qemu.driveDetectZeroes = DETECT_ZEROES[self.ui.qemuLaunchWizardDrivePage.field("driveDetectZeroes")]
+        qemu.driveIops = self.ui.qemuLaunchWizardDrivePage.field("driveIops")
+        qemu.driveBandwidth = self.ui.qemuLaunchWizardDrivePage.field("driveBandwidth")
         qemu.interfaceName = self.ui.qemuLaunchWizardNetworkPage.field("ifaceName")
         qemu.ipAddress.setAddress(self.ui.qemuLaunchWizardNetworkPage.field("ipAddress"))
         qemu.subnetMask.setAddress(self.ui.qemuLaunchWizardNetworkPage.field("subnetMask"))
@@ -7,6 +7,21 @@ from afrl_gui.qemuparameter import qemuParameter
 
 
 class qemuMachineItem(qemuParameter):
+    __slots__ = ()
+
+    @classmethod
+    def fromMachineInfo(cls, info):
+        ''' Creates an item from a QMP query-machines MachineInfo dict '''
+        details = []
+        if info.get("is-default"):
+            details.append("default machine")
+        if "cpu-max" in info:
+            details.append(f"max CPUs: {info['cpu-max']}")
+        if info.get("default-cpu-type"):
+            details.append(f"default CPU: {info['default-cpu-type']}")
+        if info.get("deprecated"):
+            details.append("deprecated")
+        return cls(arg=info["name"], desc=", ".join(details), alias=info.get("alias", ""))
 
     def __repr__(self):
         '''Returns string representation of the qemu machine options'''
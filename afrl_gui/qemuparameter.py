@@ -3,6 +3,8 @@
 
 # Base class for QEMU parameter items (e.g. machine, cpu, device)
 class qemuParameter:
+    __slots__ = ("__argument", "__description", "__bus", "__alias")
+
     def __init__(self, arg="", desc="", bus="", alias=""):
         self.__argument = arg
         self.__description = desc
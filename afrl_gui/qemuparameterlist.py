@@ -2,27 +2,57 @@
 # This Python file uses the following encoding: utf-8
 
 # Baseclass for lists of candidates for QEMU parameters for dropdown comboboxes
+# Stored as columns of interned strings, items are only built when indexed
+import sys
 from afrl_gui.qemuparameter import qemuParameter
 
 class qemuParameterList:
-    def __init__(self):
-        self.__paramList = []
+    def __init__(self, itemClass=qemuParameter):
+        self.__itemClass = itemClass  # qemuParameter subclass returned by indexing
         self.__argList = []
         self.__descList = []
         self.__busList = []
+        self.__aliasList = []
+        self.__rows = {}  # argument and alias strings -> row
 
     def __getitem__(self, key):
-        return self.__paramList[key]
+        if isinstance(key, slice):
+            return [self[idx] for idx in range(*key.indices(len(self.__argList)))]
+        return self.__itemClass(self.__argList[key], self.__descList[key],
+                                self.__busList[key], self.__aliasList[key])
 
     def __len__(self):
-        return len(self.__paramList)
+        return len(self.__argList)
+
+    def __contains__(self, name):
+        return name in self.__rows
 
     def insertParameter(self, parameter):
         ''' Breaks parameter into components and stores in ordered lists '''
-        self.__paramList.append(parameter)
-        self.__argList.append(parameter.argument())
-        self.__descList.append(parameter.description())
-        self.__busList.append(parameter.bus())
+        self.insert(parameter.argument(), parameter.description(), parameter.bus(), parameter.alias())
+
+    def insert(self, arg="", desc="", bus="", alias=""):
+        ''' Appends a parameter from its component strings without building a parameter object '''
+        row = len(self.__argList)
+        self.__argList.append(sys.intern(arg))
+        self.__descList.append(sys.intern(desc))
+        self.__busList.append(sys.intern(bus))
+        self.__aliasList.append(sys.intern(alias))
+        if arg not in self.__rows:
+            self.__rows[arg] = row
+        if alias and alias not in self.__rows:
+            self.__rows[alias] = row
+
+    def indexOf(self, name):
+        ''' Returns the row of the parameter with argument or alias name, -1 if not present '''
+        return self.__rows.get(name, -1)
+
+    def find(self, name):
+        ''' Returns the parameter with argument or alias name, None if not present '''
+        row = self.__rows.get(name, -1)
+        if row < 0:
+            return None
+        return self[row]
 
     def argumentList(self):
         '''Returns a stringlist of the argument strings for QEMU'''
@@ -35,3 +65,7 @@ class qemuParameterList:
     def busList(self):
         '''Returns a stringlist of the bus strings when applicable (empty string if not) for QEMU argument'''
         return self.__busList
+
+    def aliasList(self):
+        '''Returns a stringlist of the alias strings when applicable (empty string if not) for QEMU argument'''
+        return self.__aliasList
@@ -0,0 +1,270 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Control channel to running QEMU instances over the QMP unix socket each one is launched with
+# qemuQmpPool keeps one persistent connection per running instance, driven by QLocalSocket signals on the event loop
+# Commands are tagged with an id and written without waiting for earlier replies (pipelined),
+# replies are matched back to their callbacks by id and asynchronous events are forwarded as signals
+
+import json
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+from PySide6.QtNetwork import QLocalSocket
+from afrl_gui.qemusupervisor import STATUS_RUNNING
+
+QMP_CONNECT_INTERVAL = 100  # Milliseconds between attempts to connect while QEMU creates its socket
+QMP_CONNECT_ATTEMPTS = 50  # Attempts before the instance is reported as having no QMP socket
+
+# Run state kept in qemuInstance.runState for the events that change it
+RUN_STATE_EVENTS = {"STOP": "paused", "RESUME": "running", "SHUTDOWN": "shutdown", "RESET": "running"}
+
+
+class qmpConnection(QObject):
+    connected = Signal()  # Capabilities negotiated, commands are accepted from now on
+    disconnected = Signal()
+    failed = Signal(str)  # The connection could not be opened or negotiated
+    event = Signal(str, dict)  # Asynchronous QMP event name and data
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.error = ""
+        self.__socket = QLocalSocket(self)
+        self.__socket.connected.connect(self.__connected)
+        self.__socket.readyRead.connect(self.__readyRead)
+        self.__socket.disconnected.connect(self.__disconnected)
+        self.__socket.errorOccurred.connect(self.__error)
+        self.__buffer = b""
+        self.__nextId = 0
+        self.__pending = {}  # command id -> (command, callback) awaiting a reply
+        self.__queued = []  # Encoded commands issued before negotiation finished
+        self.__ready = False
+        self.__closed = False
+        self.__attempts = 0
+        self.__retryTimer = QTimer(self)
+        self.__retryTimer.setSingleShot(True)
+        self.__retryTimer.setInterval(QMP_CONNECT_INTERVAL)
+        self.__retryTimer.timeout.connect(self.open)
+
+    def isReady(self):
+        ''' Returns True once the connection is negotiated and open '''
+        return self.__ready
+
+    def pendingCount(self):
+        return len(self.__pending)
+
+    @Slot()
+    def open(self):
+        ''' Connects to the socket, retried every QMP_CONNECT_INTERVAL until QEMU has created it '''
+        if self.__closed:
+            return
+        self.__attempts += 1
+        self.__socket.connectToServer(self.path)
+
+    def close(self):
+        ''' Closes the connection, callbacks of unanswered commands receive an error '''
+        self.__closed = True
+        self.__retryTimer.stop()
+        self.__socket.abort()
+        self.__fail("QMP connection closed")
+
+    def execute(self, command, arguments=None, callback=None):
+        ''' Sends a command without waiting for earlier replies, returns its id
+            callback(result, error) is called with the 'return' value or the error description '''
+        self.__nextId += 1
+        request = {"execute": command, "id": self.__nextId}
+        if arguments:
+            request["arguments"] = arguments
+        self.__pending[self.__nextId] = (command, callback)
+        data = json.dumps(request).encode("utf-8") + b"\n"
+        if self.__ready:
+            self.__socket.write(data)
+        else:
+            self.__queued.append(data)
+        return self.__nextId
+
+    def __connected(self):
+        self.__attempts = 0
+
+    def __readyRead(self):
+        self.__buffer += self.__socket.readAll().data()
+        lines = self.__buffer.split(b"\n")
+        self.__buffer = lines.pop()  # Partial message, completed by a later read
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError:
+                print(f"ERROR: invalid QMP message on {self.path}: {line[:80]}")
+                continue
+            if "QMP" in message:
+                self.__negotiate()
+            elif "event" in message:
+                self.event.emit(message["event"], message.get("data", {}))
+            elif message.get("id") == 0:
+                self.__negotiated(message)
+            else:
+                self.__reply(message)
+
+    def __negotiate(self):
+        # Id 0 is reserved for the capabilities handshake, the queued commands follow it straight away
+        self.__socket.write(b'{"execute": "qmp_capabilities", "id": 0}\n')
+        for data in self.__queued:
+            self.__socket.write(data)
+        self.__queued = []
+        self.__ready = True
+
+    def __negotiated(self, message):
+        if "error" in message:
+            self.error = message["error"].get("desc", str(message["error"]))
+            print(f"ERROR: QMP negotiation on {self.path} failed: {self.error}")
+            self.close()
+            self.failed.emit(self.error)
+            return
+        self.connected.emit()
+
+    def __reply(self, message):
+        (command, callback) = self.__pending.pop(message.get("id"), (None, None))
+        if command is None:
+            return
+        if "error" in message:
+            error = message["error"].get("desc", str(message["error"]))
+            if callback is None:
+                print(f"ERROR: QMP {command} on {self.path} failed: {error}")
+            else:
+                callback(None, error)
+        elif callback is not None:
+            callback(message.get("return"), None)
+
+    def __disconnected(self):
+        wasReady = self.__ready
+        self.__ready = False
+        self.__fail("QEMU closed the QMP connection")
+        if wasReady:
+            self.disconnected.emit()
+
+    def __error(self, error):
+        if self.__closed or self.__ready:
+            return  # Errors on an open connection end in disconnected
+        if error in (QLocalSocket.ServerNotFoundError, QLocalSocket.ConnectionRefusedError) \
+                and self.__attempts < QMP_CONNECT_ATTEMPTS:
+            self.__retryTimer.start()  # QEMU has not created its socket yet
+            return
+        self.error = self.__socket.errorString()
+        print(f"ERROR: unable to connect to QMP socket {self.path}: {self.error}")
+        self.__fail(self.error)
+        self.failed.emit(self.error)
+
+    def __fail(self, error):
+        pending = self.__pending
+        self.__pending = {}
+        self.__queued = []
+        for (command, callback) in pending.values():
+            if callback is not None:
+                callback(None, error)
+
+
+class qemuQmpPool(QObject):
+    eventReceived = Signal(object, str, dict)  # qemuInstance, QMP event name and data
+    runStateChanged = Signal(object)  # qemuInstance whose runState changed
+    connectionFailed = Signal(object)  # qemuInstance whose QMP connection could not be opened
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.__connections = {}  # id(qemuInstance) -> (qemuInstance, qmpConnection)
+
+    def __len__(self):
+        return len(self.__connections)
+
+    def connection(self, qemu):
+        ''' Returns the QMP connection of an instance, None if it has none '''
+        entry = self.__connections.get(id(qemu))
+        return entry[1] if entry is not None else None
+
+    def isReady(self, qemu):
+        connection = self.connection(qemu)
+        return connection is not None and connection.isReady()
+
+    @Slot(object)
+    def updateInstance(self, qemu):
+        ''' Connects to instances once their process runs, connect to qemuSupervisor.statusChanged '''
+        if qemu.status == STATUS_RUNNING and qemu.qmpSocket:
+            if id(qemu) not in self.__connections:
+                self.open(qemu)
+        elif qemu.status != STATUS_RUNNING:
+            self.close(qemu)
+
+    def open(self, qemu):
+        ''' Opens the persistent connection to an instance '''
+        self.close(qemu)
+        connection = qmpConnection(qemu.qmpSocket, self)
+        connection.connected.connect(lambda: self.refreshRunState(qemu))
+        connection.event.connect(lambda name, data: self.__event(qemu, name, data))
+        connection.failed.connect(lambda error: self.connectionFailed.emit(qemu))
+        self.__connections[id(qemu)] = (qemu, connection)
+        connection.open()
+        return connection
+
+    def close(self, qemu):
+        entry = self.__connections.pop(id(qemu), None)
+        if entry is None:
+            return
+        connection = entry[1]
+        connection.close()
+        connection.deleteLater()
+        if qemu.runState:
+            self.__setRunState(qemu, "")
+
+    def closeAll(self):
+        for (qemu, connection) in list(self.__connections.values()):
+            self.close(qemu)
+
+    def execute(self, qemu, command, arguments=None, callback=None):
+        ''' Sends a command to an instance, returns False if the instance has no connection '''
+        connection = self.connection(qemu)
+        if connection is None:
+            print(f"ERROR: QEMU instance {qemu.name} has no QMP connection")
+            if callback is not None:
+                callback(None, "no QMP connection")
+            return False
+        connection.execute(command, arguments, callback)
+        return True
+
+    def pause(self, qemu, callback=None):
+        ''' Stops the guest CPUs, the STOP event updates the run state '''
+        return self.execute(qemu, "stop", callback=callback)
+
+    def resume(self, qemu, callback=None):
+        ''' Restarts the guest CPUs, the RESUME event updates the run state '''
+        return self.execute(qemu, "cont", callback=callback)
+
+    def quit(self, qemu, callback=None):
+        ''' Asks QEMU to exit immediately '''
+        return self.execute(qemu, "quit", callback=callback)
+
+    def queryStatus(self, qemu, callback):
+        ''' Calls callback with the StatusInfo dict (running, status) of an instance '''
+        return self.execute(qemu, "query-status", callback=callback)
+
+    def queryCpus(self, qemu, callback):
+        ''' Calls callback with the CpuInfoFast list (cpu-index, thread-id) of an instance '''
+        return self.execute(qemu, "query-cpus-fast", callback=callback)
+
+    def refreshRunState(self, qemu, callback=None):
+        ''' Queries the run state, for the state at connection time and changes QEMU sends no event for '''
+        def setStatus(result, error):
+            if result is not None:
+                self.__setRunState(qemu, result.get("status", ""))
+            if callback is not None:
+                callback(result, error)
+        return self.queryStatus(qemu, setStatus)
+
+    def __event(self, qemu, name, data):
+        self.eventReceived.emit(qemu, name, data)
+        if name in RUN_STATE_EVENTS:
+            self.__setRunState(qemu, RUN_STATE_EVENTS[name])
+
+    def __setRunState(self, qemu, runState):
+        if qemu.runState != runState:
+            qemu.runState = runState
+            self.runStateChanged.emit(qemu)
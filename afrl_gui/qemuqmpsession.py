@@ -0,0 +1,165 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Long lived QEMU process answering capability queries over QMP on stdio
+# One 'qemu-system-aarch64 -machine none -qmp stdio' process serves every query, avoiding a fork per query
+
+import atexit, json, os, select, subprocess, threading, time, weakref
+from afrl_gui.common import QEMU_BINARY
+
+QMP_TIMEOUT = 10  # Seconds to wait for the QEMU process to exit when closing the session
+QMP_REPLY_TIMEOUT = 30  # Seconds to wait for a QMP message before the process is considered hung
+QMP_READ_SIZE = 65536
+
+
+class qmpError(Exception):
+    ''' Raised when QEMU returns an error reply or the QMP session cannot be used '''
+
+
+def closeSession(ref):
+    ''' Closes a session at interpreter exit if it is still around '''
+    session = ref()
+    if session is not None:
+        session.close()
+
+
+class qemuQmpSession:
+    def __init__(self, binary=QEMU_BINARY):
+        self.__binary = binary
+        self.__process = None
+        self.__buffer = b""  # Output read past the end of the last message
+        self.__closeAtExit = False  # closeSession registered, by weak reference so the session can still be freed
+        self.__startError = None  # Set once the binary fails to start a QMP session, it is not retried
+        self.__lock = threading.Lock()  # One command in flight at a time, callers may be on any thread
+
+    def __repr__(self):
+        '''Returns string representation of the QMP session'''
+        pid = self.__process.pid if self.isRunning() else None
+        return(f"QMP Session: {self.__binary} pid: {pid}")
+
+    def isRunning(self):
+        ''' Returns True if the QEMU process is alive '''
+        return self.__process is not None and self.__process.poll() is None
+
+    def startError(self):
+        ''' Returns why the QMP session could not be started, None if it has not failed to start '''
+        return self.__startError
+
+    def start(self):
+        ''' Starts the QEMU process and negotiates QMP capabilities '''
+        with self.__lock:
+            self.__start()
+
+    def close(self):
+        ''' Asks QEMU to quit and reaps the process '''
+        with self.__lock:
+            if self.__process is None:
+                return
+            process = self.__process
+            self.__process = None
+            try:
+                if process.poll() is None:
+                    self.__send(process, "quit")
+                process.stdin.close()
+                process.wait(timeout=QMP_TIMEOUT)
+            except (qmpError, OSError, ValueError, subprocess.TimeoutExpired):
+                process.kill()
+                process.wait()
+
+    def execute(self, command, arguments=None):
+        ''' Executes a QMP command and returns its 'return' value, raises qmpError on failure '''
+        with self.__lock:
+            if not self.isRunning():
+                self.__start()
+            try:
+                return self.__send(self.__process, command, arguments)
+            except (OSError, ValueError) as e:
+                raise qmpError(f"QMP session to {self.__binary} failed: {e}")
+
+    def queryMachines(self):
+        ''' Returns the list of MachineInfo dicts supported by the binary '''
+        return self.execute("query-machines")
+
+    def queryCpuDefinitions(self):
+        ''' Returns the list of CpuDefinitionInfo dicts supported by the binary '''
+        return self.execute("query-cpu-definitions")
+
+    def listTypes(self, implements, abstract=False):
+        ''' Returns the list of ObjectTypeInfo dicts for QOM types implementing the given type '''
+        return self.execute("qom-list-types", {"implements": implements, "abstract": abstract})
+
+    def deviceProperties(self, typename):
+        ''' Returns the list of ObjectPropertyInfo dicts accepted by -device typename '''
+        return self.execute("device-list-properties", {"typename": typename})
+
+    def objectProperties(self, typename):
+        ''' Returns the list of ObjectPropertyInfo dicts of any QOM type (e.g. <machine>-machine) '''
+        return self.execute("qom-list-properties", {"typename": typename})
+
+    def __start(self):
+        ''' Starts the process, lock must be held '''
+        if self.__startError is not None:
+            raise qmpError(self.__startError)
+        try:
+            self.__spawn()
+        except qmpError as e:
+            self.__startError = str(e)
+            raise
+
+    def __spawn(self):
+        ''' Spawns QEMU and negotiates capabilities '''
+        args = [self.__binary, "-machine", "none", "-qmp", "stdio",
+                "-display", "none", "-nodefaults", "-S"]
+        self.__buffer = b""
+        try:
+            self.__process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                              stderr=subprocess.DEVNULL)
+        except OSError as e:
+            self.__process = None
+            raise qmpError(f"Unable to start {self.__binary}: {e}")
+        try:
+            greeting = self.__readMessage(self.__process)
+            if "QMP" not in greeting:
+                raise qmpError(f"Unexpected QMP greeting from {self.__binary}: {greeting}")
+            self.__send(self.__process, "qmp_capabilities")
+        except (qmpError, OSError, ValueError) as e:
+            self.__process.kill()
+            self.__process.wait()
+            self.__process = None
+            raise qmpError(f"QMP negotiation with {self.__binary} failed: {e}")
+        if not self.__closeAtExit:
+            atexit.register(closeSession, weakref.ref(self))  # Once per session however often it respawns
+            self.__closeAtExit = True
+
+    def __send(self, process, command, arguments=None):
+        ''' Writes a command and reads replies until its result, asynchronous events are discarded '''
+        request = {"execute": command}
+        if arguments:
+            request["arguments"] = arguments
+        process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+        process.stdin.flush()
+        while True:
+            reply = self.__readMessage(process)
+            if "return" in reply:
+                return reply["return"]
+            if "error" in reply:
+                raise qmpError(f"{command}: {reply['error'].get('desc', reply['error'])}")
+            # Anything else is an event, nothing listens for them on a discovery session
+
+    def __readMessage(self, process):
+        ''' Reads one JSON message, QMP sends one message per line
+            A process sending nothing for QMP_REPLY_TIMEOUT is killed so the next command starts a new one '''
+        deadline = time.monotonic() + QMP_REPLY_TIMEOUT
+        fd = process.stdout.fileno()
+        while b"\n" not in self.__buffer:
+            (readable, _, _) = select.select([fd], [], [], max(0, deadline - time.monotonic()))
+            if not readable:
+                process.kill()
+                process.wait()
+                raise qmpError(f"{self.__binary} sent no QMP reply for {QMP_REPLY_TIMEOUT} s")
+            data = os.read(fd, QMP_READ_SIZE)
+            if not data:
+                raise qmpError(f"QEMU closed the QMP session (exit code {process.poll()})")
+            self.__buffer += data
+        (line, _, self.__buffer) = self.__buffer.partition(b"\n")
+        return json.loads(line)
@@ -0,0 +1,74 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Bounded in-memory LRU of device/machine property schemas with low priority background prefetching
+
+import threading
+from collections import OrderedDict
+from PySide6.QtCore import QRunnable, QThread, QThreadPool
+from afrl_gui.common import SCHEMA_CACHE_SIZE
+
+
+class schemaPrefetch(QRunnable):
+    ''' Loads a single schema into the schema cache on the prefetch thread '''
+    def __init__(self, schemaCache, settingsClass, name):
+        super().__init__()
+        self.schemaCache = schemaCache
+        self.settingsClass = settingsClass
+        self.name = name
+
+    def run(self):
+        self.schemaCache.settings(self.settingsClass, self.name)
+
+
+class qemuSchemaCache:
+    def __init__(self, cache, maxSize=SCHEMA_CACHE_SIZE):
+        self.cache = cache  # qemuCapabilityCache answering misses
+        self.__maxSize = maxSize
+        self.__schemas = OrderedDict()  # (paramStr, name) -> list of parameterSettings, least recent first
+        self.__lock = threading.Lock()
+        # Single low priority thread so prefetching never competes with the GUI or an explicit request
+        self.__prefetchPool = QThreadPool()
+        self.__prefetchPool.setMaxThreadCount(1)
+        self.__prefetchPool.setThreadPriority(QThread.LowestPriority)
+
+    def __len__(self):
+        return len(self.__schemas)
+
+    def __contains__(self, key):
+        return key in self.__schemas
+
+    def settings(self, settingsClass, name):
+        ''' Returns the parameterSettings of name for a settingsWidget subclass, loading them on a miss '''
+        key = (settingsClass.paramStr, name)
+        with self.__lock:
+            if key in self.__schemas:
+                self.__schemas.move_to_end(key)
+                return self.__schemas[key]
+        settings = settingsClass.querySettings(self.cache, name)
+        if settings is None:
+            return None  # Not cached so a later request can retry
+        with self.__lock:
+            self.__schemas[key] = settings
+            self.__schemas.move_to_end(key)
+            while len(self.__schemas) > self.__maxSize:
+                self.__schemas.popitem(last=False)
+        return settings
+
+    def prefetch(self, settingsClass, names):
+        ''' Queues background loads of the schemas for names, replacing any prefetch still queued '''
+        self.__prefetchPool.clear()
+        for name in names[:self.__maxSize]:
+            if (settingsClass.paramStr, name) not in self.__schemas:
+                self.__prefetchPool.start(schemaPrefetch(self, settingsClass, name))
+
+    def stopPrefetch(self):
+        ''' Drops any queued prefetch and waits for the one in progress to finish '''
+        self.__prefetchPool.clear()
+        self.__prefetchPool.waitForDone()
+
+    def clear(self):
+        ''' Drops every schema held in memory and any queued prefetch '''
+        self.__prefetchPool.clear()
+        with self.__lock:
+            self.__schemas.clear()
@@ -0,0 +1,229 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Serial consoles of running QEMU instances, read in process on the event loop instead of one xterm per console
+# Instances are launched with their first serial port on a unix socket in their runtime directory, qemuConsolePool
+# connects to it once the process runs (a pty chardev path works as well) and appends everything the guest prints
+# to a fixed-size ring buffer, so a guest printing faster than anyone reads costs bounded memory and no rendering
+# Views (consoleWidget) are told when output arrived and read the part they have not drawn yet from the buffer
+# The output of a booting instance is searched for BOOT_MARKER, the time it appears is the instance's boot time
+
+import errno, os, re, stat, time, tty
+from PySide6.QtCore import QObject, QSocketNotifier, QTimer, Signal, Slot
+from PySide6.QtNetwork import QLocalSocket
+from afrl_gui.common import BOOT_MARKER, CONSOLE_SCROLLBACK
+from afrl_gui.qemusupervisor import STATUS_RUNNING
+
+CONSOLE_CONNECT_INTERVAL = 100  # Milliseconds between attempts to connect while QEMU creates its socket
+CONSOLE_CONNECT_ATTEMPTS = 50  # Attempts before the console is reported as unavailable
+CONSOLE_READ_SIZE = 64 * 1024  # Bytes read from a pty at once
+MARKER_OVERLAP = 4096  # Bytes searched again so a marker split across reads is found
+
+
+class consoleRingBuffer:
+    def __init__(self, capacity=CONSOLE_SCROLLBACK):
+        self.capacity = capacity
+        self.written = 0  # Bytes appended since creation, the position following the newest byte
+        self.__data = bytearray(capacity)
+
+    def start(self):
+        ''' Returns the position of the oldest byte still held '''
+        return max(0, self.written - self.capacity)
+
+    def append(self, data):
+        ''' Appends bytes, overwriting the oldest once the buffer is full '''
+        size = len(data)
+        data = data[-self.capacity:]  # Only the newest capacity bytes of a larger write survive it
+        offset = (self.written + size - len(data)) % self.capacity
+        first = min(len(data), self.capacity - offset)
+        self.__data[offset:offset + first] = data[:first]
+        self.__data[:len(data) - first] = data[first:]
+        self.written += size
+
+    def read(self, position=0):
+        ''' Returns the bytes from position to the newest, from the oldest held if position was overwritten '''
+        position = max(position, self.start())
+        size = self.written - position
+        offset = position % self.capacity
+        first = min(size, self.capacity - offset)
+        return bytes(self.__data[offset:offset + first]) + bytes(self.__data[:size - first])
+
+
+class serialConsole(QObject):
+    received = Signal()  # Output was appended to buffer
+    closed = Signal()  # The guest side went away or close() was called, buffer keeps the output
+
+    def __init__(self, path, capacity=CONSOLE_SCROLLBACK, parent=None):
+        super().__init__(parent)
+        self.path = path  # Unix socket of a socket chardev or the device of a pty chardev
+        self.buffer = consoleRingBuffer(capacity)
+        self.error = ""
+        self.__socket = QLocalSocket(self)
+        self.__socket.readyRead.connect(self.__readyRead)
+        self.__socket.disconnected.connect(self.__disconnected)
+        self.__socket.errorOccurred.connect(self.__error)
+        self.__pty = -1  # File descriptor of an open pty, -1 if the console is a socket or closed
+        self.__notifier = None
+        self.__closed = False
+        self.__attempts = 0
+        self.__retryTimer = QTimer(self)
+        self.__retryTimer.setSingleShot(True)
+        self.__retryTimer.setInterval(CONSOLE_CONNECT_INTERVAL)
+        self.__retryTimer.timeout.connect(self.open)
+
+    def isConnected(self):
+        return self.__pty >= 0 or self.__socket.state() == QLocalSocket.ConnectedState
+
+    def isClosed(self):
+        return self.__closed
+
+    @Slot()
+    def open(self):
+        ''' Connects to the console, retried every CONSOLE_CONNECT_INTERVAL until QEMU has created it '''
+        if self.__closed:
+            return
+        self.__attempts += 1
+        try:
+            isPty = stat.S_ISCHR(os.stat(self.path).st_mode)
+        except OSError:
+            isPty = False
+        if isPty:
+            self.__openPty()
+        else:
+            self.__socket.connectToServer(self.path)
+
+    def close(self):
+        ''' Disconnects, the output received so far stays in buffer '''
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__retryTimer.stop()
+        self.__socket.abort()
+        self.__closePty()
+        self.closed.emit()
+
+    def write(self, data):
+        ''' Sends input to the guest, dropped while the console is not connected '''
+        if self.__pty >= 0:
+            try:
+                os.write(self.__pty, data)
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    print(f"ERROR: unable to write to serial console {self.path}: {e}")
+        elif self.__socket.state() == QLocalSocket.ConnectedState:
+            self.__socket.write(data)
+
+    def __openPty(self):
+        try:
+            self.__pty = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+            tty.setraw(self.__pty)  # Bytes pass unchanged, the guest echoes and handles line editing
+        except OSError as e:
+            self.__closePty()
+            self.error = str(e)
+            print(f"ERROR: unable to open serial console {self.path}: {e}")
+            self.close()
+            return
+        self.__notifier = QSocketNotifier(self.__pty, QSocketNotifier.Read, self)
+        self.__notifier.activated.connect(self.__readPty)
+
+    def __closePty(self):
+        if self.__notifier is not None:
+            self.__notifier.setEnabled(False)
+            self.__notifier.deleteLater()
+            self.__notifier = None
+        if self.__pty >= 0:
+            os.close(self.__pty)
+            self.__pty = -1
+
+    def __readPty(self, *args):
+        try:
+            data = os.read(self.__pty, CONSOLE_READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""  # EIO once QEMU closed its side
+        if not data:
+            self.close()
+            return
+        self.buffer.append(data)
+        self.received.emit()
+
+    def __readyRead(self):
+        self.buffer.append(self.__socket.readAll().data())
+        self.received.emit()
+
+    def __disconnected(self):
+        self.close()
+
+    def __error(self, error):
+        if self.__closed or self.__socket.state() == QLocalSocket.ConnectedState:
+            return
+        if error in (QLocalSocket.ServerNotFoundError, QLocalSocket.ConnectionRefusedError) \
+                and self.__attempts < CONSOLE_CONNECT_ATTEMPTS:
+            self.__retryTimer.start()  # QEMU has not created its socket yet
+            return
+        if error == QLocalSocket.PeerClosedError:
+            return  # Ends in disconnected
+        self.error = self.__socket.errorString()
+        print(f"ERROR: unable to connect to serial console {self.path}: {self.error}")
+        self.close()
+
+
+class qemuConsolePool(QObject):
+    opened = Signal(object, object)  # qemuInstance and the serialConsole of its new run
+
+    def __init__(self, capacity=CONSOLE_SCROLLBACK, marker=BOOT_MARKER, parent=None):
+        super().__init__(parent)
+        self.__capacity = capacity
+        self.__marker = re.compile(marker.encode("utf-8"))
+        self.__consoles = {}  # id(qemuInstance) -> (qemuInstance, serialConsole of its last run) until removed
+        self.__booting = {}  # serialConsole -> (qemuInstance, buffer position searched up to) until the marker
+
+    def console(self, qemu):
+        ''' Returns the console of the last run of an instance, None if it has none '''
+        entry = self.__consoles.get(id(qemu))
+        return entry[1] if entry is not None else None
+
+    @Slot(object)
+    def updateInstance(self, qemu):
+        ''' Connects to the console once the process runs, connect to qemuSupervisor.statusChanged '''
+        console = self.console(qemu)
+        if qemu.status == STATUS_RUNNING and qemu.serialSocket:
+            if console is None or console.isClosed():
+                self.open(qemu)
+        elif qemu.status != STATUS_RUNNING and console is not None:
+            console.close()  # Kept, the output of a stopped instance can still be read
+
+    def open(self, qemu):
+        ''' Connects to the console of a running instance, replacing the one of its earlier run '''
+        self.remove(qemu)
+        console = serialConsole(qemu.serialSocket, self.__capacity, self)
+        self.__consoles[id(qemu)] = (qemu, console)
+        if not qemu.incoming:
+            # A restored guest continues past its boot, there is no marker to wait for
+            self.__booting[console] = (qemu, 0)
+            console.received.connect(self.__findMarker)
+        self.opened.emit(qemu, console)
+        console.open()
+        return console
+
+    def remove(self, qemu):
+        ''' Closes the console of an instance and drops its output '''
+        entry = self.__consoles.pop(id(qemu), None)
+        if entry is not None:
+            self.__booting.pop(entry[1], None)
+            entry[1].close()
+            entry[1].deleteLater()
+
+    def __findMarker(self):
+        console = self.sender()
+        if console not in self.__booting:
+            return
+        (qemu, position) = self.__booting[console]
+        if self.__marker.search(console.buffer.read(max(0, position - MARKER_OVERLAP))):
+            qemu.bootTime = time.monotonic() - qemu.launchTime
+            del self.__booting[console]
+            console.received.disconnect(self.__findMarker)
+            print(f"QEMU instance {qemu.name} booted in {qemu.bootTime:.2f} s")
+        else:
+            self.__booting[console] = (qemu, console.buffer.written)
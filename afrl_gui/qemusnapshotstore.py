@@ -0,0 +1,277 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Saved VM state of booted instances, so later launches of the same configuration restore instead of booting
+# save() pauses a running instance, copies the clusters its disk overlay holds to a frozen qcow2 over the same
+# image (drive-backup sync=top, a point in time copy that finishes while the guest runs again) and migrates its
+# RAM and device state over QMP into a file, both under SNAPSHOT_ROOT and keyed by a hash of the launch arguments,
+# the QEMU binary, the kernel and the image (not the per instance overlay, so identical fleet members share a
+# state); the guest is resumed once the RAM state is complete
+# Launches with a saved state get -incoming and an overlay over the frozen disk, so the guest continues from the
+# RAM and the disk of the same moment; a state whose disk is missing is discarded and the instance boots
+# The state is saved paused, so QEMU leaves a restored guest paused once it is loaded and it is resumed here
+# Instances writing to their image directly (no overlay) have no disk to freeze, their state cannot be saved
+# QEMU writes and reads the state file itself through file: migration URIs (QEMU 8.2 and later), no shell runs
+# Cold boot latency (launch until BOOT_MARKER is on the serial console, measured by qemuConsolePool) and every
+# restore latency (launch to running) are kept next to the state
+
+import hashlib, json, os, time
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+from afrl_gui.common import BOOT_MARKER, QEMU_BINARY, SNAPSHOT_ROOT
+from afrl_gui.qemusupervisor import STATUS_STARTING, STATUS_RUNNING, STATUS_EXITED, STATUS_CRASHED
+from afrl_gui.qemudiskoverlay import OVERLAY_NONE
+from afrl_gui.qemudriveoptions import DRIVE_ID, driveOptions
+
+SNAPSHOT_POLL_INTERVAL = 100  # Milliseconds between migration progress queries while a state is saved or loaded
+SNAPSHOT_HISTORY = 20  # Restore latencies kept per snapshot
+# Launch arguments that differ between runs or instances of one configuration, the drive names the per instance
+# overlay and is keyed by its image and options instead
+RUNTIME_OPTIONS = ("-qmp", "-chardev", "-drive", "-incoming")
+SNAPSHOT_JOB = "snapshot-disk"  # Block job id of the disk copy, unique per instance as each QEMU runs one guest
+JOB_EVENTS = ("BLOCK_JOB_COMPLETED", "BLOCK_JOB_CANCELLED")
+
+
+def fileIdentity(path):
+    ''' Returns what identifies the content of a file (path, size, modification time), None if it is missing '''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.realpath(path), stat.st_size, stat.st_mtime_ns]
+
+
+class qemuSnapshotStore(QObject):
+    saved = Signal(object, float)  # qemuInstance and its cold boot seconds, negative if not known
+    restored = Signal(object, float)  # qemuInstance and seconds from launch to running from its saved state
+
+    def __init__(self, qmpPool, snapshotRoot=SNAPSHOT_ROOT, binary=QEMU_BINARY, parent=None):
+        super().__init__(parent)
+        self.__qmpPool = qmpPool
+        self.__snapshotRoot = snapshotRoot
+        self.__binary = binary
+        self.__saving = {}  # id(qemuInstance) -> qemuInstance with a save in progress
+        self.__restoring = {}  # id(qemuInstance) -> (qemuInstance, snapshot key) until the guest runs
+        self.__diskCopies = {}  # id(qemuInstance) -> callback(error) of a disk copy in progress
+        qmpPool.runStateChanged.connect(self.updateRunState)
+        qmpPool.eventReceived.connect(self.updateDiskCopy)
+
+    def key(self, qemu):
+        ''' Returns the key of the configuration of an instance, the same for every launch of it '''
+        arguments = qemu.arguments()
+        for option in RUNTIME_OPTIONS:
+            while option in arguments:
+                index = arguments.index(option)
+                del arguments[index:index + 2]
+        drive = [fileIdentity(qemu.imageName), qemu.imageOverlay == OVERLAY_NONE, driveOptions(qemu)] \
+            if qemu.imageName else None
+        identity = [arguments, fileIdentity(self.__binary), fileIdentity(qemu.kernel) if qemu.kernel else None, drive]
+        return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()[:32]
+
+    def statePath(self, key):
+        return os.path.join(self.__snapshotRoot, f"{key}.state")
+
+    def diskPath(self, key):
+        return os.path.join(self.__snapshotRoot, f"{key}.qcow2")
+
+    def hasSnapshot(self, qemu):
+        return os.path.exists(self.statePath(self.key(qemu)))
+
+    def isSaving(self, qemu):
+        return id(qemu) in self.__saving
+
+    def metadata(self, key):
+        ''' Returns the details saved with a state (name, created, disk, coldBoot, restores), {} if there are none '''
+        try:
+            with open(os.path.join(self.__snapshotRoot, f"{key}.json"), 'r', encoding="utf-8") as fin:
+                return json.load(fin)
+        except (OSError, ValueError):
+            return {}
+
+    def prepare(self, qemu):
+        ''' Called by qemuSupervisor before launch, restores the instance from its saved state if there is one '''
+        qemu.incoming = ""
+        qemu.restoreDisk = ""
+        self.__restoring.pop(id(qemu), None)
+        key = self.key(qemu)
+        path = self.statePath(key)
+        if not os.path.exists(path):
+            return
+        disk = self.diskPath(key) if self.metadata(key).get("disk") else ""
+        if qemu.imageName and not os.path.exists(disk):
+            # The RAM holds page cache and filesystem state of a disk that is gone, running it would corrupt the guest
+            print(f"WARNING: QEMU instance {qemu.name} has a saved state without its disk, the state is discarded")
+            self.__remove(key)
+            return
+        qemu.incoming = f"file:{path}"
+        qemu.restoreDisk = disk if qemu.imageName else ""
+        self.__restoring[id(qemu)] = (qemu, key)
+        print(f"QEMU instance {qemu.name} restores from {path}")
+
+    def save(self, qemu):
+        ''' Saves the state of a running instance, the guest is paused until the state is written '''
+        if id(qemu) in self.__saving or id(qemu) in self.__restoring:
+            print(f"ERROR: QEMU instance {qemu.name} is saving or restoring its state")
+            return False
+        if qemu.imageName and not qemu.overlay:
+            print(f"ERROR: QEMU instance {qemu.name} has no disk overlay, a state is saved with the disk the overlay holds")
+            return False
+        key = self.key(qemu)
+        path = self.statePath(key)
+        disk = self.diskPath(key) if qemu.overlay else ""
+        try:
+            os.makedirs(self.__snapshotRoot, exist_ok=True)
+        except OSError as e:
+            print(f"ERROR: unable to create snapshot directory {self.__snapshotRoot}: {e}")
+            return False
+        # Restored instances reached the saved point without booting, their cold boot time is the earlier one
+        coldBoot = qemu.bootTime if not qemu.incoming else self.metadata(key).get("coldBoot")
+        if coldBoot is None:
+            print(f"WARNING: QEMU instance {qemu.name} has no cold boot time, \"{BOOT_MARKER}\" was not on its console")
+        self.__saving[id(qemu)] = qemu
+        wasRunning = qemu.runState == "running"
+        progress = {"migrated": False, "resumed": False, "disk": None if disk else ""}  # disk "" once copied
+
+        def resume():
+            if wasRunning and not progress["resumed"]:
+                progress["resumed"] = True
+                self.__qmpPool.resume(qemu)
+
+        def failed(error):
+            if self.__saving.pop(id(qemu), None) is None:
+                return  # Already failed
+            print(f"ERROR: unable to save the state of QEMU instance {qemu.name}: {error}")
+            self.__diskCopies.pop(id(qemu), None)
+            for temporary in (path + ".tmp", disk + ".tmp" if disk else ""):
+                if temporary and os.path.exists(temporary):
+                    os.remove(temporary)
+            resume()
+
+        def completed():
+            # The RAM state and the disk copy finish in either order, the state is complete once both are
+            if id(qemu) not in self.__saving or not progress["migrated"] or progress["disk"] is None:
+                return
+            if progress["disk"]:
+                failed(progress["disk"])
+                return
+            self.__saving.pop(id(qemu))
+            if disk:
+                os.replace(disk + ".tmp", disk)
+            os.replace(path + ".tmp", path)
+            self.__writeMetadata(key, {"name": qemu.name, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                                       "arguments": qemu.arguments(), "disk": bool(disk), "coldBoot": coldBoot,
+                                       "restores": []})
+            print(f"QEMU instance {qemu.name} state saved to {path} ({os.path.getsize(path) >> 20} MB)")
+            self.saved.emit(qemu, coldBoot if coldBoot is not None else -1.0)
+
+        def copied(error):
+            progress["disk"] = error or ""
+            completed()
+
+        def poll(result, error):
+            status = result.get("status") if result is not None else None
+            if status == "completed":
+                progress["migrated"] = True
+                resume()  # The disk copy is of the moment it started, the guest may write again
+                completed()
+            elif status in ("failed", "cancelled") or result is None:
+                failed(error or (result.get("error-desc") or f"migration {status}"))
+            else:
+                QTimer.singleShot(SNAPSHOT_POLL_INTERVAL, self,
+                                  lambda: self.__qmpPool.execute(qemu, "query-migrate", callback=poll))
+
+        def started(result, error):
+            if error is not None:
+                failed(error)
+            else:
+                self.__qmpPool.execute(qemu, "query-migrate", callback=poll)
+
+        def migrate(result, error):
+            if error is not None:
+                failed(error)
+            else:
+                self.__qmpPool.execute(qemu, "migrate", {"uri": f"file:{path}.tmp"}, started)
+
+        def copyDisk(result, error):
+            if error is not None or not disk:
+                migrate(result, error)
+                return
+            self.__diskCopies[id(qemu)] = copied
+            # Only the clusters of the overlay, the copy gets the image as its backing file like the overlay has
+            # A restored instance's overlay is over the disk being replaced, its copy has to hold the whole disk
+            sync = "full" if qemu.restoreDisk else "top"
+            self.__qmpPool.execute(qemu, "drive-backup", {"job-id": SNAPSHOT_JOB, "device": DRIVE_ID, "sync": sync,
+                                                          "target": disk + ".tmp", "format": "qcow2"}, migrate)
+
+        # Paused first so the disk and RAM are of one moment and the RAM is written in one pass instead of
+        # chasing the pages the guest dirties
+        return self.__qmpPool.pause(qemu, copyDisk)
+
+    def remove(self, qemu):
+        ''' Deletes the saved state of the configuration of an instance, its next launch boots '''
+        self.__remove(self.key(qemu))
+
+    @Slot(object, str, dict)
+    def updateDiskCopy(self, qemu, event, data):
+        ''' Completes the disk copy of a save, connect to qemuQmpPool.eventReceived '''
+        if event in JOB_EVENTS and data.get("device") == SNAPSHOT_JOB and id(qemu) in self.__diskCopies:
+            error = data.get("error") or ("disk copy cancelled" if event == "BLOCK_JOB_CANCELLED" else "")
+            self.__diskCopies.pop(id(qemu))(error)
+
+    @Slot(object)
+    def updateInstance(self, qemu):
+        ''' Ends saves and restores of instances that stopped, connect to qemuSupervisor.statusChanged '''
+        if qemu.status != STATUS_RUNNING and id(qemu) in self.__diskCopies:
+            self.__diskCopies.pop(id(qemu))("the instance stopped")
+        if id(qemu) not in self.__restoring or qemu.status in (STATUS_STARTING, STATUS_RUNNING):
+            return
+        (qemu, key) = self.__restoring.pop(id(qemu))
+        if qemu.status in (STATUS_EXITED, STATUS_CRASHED):
+            # QEMU exits if it cannot load the state, it does not match the configuration or QEMU build
+            # A launch that failed before QEMU ran (the overlay could not be created) says nothing about the state
+            print(f"ERROR: QEMU instance {qemu.name} failed to restore its saved state, it boots on its next launch")
+            self.__remove(key)
+
+    @Slot(object)
+    def updateRunState(self, qemu):
+        ''' Resumes restored guests once loaded and records their latency, connect to qemuQmpPool.runStateChanged '''
+        if id(qemu) not in self.__restoring:
+            return
+        if qemu.runState == "inmigrate":
+            self.__pollRestore(qemu)
+            return
+        if qemu.runState == "paused":
+            self.__qmpPool.resume(qemu)  # The RESUME event brings the guest back here as running
+            return
+        if qemu.runState != "running":
+            return
+        (qemu, key) = self.__restoring.pop(id(qemu))
+        latency = time.monotonic() - qemu.launchTime
+        metadata = self.metadata(key)
+        metadata["restores"] = (metadata.get("restores", []) + [latency])[-SNAPSHOT_HISTORY:]
+        self.__writeMetadata(key, metadata)
+        coldBoot = metadata.get("coldBoot")
+        if coldBoot:
+            print(f"QEMU instance {qemu.name} restored in {latency:.2f} s, cold boot {coldBoot:.2f} s "
+                  f"({coldBoot / latency:.1f}x faster)")
+        else:
+            print(f"QEMU instance {qemu.name} restored in {latency:.2f} s")
+        self.restored.emit(qemu, latency)
+
+    def __pollRestore(self, qemu):
+        # QEMU sends no event when it has loaded the state, the run state is queried until it leaves inmigrate
+        def polled(result, error):
+            if result is not None and result.get("status") == "inmigrate" and id(qemu) in self.__restoring:
+                QTimer.singleShot(SNAPSHOT_POLL_INTERVAL, self, lambda: self.__pollRestore(qemu))
+        self.__qmpPool.refreshRunState(qemu, polled)
+
+    def __writeMetadata(self, key, metadata):
+        try:
+            with open(os.path.join(self.__snapshotRoot, f"{key}.json"), 'w', encoding="utf-8") as fout:
+                json.dump(metadata, fout, indent=2)
+        except OSError as e:
+            print(f"ERROR: unable to write snapshot details for {key}: {e}")
+
+    def __remove(self, key):
+        for path in (self.statePath(key), self.diskPath(key), os.path.join(self.__snapshotRoot, f"{key}.json")):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,205 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Launches QEMU instances as child processes and tracks them until they exit
+# Processes are driven entirely by QProcess signals on the event loop, nothing here waits on a process
+# so any number of instances can be starting, running or stopping at once without blocking the GUI
+
+import os, re, time
+from PySide6.QtCore import QObject, QProcess, QTimer, Signal
+from afrl_gui.common import QEMU_BINARY, INSTANCE_RUNTIME_ROOT
+
+STOP_TIMEOUT = 10000  # Milliseconds a stopping instance is given to exit before it is killed
+
+STATUS_STARTING = "Starting"
+STATUS_RUNNING = "Running"
+STATUS_STOPPING = "Stopping"
+STATUS_STOPPED = "Stopped"
+STATUS_EXITED = "Exited"
+STATUS_CRASHED = "Crashed"
+STATUS_FAILED = "Failed"
+
+
+class qemuSupervisor(QObject):
+    statusChanged = Signal(object)  # qemuInstance whose status, pid or exit code changed
+
+    def __init__(self, binary=QEMU_BINARY, runtimeRoot=INSTANCE_RUNTIME_ROOT, cpuAllocator=None,
+                 memoryAdmission=None, snapshots=None, overlays=None, configRoot=None, parent=None):
+        super().__init__(parent)
+        self.__binary = binary
+        self.__runtimeRoot = runtimeRoot
+        self.__cpuAllocator = cpuAllocator  # qemuCpuAllocator assigning host CPUs, None runs instances unpinned
+        self.__memoryAdmission = memoryAdmission  # qemuMemoryAdmission refusing guests the host cannot hold
+        self.__snapshots = snapshots  # qemuSnapshotStore restoring instances from their saved state
+        self.__overlays = overlays  # qemuOverlayManager creating the disk overlays of instances
+        self.__configRoot = configRoot  # Directory of the -readconfig files instances launch with, None for arguments only
+        if overlays is not None:
+            overlays.ready.connect(self.__overlayReady)
+        self.__processes = {}  # id(qemuInstance) -> (qemuInstance, QProcess) for every live instance
+        self.__instances = {}  # QProcess -> qemuInstance, for the process signal handlers
+
+    def __len__(self):
+        return len(self.__processes)
+
+    def instances(self):
+        ''' Returns the instances with a process starting, running or stopping '''
+        return [qemu for (qemu, process) in self.__processes.values()]
+
+    def isRunning(self, qemu):
+        ''' Returns True while the instance has a process starting, running or stopping '''
+        return id(qemu) in self.__processes
+
+    def runtimeDirectory(self, qemu):
+        ''' Returns the directory holding the runtime files (log, sockets) of an instance '''
+        return os.path.join(self.__runtimeRoot, re.sub(r"[^\w.-]", "_", qemu.name) or str(id(qemu)))
+
+    def launch(self, qemu):
+        ''' Starts the instance, returns immediately, progress is reported through statusChanged '''
+        if self.isRunning(qemu):
+            print(f"ERROR: QEMU instance {qemu.name} is already running")
+            return False
+        if self.__memoryAdmission is not None:
+            refusal = self.__memoryAdmission.admit(qemu, self.instances())
+            if refusal:
+                qemu.error = refusal
+                self.__setStatus(qemu, STATUS_FAILED)
+                print(f"ERROR: QEMU instance {qemu.name} not launched: {refusal}")
+                return False
+        runtimeDirectory = self.runtimeDirectory(qemu)
+        if self.__cpuAllocator is not None:
+            self.__cpuAllocator.allocate(qemu)  # Before the arguments, -smp ALL is sized by the allocation
+        if self.__snapshots is not None:
+            self.__snapshots.prepare(qemu)  # After allocation, -smp is in the arguments a state is keyed by
+        try:
+            os.makedirs(runtimeDirectory, exist_ok=True)
+            # After the snapshot, a restored instance gets its overlay over the disk saved with the state
+            creating = self.__overlays is not None and self.__overlays.prepare(qemu)
+        except OSError as e:
+            if self.__cpuAllocator is not None:
+                self.__cpuAllocator.release(qemu)
+            qemu.error = str(e)
+            self.__setStatus(qemu, STATUS_FAILED)
+            return False
+        qemu.pid = 0
+        qemu.exitCode = None
+        qemu.error = ""
+        qemu.logFile = os.path.join(runtimeDirectory, "qemu.log")
+        qemu.qmpSocket = os.path.join(runtimeDirectory, "qmp.sock")
+        qemu.serialSocket = os.path.join(runtimeDirectory, "serial.sock")
+        for path in (qemu.qmpSocket, qemu.serialSocket):
+            if os.path.exists(path):
+                os.remove(path)  # Left by an earlier run, a client could connect to it before QEMU replaces it
+
+        arguments = qemu.arguments()
+        if self.__configRoot is not None:
+            try:
+                arguments = qemu.generateCfgFile(self.__configRoot)
+            except OSError as e:
+                print(f"WARNING: unable to write the config file of QEMU instance {qemu.name}, launching without it: {e}")
+
+        process = QProcess(self)
+        process.setProgram(self.__binary)
+        process.setArguments(arguments)  # Executed directly, no shell
+        process.setStandardInputFile(QProcess.nullDevice())
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        process.setStandardOutputFile(qemu.logFile)  # Nothing reads QEMU's output so it can never fill a pipe
+        # Bound methods rather than lambdas so the connections go when the supervisor does
+        process.started.connect(self.__started)
+        process.finished.connect(self.__finished)
+        process.errorOccurred.connect(self.__error)
+        self.__processes[id(qemu)] = (qemu, process)
+        self.__instances[process] = qemu
+        self.__setStatus(qemu, STATUS_STARTING)
+        qemu.launchTime = time.monotonic()
+        qemu.bootTime = None
+        if not creating:
+            process.start()  # Otherwise started by __overlayReady once qemu-img has created the overlay
+        return True
+
+    def launchAll(self, instances):
+        ''' Starts every instance in parallel '''
+        for qemu in instances:
+            self.launch(qemu)
+
+    def stop(self, qemu):
+        ''' Asks the instance to exit, it is killed if still running after STOP_TIMEOUT '''
+        entry = self.__processes.get(id(qemu))
+        if entry is None:
+            return
+        process = entry[1]
+        if process.state() == QProcess.NotRunning:
+            self.__release(qemu, process)  # Still waiting for its disk overlay
+            self.__setStatus(qemu, STATUS_STOPPED)
+            return
+        self.__setStatus(qemu, STATUS_STOPPING)
+        process.terminate()  # QEMU shuts down cleanly on SIGTERM
+        QTimer.singleShot(STOP_TIMEOUT, process, process.kill)  # Cancelled if the process object is gone
+
+    def stopAll(self):
+        ''' Asks every running instance to exit '''
+        for (qemu, process) in list(self.__processes.values()):
+            self.stop(qemu)
+
+    def __overlayReady(self, qemu, error):
+        entry = self.__processes.get(id(qemu))
+        if entry is None:
+            return
+        if error:
+            qemu.error = error
+            self.__release(qemu, entry[1])
+            self.__setStatus(qemu, STATUS_FAILED)
+            print(f"ERROR: unable to start QEMU instance {qemu.name}: {error}")
+            return
+        entry[1].start()
+
+    def __started(self):
+        process = self.sender()
+        qemu = self.__instances[process]
+        qemu.pid = process.processId()
+        if self.__cpuAllocator is not None:
+            self.__cpuAllocator.pinProcess(qemu)
+        self.__setStatus(qemu, STATUS_RUNNING)
+
+    def __finished(self, exitCode, exitStatus):
+        process = self.sender()
+        qemu = self.__instances[process]
+        if qemu.status == STATUS_STOPPING:
+            qemu.exitCode = None
+            qemu.pid = 0
+            self.__release(qemu, process)
+            self.__setStatus(qemu, STATUS_STOPPED)
+            return
+        if exitStatus == QProcess.CrashExit:
+            qemu.exitCode = None
+            qemu.error = "terminated by a signal"
+            qemu.pid = 0
+            self.__release(qemu, process)
+            self.__setStatus(qemu, STATUS_CRASHED)
+            return
+        qemu.exitCode = exitCode
+        qemu.pid = 0
+        self.__release(qemu, process)
+        self.__setStatus(qemu, STATUS_EXITED)
+
+    def __error(self, error):
+        if error != QProcess.FailedToStart:
+            return  # Crashes are reported through finished
+        process = self.sender()
+        qemu = self.__instances[process]
+        qemu.error = process.errorString()
+        self.__release(qemu, process)
+        self.__setStatus(qemu, STATUS_FAILED)
+        print(f"ERROR: unable to start QEMU instance {qemu.name}: {qemu.error}")
+
+    def __release(self, qemu, process):
+        if self.__cpuAllocator is not None:
+            self.__cpuAllocator.release(qemu)
+        if self.__overlays is not None:
+            self.__overlays.release(qemu)
+        self.__processes.pop(id(qemu), None)
+        self.__instances.pop(process, None)
+        process.deleteLater()
+
+    def __setStatus(self, qemu, status):
+        qemu.status = status
+        self.statusChanged.emit(qemu)
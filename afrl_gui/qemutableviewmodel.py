@@ -1,77 +1,174 @@
 # Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
 
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Slot
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, Slot
+from afrl_gui.common import TABLE_UPDATE_INTERVAL
 from afrl_gui.qemuinstance import qemuInstance
-from afrl_gui.common import MAXIMUM_QEMU_INSTANCES
+from afrl_gui.qemuinstanceregistry import qemuInstanceRegistry
+
+COLUMN_HEADERS = ("Name", "Application", "IP Address", "Status", "CPU", "Memory", "Disk I/O")
+COLUMN_COUNT = len(COLUMN_HEADERS)
+STATUS_COLUMN = 3
+# Telemetry columns and the telemetryHistory field each one shows
+TELEMETRY_FIELDS = {4: "cpu", 5: "rss", 6: "io"}
+ALL_COLUMNS = (1 << COLUMN_COUNT) - 1  # Column bit mask of a whole row
+TELEMETRY_COLUMNS = sum(1 << c for c in TELEMETRY_FIELDS)
+HISTORY_ROLE = Qt.UserRole + 1  # Telemetry column history, oldest sample first, for sparklineDelegate
+
+
+def formatBytes(value):
+    '''Returns a byte count with a binary unit, e.g. 1.5 MiB'''
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def formatTelemetry(field, value):
+    '''Returns the display text of a telemetry sample'''
+    if field == "cpu":
+        return f"{value:.1f} %"
+    elif field == "rss":
+        return formatBytes(value)
+    return formatBytes(value) + "/s"
 
 
 class qemuTableViewModel(QAbstractTableModel):
 
     def __init__(self):
         super().__init__()
-        self.qemuList = []
-        self.validCount = 0
+        self.registry = qemuInstanceRegistry()  # Every QEMU instance, one per row
+        # Changes are collected here and reported to views at most every TABLE_UPDATE_INTERVAL
+        self.__dirty = {}  # instance name -> bit mask of the changed columns
+        self.__flushTimer = QTimer(self)
+        self.__flushTimer.setSingleShot(True)
+        self.__flushTimer.setInterval(TABLE_UPDATE_INTERVAL)
+        self.__flushTimer.timeout.connect(self.flush)
 
-    def rowCount(self, QModelIndex):
-        count = len(self.qemuList)
-        # print(f"rowCount Called, count: {count}")
-        return count
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.registry)
 
-    def columnCount(self, QModelIndex):
-        count = qemuInstance().fieldCount()
-        # print(f"ColumnCount Called, count: {count}")
-        return count
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return COLUMN_COUNT
 
     def headerData(self, section, direction, role=Qt.DisplayRole):
         if direction == Qt.Horizontal and role == Qt.DisplayRole:
-            headers = ["Name", "Application", "IP Address", "Status"]
-            return headers[section]
+            return COLUMN_HEADERS[section]
 
-    def data(self, index, role):
+    def data(self, index, role=Qt.DisplayRole):
         #  print(f"data() being called with index: {index}, role: {role}")
+        if not index.isValid():
+            return None
         if(role == Qt.DisplayRole):
             col = index.column()
             if col == 0:
-                return self.qemuList[index.row()].name
+                return self.registry[index.row()].name
             elif col == 1:
-                return self.qemuList[index.row()].application
+                return self.registry[index.row()].application
             elif col == 2:
-                return self.qemuList[index.row()].ipAddress.toString()
-            elif col == 3:
-                return self.qemuList[index.row()].status
+                return self.registry[index.row()].ipAddress.toString()
+            elif col == STATUS_COLUMN:
+                return self.registry[index.row()].statusText()
+            elif col in TELEMETRY_FIELDS:
+                telemetry = self.registry[index.row()].telemetry
+                value = telemetry.latest(TELEMETRY_FIELDS[col]) if telemetry is not None else None
+                return formatTelemetry(TELEMETRY_FIELDS[col], value) if value is not None else ""
+        elif role == HISTORY_ROLE and index.column() in TELEMETRY_FIELDS:
+            telemetry = self.registry[index.row()].telemetry
+            return telemetry.series(TELEMETRY_FIELDS[index.column()]) if telemetry is not None else None
 
     def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable
 
-    def insertRows(self, position, rows, index=QModelIndex()):
-        self.beginInsertRows(index, position, position + rows - 1)
-        # data is inserted by insertQemuInstance slot
-        self.endInsertRows()
-        return True
-
     def validDataCount(self):
-        '''Returns the number of valid (non-empty) QEMU instances in fixed size list'''
-        return self.validCount
+        '''Returns the number of QEMU instances in the table'''
+        return len(self.registry)
+
+    def instance(self, row):
+        '''Returns the QEMU instance shown in row'''
+        return self.registry[row]
+
+    def markChanged(self, qemu, columns=ALL_COLUMNS):
+        '''Queues a refresh of the given column bit mask of an instance, views see it on the next flush'''
+        self.__dirty[qemu.name] = self.__dirty.get(qemu.name, 0) | columns
+        if not self.__flushTimer.isActive():
+            self.__flushTimer.start()
+
+    @Slot()
+    def flush(self):
+        '''Reports every queued change as the fewest dataChanged rectangles
+           Consecutive rows changed in the same columns are merged into one range'''
+        self.__flushTimer.stop()
+        dirty = self.__dirty
+        if not dirty:
+            return
+        self.__dirty = {}
+        spans = []
+        for (name, columns) in dirty.items():
+            row = self.registry.rowOf(name)
+            if row >= 0:
+                first = (columns & -columns).bit_length() - 1
+                spans.append((row, first, columns.bit_length() - 1))
+        spans.sort()
+        (top, bottom, left, right) = (None, None, None, None)
+        for (row, first, last) in spans:
+            if top is not None and row == bottom + 1 and first == left and last == right:
+                bottom = row
+                continue
+            if top is not None:
+                self.dataChanged.emit(self.createIndex(top, left), self.createIndex(bottom, right))
+            (top, bottom, left, right) = (row, row, first, last)
+        if top is not None:
+            self.dataChanged.emit(self.createIndex(top, left), self.createIndex(bottom, right))
+
+    @Slot(object)
+    def updateQemuInstance(self, qemu):
+        '''Queues a refresh of the row of an instance whose status changed'''
+        row = self.registry.rowOf(qemu.name)
+        if row < 0 or self.registry[row] is not qemu:
+            return  # Removed from the table while its process was still reporting
+        self.registry.updatePid(qemu)
+        self.markChanged(qemu, 1 << STATUS_COLUMN)
+
+    @Slot(object, str, dict)
+    def updateQmpEvent(self, qemu, event, data):
+        '''Queues a refresh of the status of an instance that reported a QMP event'''
+        if self.registry.find(qemu.name) is qemu:
+            self.markChanged(qemu, 1 << STATUS_COLUMN)
+
+    @Slot(list)
+    def updateTelemetry(self, instances):
+        '''Queues a refresh of the telemetry columns of newly sampled instances'''
+        for qemu in instances:
+            if self.registry.find(qemu.name) is qemu:
+                self.markChanged(qemu, TELEMETRY_COLUMNS)
 
     @Slot(qemuInstance)
     def insertQemuInstance(self, qemu):
-        row = 0
-        if len(self.qemuList) < MAXIMUM_QEMU_INSTANCES:
-            row = len(self.qemuList)
-            self.qemuList.append(qemu)
-            self.insertRows(row, 1)
-        else:
-            for row in range(0, MAXIMUM_QEMU_INSTANCES):
-                if not self.qemuList[row].name:
-                    self.qemuList[row] = qemu
-                    break
-                if row == 7:
-                    print("Maximum QEMU Instances reached")
-        topLeft = self.createIndex(row, 0)
-        bottomRight = self.createIndex(row, qemu.fieldCount())
-        # Probably better add a better data validator prior to inserting to list
-        if len(qemu.name):
-            self.validCount = self.validCount + 1 # Don't forget to decrement when deleting
-        self.dataChanged.emit(topLeft, bottomRight)
-        print("Table View Model Received QEMU instance: " + repr(qemu))
-        print(f"cmd line: {qemu.commandLine()}")
+        '''Appends an instance to the table, returns False if an instance with the same name exists'''
+        if qemu.name in self.registry:
+            print(f"ERROR: a QEMU instance named {qemu.name} already exists")
+            return False
+        row = len(self.registry)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.registry.add(qemu)
+        self.endInsertRows()
+        return True
+
+    @Slot(str)
+    def removeQemuInstance(self, name):
+        '''Removes the named instance, the rows below it move up'''
+        row = self.registry.rowOf(name)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.registry.remove(name)
+        self.endRemoveRows()
+        self.__dirty.pop(name, None)
+        return True
@@ -0,0 +1,180 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Samples host resource use (CPU, resident memory, disk I/O) of the supervised QEMU processes from /proc
+# Every tracked process is sampled in one pass per interval, its /proc files are opened once when it starts
+# and re-read in place with pread, so a sample costs three reads per instance whatever the fleet size
+# Samples are kept per instance in fixed size ring buffers backed by arrays
+
+import os, time
+from array import array
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+from afrl_gui.common import TELEMETRY_INTERVAL, TELEMETRY_HISTORY
+from afrl_gui.qemusupervisor import STATUS_RUNNING
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PROC_READ_SIZE = 4096  # Larger than /proc/<pid>/stat, status and io of any process
+
+
+class telemetryHistory:
+    ''' Last `length` samples of one instance, oldest first through series() '''
+    FIELDS = ("cpu", "rss", "io")
+
+    def __init__(self, length=TELEMETRY_HISTORY):
+        self.length = length
+        self.cpu = array('d', [0.0]) * length  # Percent of one host CPU
+        self.rss = array('d', [0.0]) * length  # Resident memory in bytes
+        self.io = array('d', [0.0]) * length  # Bytes read from and written to storage per second
+        self.__next = 0
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def append(self, cpu, rss, io):
+        i = self.__next
+        self.cpu[i] = cpu
+        self.rss[i] = rss
+        self.io[i] = io
+        self.__next = (i + 1) % self.length
+        self.__count = min(self.__count + 1, self.length)
+
+    def latest(self, field):
+        ''' Returns the newest sample of a field, None before the first sample '''
+        if self.__count == 0:
+            return None
+        return getattr(self, field)[self.__next - 1]
+
+    def series(self, field):
+        ''' Returns the samples of a field in time order as an array '''
+        values = getattr(self, field)
+        if self.__count < self.length:
+            return values[:self.__count]
+        return values[self.__next:] + values[:self.__next]
+
+
+class telemetrySource:
+    ''' Open /proc files and previous counters of one sampled process '''
+    __slots__ = ("qemu", "pid", "statFd", "statusFd", "ioFd", "ticks", "ioBytes", "time")
+
+    def __init__(self, qemu):
+        self.qemu = qemu
+        self.pid = qemu.pid
+        self.statFd = self.statusFd = self.ioFd = -1
+        procDirectory = f"/proc/{qemu.pid}"
+        try:
+            self.statFd = os.open(os.path.join(procDirectory, "stat"), os.O_RDONLY)
+            self.statusFd = os.open(os.path.join(procDirectory, "status"), os.O_RDONLY)
+        except OSError:
+            self.close()
+            raise
+        try:
+            self.ioFd = os.open(os.path.join(procDirectory, "io"), os.O_RDONLY)
+        except OSError:
+            pass  # Not readable without ptrace access, I/O is then reported as zero
+        self.ticks = None
+        self.ioBytes = None
+        self.time = None
+
+    def close(self):
+        for fd in (self.statFd, self.statusFd, self.ioFd):
+            if fd >= 0:
+                os.close(fd)
+        self.statFd = self.statusFd = self.ioFd = -1
+
+    def read(self):
+        ''' Returns (cpu ticks, resident bytes, I/O bytes), raises OSError once the process is gone '''
+        stat = os.pread(self.statFd, PROC_READ_SIZE, 0)
+        if not stat:
+            raise ProcessLookupError(self.pid)
+        # Fields after the parenthesized command name, which may itself contain spaces
+        fields = stat[stat.rindex(b")") + 2:].split(b" ", 13)
+        ticks = int(fields[11]) + int(fields[12])  # utime + stime
+        status = os.pread(self.statusFd, PROC_READ_SIZE, 0)
+        start = status.find(b"VmRSS:")
+        rss = int(status[start + 6:status.index(b"kB", start)]) * 1024 if start >= 0 else 0
+        ioBytes = 0
+        if self.ioFd >= 0:
+            # read_bytes and write_bytes count what reached the block layer, rchar and wchar would also count
+            # every QMP, serial console and network socket transfer
+            for line in os.pread(self.ioFd, PROC_READ_SIZE, 0).split(b"\n"):
+                if line.startswith((b"read_bytes:", b"write_bytes:")):
+                    ioBytes += int(line.split(b":")[1])
+        return (ticks, rss, ioBytes)
+
+
+class qemuTelemetrySampler(QObject):
+    sampled = Signal(list)  # qemuInstances whose telemetry received a new sample
+
+    def __init__(self, interval=TELEMETRY_INTERVAL, historyLength=TELEMETRY_HISTORY, parent=None):
+        super().__init__(parent)
+        self.__historyLength = historyLength
+        self.__sources = {}  # id(qemuInstance) -> telemetrySource
+        self.__timer = QTimer(self)
+        self.__timer.setInterval(interval)
+        self.__timer.timeout.connect(self.sampleAll)
+
+    def __len__(self):
+        return len(self.__sources)
+
+    def track(self, qemu):
+        ''' Starts sampling the running process of an instance, its history restarts '''
+        self.untrack(qemu)
+        try:
+            source = telemetrySource(qemu)
+        except OSError as e:
+            print(f"ERROR: unable to sample QEMU instance {qemu.name}: {e}")
+            return False
+        qemu.telemetry = telemetryHistory(self.__historyLength)
+        self.__sources[id(qemu)] = source
+        self.__sample(source, time.monotonic())  # Baseline for the first rate
+        if not self.__timer.isActive():
+            self.__timer.start()
+        return True
+
+    def untrack(self, qemu):
+        ''' Stops sampling an instance, its history is kept for display '''
+        source = self.__sources.pop(id(qemu), None)
+        if source is not None:
+            source.close()
+        if not self.__sources:
+            self.__timer.stop()
+
+    @Slot(object)
+    def updateInstance(self, qemu):
+        ''' Tracks instances while their process runs, connect to qemuSupervisor.statusChanged '''
+        if qemu.status == STATUS_RUNNING and qemu.pid:
+            source = self.__sources.get(id(qemu))
+            if source is None or source.pid != qemu.pid:
+                self.track(qemu)
+        else:
+            self.untrack(qemu)
+
+    @Slot()
+    def sampleAll(self):
+        ''' Takes one sample of every tracked process '''
+        now = time.monotonic()
+        updated = []
+        for source in list(self.__sources.values()):
+            if self.__sample(source, now):
+                updated.append(source.qemu)
+        if updated:
+            self.sampled.emit(updated)
+
+    def __sample(self, source, now):
+        try:
+            (ticks, rss, ioBytes) = source.read()
+        except (OSError, ValueError):
+            self.untrack(source.qemu)  # Exited, the supervisor reports why
+            return False
+        if source.time is None:
+            (source.ticks, source.ioBytes, source.time) = (ticks, ioBytes, now)
+            return False
+        elapsed = now - source.time
+        if elapsed <= 0:
+            return False
+        cpu = (ticks - source.ticks) * 100.0 / CLOCK_TICKS / elapsed
+        io = max(ioBytes - source.ioBytes, 0) / elapsed
+        source.qemu.telemetry.append(cpu, rss, io)
+        (source.ticks, source.ioBytes, source.time) = (ticks, ioBytes, now)
+        return True
@@ -1,20 +1,33 @@
 # Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
 # This Python file uses the following encoding: utf-8
 
-import subprocess, re
+import re
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtWidgets import QWidget, QScrollArea, QLabel, QPushButton
 from PySide6.QtWidgets import QGridLayout, QVBoxLayout, QHBoxLayout
 from PySide6.QtWidgets import QLineEdit, QCheckBox, QPlainTextEdit
 from afrl_gui.parametersetting import parameterSetting
+from afrl_gui.qemucapabilityregistry import qemuCapabilityRegistry
 
 
 class settingsWidget(QWidget):
     ''' base class for device and machine settings widgets '''
     settingsSignal = Signal(list)
 
-    def __init__(self, parent):
+    # Class level so schemas can be queried (and prefetched) without constructing a widget
+    schemaCommand = ""  # QMP command listing the properties of deviceStr
+    schemaTypeSuffix = ""  # suffix appended to deviceStr to form the QOM type name
+    paramStr = ""
+    infoDelimiter = ""  # delimiter string between setting name and type/notes
+    typeStrip = ""  # chars to remove from type strings
+    notesStrip = ""  # chars to remove from notes strings
+    headerPattern = re.compile(r"NULL")
+
+    def __init__(self, parent, cache=None, schemaCache=None):
         super().__init__(parent)
+        registry = qemuCapabilityRegistry.instance()
+        self.cache = cache if cache is not None else registry.cache
+        self.schemaCache = schemaCache if schemaCache is not None else registry.schemaCache
         # Scroll Area for form data
         self.formArea = QScrollArea(self)
         self.setLayout(QVBoxLayout())
@@ -34,51 +47,71 @@ class settingsWidget(QWidget):
         self.layout().addWidget(okCancel)
 
         # Base Class declaration of attributes
-        self.paramStr = ""
         self.settings = []
         self.deviceStr = ""
-        self.infoDelimiter = ""  # delimiter string between setting name and type/notes
-        self.typeStrip = ""  # chars to remove from type strings
-        self.notesStrip = ""  # chars to remove from notes strings
-        self.headerPattern = re.compile(r"NULL")
 
-    def populateFormFields(self):
-        qemuOut = subprocess.run(["./qemu-system-aarch64", self.paramStr, f"{self.deviceStr},?"], capture_output=True)
-        if(qemuOut.returncode != 0):
-            print(f"ERROR: qemu-system-aarch64 {self.paramStr} {self.deviceStr},? returned error code: {qemuOut.returncode}")
-            return
-        outStr = qemuOut.stdout.decode("utf-8")
+    @classmethod
+    def querySettings(cls, cache, deviceStr):
+        ''' Returns the list of parameterSettings for deviceStr from QMP, None if QEMU could not be queried '''
+        properties = cache.query(cls.schemaCommand, {"typename": f"{deviceStr}{cls.schemaTypeSuffix}"})
+        if properties is None:
+            return cls.querySettingsFromHelp(cache, deviceStr)
+        settings = []
+        for p in properties:
+            type = p.get("type", "")
+            if p["name"] == "type" or type.startswith("child<") or type.startswith("link<"):
+                continue  # QOM bookkeeping properties, not user settable
+            notes = p.get("description", "")
+            if "default-value" in p:
+                notes = f"{notes} (default: {p['default-value']})".strip()
+            settings.append(parameterSetting(p["name"], type, notes))
+        return settings
+
+    @classmethod
+    def querySettingsFromHelp(cls, cache, deviceStr):
+        ''' Fallback for binaries without QMP, parses the '<paramStr> <deviceStr>,?' help text '''
+        outStr = cache.output([cls.paramStr, f"{deviceStr},?"])
+        if outStr is None:
+            return None
 
         # Parse out all the device parameterscandidates
+        settings = []
         values = outStr.split('\n')  # Split into lines, process each line
-        layoutRow = 0
-        self.setWindowTitle(f"{self.deviceStr} Settings")
-        self.toggleAllCB = QCheckBox()
-        self.toggleAllCB.stateChanged.connect(self.toggleAllRows)
-        self.form.layout().addWidget(self.toggleAllCB, layoutRow, 0)
-
-        layoutRow += 1
         for v in values:
             if not v:
                 continue  # skip empty strings
-            header = self.headerPattern.match(v)
+            header = cls.headerPattern.match(v)
             if header is not None:
                 continue  # Skip header
             (label, info) = v.split('=', maxsplit=1)
-            labelParts = label.split(f"{self.deviceStr}.", maxsplit=1)
+            labelParts = label.split(f"{deviceStr}.", maxsplit=1)
             if len(labelParts) > 1:
                 label = labelParts[1].strip()
             else:
                 label = labelParts[0].strip()
-            info = info.split(self.infoDelimiter)
+            info = info.split(cls.infoDelimiter)
             type = info[0]
             notes = ""
             if len(info) > 1:
                 notes = info[1]
-            type = type.strip().strip(self.typeStrip)
-            notes = notes.strip().strip(self.notesStrip)
-            self.settings.append(parameterSetting(label, type, notes))
+            type = type.strip().strip(cls.typeStrip)
+            notes = notes.strip().strip(cls.notesStrip)
+            settings.append(parameterSetting(label, type, notes))
+        return settings
+
+    def populateFormFields(self):
+        settings = self.schemaCache.settings(type(self), self.deviceStr)
+        if settings is None:
+            return
+        self.settings.extend(settings)
 
+        layoutRow = 0
+        self.setWindowTitle(f"{self.deviceStr} Settings")
+        self.toggleAllCB = QCheckBox()
+        self.toggleAllCB.stateChanged.connect(self.toggleAllRows)
+        self.form.layout().addWidget(self.toggleAllCB, layoutRow, 0)
+
+        layoutRow += 1
         self.settings.sort()
         for s in self.settings:
             settingLabel = QLabel(s.name())
@@ -0,0 +1,41 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Table cell delegate drawing the recent history of a value as a sparkline next to its text
+# The history is read from the model through historyRole as a sequence of numbers, oldest first
+
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QPainter, QPen, QPolygonF
+from PySide6.QtWidgets import QStyle, QStyledItemDelegate
+
+SPARKLINE_MARGIN = 3  # Pixels between the sparkline and the cell border
+
+
+class sparklineDelegate(QStyledItemDelegate):
+    def __init__(self, historyRole, parent=None):
+        super().__init__(parent)
+        self.__historyRole = historyRole
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        history = index.data(self.__historyRole)
+        if history is None or len(history) < 2:
+            return
+        # The text is left aligned, the sparkline takes the right half of the cell
+        rect = option.rect.adjusted(option.rect.width() // 2, SPARKLINE_MARGIN, -SPARKLINE_MARGIN, -SPARKLINE_MARGIN)
+        if rect.width() < 2 or rect.height() < 2:
+            return
+        top = max(history) or 1.0
+        step = rect.width() / (len(history) - 1)
+        bottom = rect.bottom()
+        line = QPolygonF([QPointF(rect.left() + i * step, bottom - v / top * rect.height())
+                          for (i, v) in enumerate(history)])
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        if option.state & QStyle.State_Selected:
+            color = option.palette.highlightedText().color()
+        else:
+            color = option.palette.highlight().color()
+        painter.setPen(QPen(color, 1))
+        painter.drawPolyline(line)
+        painter.restore()
@@ -0,0 +1,55 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Records startup milestones up to the first paint of the main window
+# Enabled by setting AFRL_GUI_STARTUP_TRACE to the JSON file the milestones are written to,
+# AFRL_GUI_STARTUP_TRACE_EXIT=1 also quits the application once the first paint is recorded
+# Per module import times come from running python with '-X importtime', see benchmarks/benchcoldstart.py
+
+import json, os, time
+
+STARTUP_TRACE_ENV = "AFRL_GUI_STARTUP_TRACE"
+STARTUP_TRACE_EXIT_ENV = "AFRL_GUI_STARTUP_TRACE_EXIT"
+
+
+class startupTrace:
+    def __init__(self, path=None, exitAfterPaint=False):
+        self.__path = path  # None disables the trace
+        self.__exitAfterPaint = exitAfterPaint
+        self.__start = time.perf_counter()
+        self.__milestones = []
+        self.mark("start")
+
+    @classmethod
+    def fromEnvironment(cls):
+        ''' Returns a trace configured by the environment, disabled unless AFRL_GUI_STARTUP_TRACE is set '''
+        return cls(os.environ.get(STARTUP_TRACE_ENV) or None, bool(os.environ.get(STARTUP_TRACE_EXIT_ENV)))
+
+    def isEnabled(self):
+        return self.__path is not None
+
+    def mark(self, name):
+        ''' Records that startup reached the named milestone '''
+        if self.isEnabled():
+            self.__milestones.append({"name": name,
+                                      "time": time.time(),
+                                      "elapsed": time.perf_counter() - self.__start})
+
+    def watch(self, window, app):
+        ''' Finishes the trace on the first paint of window, a MainWindow '''
+        if self.isEnabled():
+            window.firstPainted.connect(lambda: self.finish(app))
+
+    def finish(self, app):
+        ''' Records the first paint and writes the trace '''
+        self.mark("first paint")
+        self.save()
+        if self.__exitAfterPaint:
+            app.quit()
+
+    def save(self):
+        try:
+            with open(self.__path, 'w', encoding="utf-8") as fout:
+                json.dump({"pid": os.getpid(), "milestones": self.__milestones}, fout, indent=2)
+        except OSError as e:
+            print(f"ERROR: unable to write startup trace {self.__path}: {e}")
@@ -27,12 +27,16 @@ class Ui_MainWindow(object):
         MainWindow.resize(1150, 508)
         self.action_file_new_qemu_instance = QAction(MainWindow)
         self.action_file_new_qemu_instance.setObjectName(u"action_file_new_qemu_instance")
+        self.action_file_launch_fleet = QAction(MainWindow)
+        self.action_file_launch_fleet.setObjectName(u"action_file_launch_fleet")
         self.action_help_about = QAction(MainWindow)
         self.action_help_about.setObjectName(u"action_help_about")
         self.action_file_exit = QAction(MainWindow)
         self.action_file_exit.setObjectName(u"action_file_exit")
         self.actionModify_Image_Contents = QAction(MainWindow)
         self.actionModify_Image_Contents.setObjectName(u"actionModify_Image_Contents")
+        self.action_file_refresh_capabilities = QAction(MainWindow)
+        self.action_file_refresh_capabilities.setObjectName(u"action_file_refresh_capabilities")
         self.widget = QWidget(MainWindow)
         self.widget.setObjectName(u"widget")
         self.ghLogoLabel = QLabel(self.widget)
@@ -69,8 +73,10 @@ class Ui_MainWindow(object):
         self.menubar.addAction(self.menuAFRL_RWWN_QEMU_Launcher.menuAction())
         self.menubar.addAction(self.menuHelp.menuAction())
         self.menuAFRL_RWWN_QEMU_Launcher.addAction(self.action_file_new_qemu_instance)
+        self.menuAFRL_RWWN_QEMU_Launcher.addAction(self.action_file_launch_fleet)
         self.menuAFRL_RWWN_QEMU_Launcher.addSeparator()
         self.menuAFRL_RWWN_QEMU_Launcher.addAction(self.actionModify_Image_Contents)
+        self.menuAFRL_RWWN_QEMU_Launcher.addAction(self.action_file_refresh_capabilities)
         self.menuAFRL_RWWN_QEMU_Launcher.addAction(self.action_file_exit)
         self.menuHelp.addAction(self.action_help_about)
 
@@ -87,12 +93,20 @@ class Ui_MainWindow(object):
         self.action_file_new_qemu_instance.setText(QCoreApplication.translate("MainWindow", u"New QEMU Instance", None))
 #if QT_CONFIG(tooltip)
         self.action_file_new_qemu_instance.setToolTip(QCoreApplication.translate("MainWindow", u"Opens wizard to create a new QEMU instance", None))
+#endif // QT_CONFIG(tooltip)
+        self.action_file_launch_fleet.setText(QCoreApplication.translate("MainWindow", u"Launch Fleet Manifest...", None))
+#if QT_CONFIG(tooltip)
+        self.action_file_launch_fleet.setToolTip(QCoreApplication.translate("MainWindow", u"Creates and launches every QEMU instance described in a fleet manifest", None))
 #endif // QT_CONFIG(tooltip)
         self.action_help_about.setText(QCoreApplication.translate("MainWindow", u"About", None))
         self.action_file_exit.setText(QCoreApplication.translate("MainWindow", u"Exit", None))
         self.actionModify_Image_Contents.setText(QCoreApplication.translate("MainWindow", u"Modify Image Contents", None))
 #if QT_CONFIG(tooltip)
         self.actionModify_Image_Contents.setToolTip(QCoreApplication.translate("MainWindow", u"Opens GUI to copy items into guest image", None))
+#endif // QT_CONFIG(tooltip)
+        self.action_file_refresh_capabilities.setText(QCoreApplication.translate("MainWindow", u"Refresh QEMU Capabilities", None))
+#if QT_CONFIG(tooltip)
+        self.action_file_refresh_capabilities.setToolTip(QCoreApplication.translate("MainWindow", u"Re-queries the QEMU binary for machines, CPUs and devices", None))
 #endif // QT_CONFIG(tooltip)
         self.ghLogoLabel.setText("")
         self.jstarLogoLabel.setText("")
@@ -88,20 +88,66 @@ class Ui_qemuLaunchWizard(object):
         self.frame_5.setFrameShadow(QFrame.Raised)
         self.memoryLabel = QLabel(self.frame_5)
         self.memoryLabel.setObjectName(u"memoryLabel")
-        self.memoryLabel.setGeometry(QRect(40, 30, 81, 31))
+        self.memoryLabel.setGeometry(QRect(40, 5, 81, 31))
         self.memorySpinBox = QSpinBox(self.frame_5)
         self.memorySpinBox.setObjectName(u"memorySpinBox")
-        self.memorySpinBox.setGeometry(QRect(130, 30, 201, 31))
+        self.memorySpinBox.setGeometry(QRect(130, 5, 201, 31))
         self.memorySpinBox.setSuffix(u"MB")
         self.memorySpinBox.setMinimum(4)
         self.memorySpinBox.setMaximum(16384)
         self.memorySpinBox.setValue(128)
+        self.memoryBackendLabel = QLabel(self.frame_5)
+        self.memoryBackendLabel.setObjectName(u"memoryBackendLabel")
+        self.memoryBackendLabel.setGeometry(QRect(40, 42, 81, 31))
+        self.memoryBackendComboBox = QComboBox(self.frame_5)
+        self.memoryBackendComboBox.addItem("")
+        self.memoryBackendComboBox.addItem("")
+        self.memoryBackendComboBox.addItem("")
+        self.memoryBackendComboBox.setObjectName(u"memoryBackendComboBox")
+        self.memoryBackendComboBox.setGeometry(QRect(130, 42, 121, 31))
+        self.memoryPreallocCheckBox = QCheckBox(self.frame_5)
+        self.memoryPreallocCheckBox.setObjectName(u"memoryPreallocCheckBox")
+        self.memoryPreallocCheckBox.setGeometry(QRect(260, 42, 91, 31))
         qemuLaunchWizard.addPage(self.qemuLaunchWizardMachineCpuPage)
+        self.qemuLaunchWizardAccelPage = QWizardPage()
+        self.qemuLaunchWizardAccelPage.setObjectName(u"qemuLaunchWizardAccelPage")
+        self.accelLabel = QLabel(self.qemuLaunchWizardAccelPage)
+        self.accelLabel.setObjectName(u"accelLabel")
+        self.accelLabel.setGeometry(QRect(20, 20, 111, 30))
+        self.accelComboBox = QComboBox(self.qemuLaunchWizardAccelPage)
+        self.accelComboBox.addItem("")
+        self.accelComboBox.addItem("")
+        self.accelComboBox.addItem("")
+        self.accelComboBox.setObjectName(u"accelComboBox")
+        self.accelComboBox.setGeometry(QRect(140, 20, 171, 30))
+        self.tcgThreadLabel = QLabel(self.qemuLaunchWizardAccelPage)
+        self.tcgThreadLabel.setObjectName(u"tcgThreadLabel")
+        self.tcgThreadLabel.setGeometry(QRect(20, 60, 111, 30))
+        self.tcgThreadComboBox = QComboBox(self.qemuLaunchWizardAccelPage)
+        self.tcgThreadComboBox.addItem("")
+        self.tcgThreadComboBox.addItem("")
+        self.tcgThreadComboBox.addItem("")
+        self.tcgThreadComboBox.setObjectName(u"tcgThreadComboBox")
+        self.tcgThreadComboBox.setGeometry(QRect(140, 60, 171, 30))
+        self.tbSizeLabel = QLabel(self.qemuLaunchWizardAccelPage)
+        self.tbSizeLabel.setObjectName(u"tbSizeLabel")
+        self.tbSizeLabel.setGeometry(QRect(20, 100, 111, 30))
+        self.tbSizeSpinBox = QSpinBox(self.qemuLaunchWizardAccelPage)
+        self.tbSizeSpinBox.setObjectName(u"tbSizeSpinBox")
+        self.tbSizeSpinBox.setGeometry(QRect(140, 100, 171, 30))
+        self.tbSizeSpinBox.setSuffix(u" MB")
+        self.tbSizeSpinBox.setMaximum(4096)
+        self.tbSizeSpinBox.setSingleStep(64)
+        self.accelSummaryLabel = QLabel(self.qemuLaunchWizardAccelPage)
+        self.accelSummaryLabel.setObjectName(u"accelSummaryLabel")
+        self.accelSummaryLabel.setGeometry(QRect(20, 150, 331, 60))
+        self.accelSummaryLabel.setWordWrap(True)
+        qemuLaunchWizard.addPage(self.qemuLaunchWizardAccelPage)
         self.qemuLaunchWizardDevicePage = QWizardPage()
         self.qemuLaunchWizardDevicePage.setObjectName(u"qemuLaunchWizardDevicePage")
         self.frame_3 = QFrame(self.qemuLaunchWizardDevicePage)
         self.frame_3.setObjectName(u"frame_3")
-        self.frame_3.setGeometry(QRect(0, 0, 371, 101))
+        self.frame_3.setGeometry(QRect(0, 0, 371, 141))
         self.frame_3.setFrameShape(QFrame.StyledPanel)
         self.frame_3.setFrameShadow(QFrame.Raised)
         self.deviceTypeLabel = QLabel(self.frame_3)
@@ -121,14 +167,22 @@ class Ui_qemuLaunchWizard(object):
         self.addDevicePushButton = QPushButton(self.frame_3)
         self.addDevicePushButton.setObjectName(u"addDevicePushButton")
         self.addDevicePushButton.setGeometry(QRect(300, 10, 61, 71))
+        self.deviceSearchLabel = QLabel(self.frame_3)
+        self.deviceSearchLabel.setObjectName(u"deviceSearchLabel")
+        self.deviceSearchLabel.setGeometry(QRect(8, 90, 81, 31))
+        self.deviceSearchLabel.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+        self.deviceSearchLineEdit = QLineEdit(self.frame_3)
+        self.deviceSearchLineEdit.setObjectName(u"deviceSearchLineEdit")
+        self.deviceSearchLineEdit.setGeometry(QRect(100, 90, 261, 31))
+        self.deviceSearchLineEdit.setClearButtonEnabled(True)
         self.frame_4 = QFrame(self.qemuLaunchWizardDevicePage)
         self.frame_4.setObjectName(u"frame_4")
-        self.frame_4.setGeometry(QRect(0, 110, 371, 241))
+        self.frame_4.setGeometry(QRect(0, 150, 371, 201))
         self.frame_4.setFrameShape(QFrame.StyledPanel)
         self.frame_4.setFrameShadow(QFrame.Raised)
         self.deviceListView = QListView(self.frame_4)
         self.deviceListView.setObjectName(u"deviceListView")
-        self.deviceListView.setGeometry(QRect(0, 0, 291, 231))
+        self.deviceListView.setGeometry(QRect(0, 0, 291, 191))
         self.removeDevicePushButton = QPushButton(self.frame_4)
         self.removeDevicePushButton.setObjectName(u"removeDevicePushButton")
         self.removeDevicePushButton.setGeometry(QRect(300, 80, 61, 61))
@@ -159,7 +213,73 @@ class Ui_qemuLaunchWizard(object):
         self.modImagePushButton = QPushButton(self.frame_6)
         self.modImagePushButton.setObjectName(u"modImagePushButton")
         self.modImagePushButton.setGeometry(QRect(178, 50, 171, 31))
+        self.imageOverlayLabel = QLabel(self.frame_6)
+        self.imageOverlayLabel.setObjectName(u"imageOverlayLabel")
+        self.imageOverlayLabel.setGeometry(QRect(10, 95, 131, 31))
+        self.imageOverlayComboBox = QComboBox(self.frame_6)
+        self.imageOverlayComboBox.addItem("")
+        self.imageOverlayComboBox.addItem("")
+        self.imageOverlayComboBox.addItem("")
+        self.imageOverlayComboBox.setObjectName(u"imageOverlayComboBox")
+        self.imageOverlayComboBox.setGeometry(QRect(150, 95, 201, 31))
         qemuLaunchWizard.addPage(self.qemuLaunchWizardImagePage)
+        self.qemuLaunchWizardDrivePage = QWizardPage()
+        self.qemuLaunchWizardDrivePage.setObjectName(u"qemuLaunchWizardDrivePage")
+        self.driveCacheLabel = QLabel(self.qemuLaunchWizardDrivePage)
+        self.driveCacheLabel.setObjectName(u"driveCacheLabel")
+        self.driveCacheLabel.setGeometry(QRect(20, 10, 111, 30))
+        self.driveCacheComboBox = QComboBox(self.qemuLaunchWizardDrivePage)
+        self.driveCacheComboBox.addItem("")
+        self.driveCacheComboBox.addItem("")
+        self.driveCacheComboBox.addItem("")
+        self.driveCacheComboBox.addItem("")
+        self.driveCacheComboBox.addItem("")
+        self.driveCacheComboBox.addItem("")
+        self.driveCacheComboBox.setObjectName(u"driveCacheComboBox")
+        self.driveCacheComboBox.setGeometry(QRect(140, 10, 171, 30))
+        self.driveAioLabel = QLabel(self.qemuLaunchWizardDrivePage)
+        self.driveAioLabel.setObjectName(u"driveAioLabel")
+        self.driveAioLabel.setGeometry(QRect(20, 46, 111, 30))
+        self.driveAioComboBox = QComboBox(self.qemuLaunchWizardDrivePage)
+        self.driveAioComboBox.addItem("")
+        self.driveAioComboBox.addItem("")
+        self.driveAioComboBox.addItem("")
+        self.driveAioComboBox.addItem("")
+        self.driveAioComboBox.setObjectName(u"driveAioComboBox")
+        self.driveAioComboBox.setGeometry(QRect(140, 46, 171, 30))
+        self.driveDiscardLabel = QLabel(self.qemuLaunchWizardDrivePage)
+        self.driveDiscardLabel.setObjectName(u"driveDiscardLabel")
+        self.driveDiscardLabel.setGeometry(QRect(20, 82, 111, 30))
+        self.driveDiscardCheckBox = QCheckBox(self.qemuLaunchWizardDrivePage)
+        self.driveDiscardCheckBox.setObjectName(u"driveDiscardCheckBox")
+        self.driveDiscardCheckBox.setGeometry(QRect(140, 82, 171, 30))
+        self.driveDetectZeroesLabel = QLabel(self.qemuLaunchWizardDrivePage)
+        self.driveDetectZeroesLabel.setObjectName(u"driveDetectZeroesLabel")
+        self.driveDetectZeroesLabel.setGeometry(QRect(20, 118, 111, 30))
+        self.driveDetectZeroesComboBox = QComboBox(self.qemuLaunchWizardDrivePage)
+        self.driveDetectZeroesComboBox.addItem("")
+        self.driveDetectZeroesComboBox.addItem("")
+        self.driveDetectZeroesComboBox.addItem("")
+        self.driveDetectZeroesComboBox.setObjectName(u"driveDetectZeroesComboBox")
+        self.driveDetectZeroesComboBox.setGeometry(QRect(140, 118, 171, 30))
+        self.driveIopsLabel = QLabel(self.qemuLaunchWizardDrivePage)
+        self.driveIopsLabel.setObjectName(u"driveIopsLabel")
+        self.driveIopsLabel.setGeometry(QRect(20, 154, 111, 30))
+        self.driveIopsSpinBox = QSpinBox(self.qemuLaunchWizardDrivePage)
+        self.driveIopsSpinBox.setObjectName(u"driveIopsSpinBox")
+        self.driveIopsSpinBox.setGeometry(QRect(140, 154, 171, 30))
+        self.driveIopsSpinBox.setMaximum(1000000)
+        self.driveIopsSpinBox.setSingleStep(100)
+        self.driveBandwidthLabel = QLabel(self.qemuLaunchWizardDrivePage)
+        self.driveBandwidthLabel.setObjectName(u"driveBandwidthLabel")
+        self.driveBandwidthLabel.setGeometry(QRect(20, 190, 111, 30))
+        self.driveBandwidthSpinBox = QSpinBox(self.qemuLaunchWizardDrivePage)
+        self.driveBandwidthSpinBox.setObjectName(u"driveBandwidthSpinBox")
+        self.driveBandwidthSpinBox.setGeometry(QRect(140, 190, 171, 30))
+        self.driveBandwidthSpinBox.setSuffix(u" MB/s")
+        self.driveBandwidthSpinBox.setMaximum(100000)
+        self.driveBandwidthSpinBox.setSingleStep(10)
+        qemuLaunchWizard.addPage(self.qemuLaunchWizardDrivePage)
         self.qemuLaunchWizardNetworkPage = QWizardPage()
         self.qemuLaunchWizardNetworkPage.setObjectName(u"qemuLaunchWizardNetworkPage")
         self.frame_7 = QFrame(self.qemuLaunchWizardNetworkPage)
@@ -233,15 +353,102 @@ class Ui_qemuLaunchWizard(object):
         self.smpLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"SMP Cores", None))
         self.smpAllCheckBox.setText(QCoreApplication.translate("qemuLaunchWizard", u"ALL", None))
         self.memoryLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Memory", None))
+        self.memoryBackendLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Backing", None))
+        self.memoryBackendComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Default", None))
+        self.memoryBackendComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"memfd", None))
+        self.memoryBackendComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"Hugepages", None))
+
+#if QT_CONFIG(tooltip)
+        self.memoryBackendComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Backs guest RAM with QEMU allocated memory, a memfd or hugetlbfs hugepages", None))
+#endif // QT_CONFIG(tooltip)
+#if QT_CONFIG(tooltip)
+        self.memoryPreallocCheckBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Allocates all guest RAM at startup instead of on first use", None))
+#endif // QT_CONFIG(tooltip)
+        self.memoryPreallocCheckBox.setText(QCoreApplication.translate("qemuLaunchWizard", u"Prealloc", None))
+        self.accelLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Accelerator", None))
+        self.accelComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Auto", None))
+        self.accelComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"TCG", None))
+        self.accelComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"KVM", None))
+
+#if QT_CONFIG(tooltip)
+        self.accelComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"KVM needs an aarch64 host with /dev/kvm, Auto uses it when available and TCG otherwise", None))
+#endif // QT_CONFIG(tooltip)
+        self.tcgThreadLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"TCG Threads", None))
+        self.tcgThreadComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Auto", None))
+        self.tcgThreadComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"Multi", None))
+        self.tcgThreadComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"Single", None))
+
+#if QT_CONFIG(tooltip)
+        self.tcgThreadComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Multi runs one translation thread per vCPU, Single one thread for all vCPUs", None))
+#endif // QT_CONFIG(tooltip)
+        self.tbSizeLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Translation Cache", None))
+#if QT_CONFIG(tooltip)
+        self.tbSizeSpinBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"TCG translation cache size, larger caches retranslate less often", None))
+#endif // QT_CONFIG(tooltip)
+        self.tbSizeSpinBox.setSpecialValueText(QCoreApplication.translate("qemuLaunchWizard", u"Auto", None))
+        self.accelSummaryLabel.setText("")
         self.deviceTypeLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Device Type", None))
         self.deviceLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Device", None))
         self.addDevicePushButton.setText(QCoreApplication.translate("qemuLaunchWizard", u"Add", None))
+        self.deviceSearchLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Search", None))
+        self.deviceSearchLineEdit.setPlaceholderText(QCoreApplication.translate("qemuLaunchWizard", u"Filter devices by name, bus or description", None))
         self.removeDevicePushButton.setText(QCoreApplication.translate("qemuLaunchWizard", u"Remove", None))
         self.editDevicePushButton.setText(QCoreApplication.translate("qemuLaunchWizard", u"Edit", None))
         self.imageSelectButton.setText("")
         self.imageLineEdit.setText(QCoreApplication.translate("qemuLaunchWizard", u"image", None))
         self.imageLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Image File", None))
         self.modImagePushButton.setText(QCoreApplication.translate("qemuLaunchWizard", u"Modify Image Contents", None))
+        self.imageOverlayLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Disk Changes", None))
+        self.imageOverlayComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Discard on shutdown", None))
+        self.imageOverlayComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"Keep for next launch", None))
+        self.imageOverlayComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"Write to image", None))
+
+#if QT_CONFIG(tooltip)
+        self.imageOverlayComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Guest writes go to a qcow2 overlay over the image, discarded or kept when the instance stops", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveCacheLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Cache", None))
+        self.driveCacheComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Default", None))
+        self.driveCacheComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"Writeback", None))
+        self.driveCacheComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"None", None))
+        self.driveCacheComboBox.setItemText(3, QCoreApplication.translate("qemuLaunchWizard", u"Writethrough", None))
+        self.driveCacheComboBox.setItemText(4, QCoreApplication.translate("qemuLaunchWizard", u"Direct Sync", None))
+        self.driveCacheComboBox.setItemText(5, QCoreApplication.translate("qemuLaunchWizard", u"Unsafe", None))
+
+#if QT_CONFIG(tooltip)
+        self.driveCacheComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Host page cache use, None and Direct Sync bypass it with O_DIRECT", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveAioLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Async I/O", None))
+        self.driveAioComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Default", None))
+        self.driveAioComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"Threads", None))
+        self.driveAioComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"Native", None))
+        self.driveAioComboBox.setItemText(3, QCoreApplication.translate("qemuLaunchWizard", u"io_uring", None))
+
+#if QT_CONFIG(tooltip)
+        self.driveAioComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"I/O engine, Native needs cache None or Direct Sync, io_uring needs a QEMU built with liburing", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveDiscardLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Discard", None))
+#if QT_CONFIG(tooltip)
+        self.driveDiscardCheckBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Passes guest TRIM down to the image, freeing overlay clusters and host blocks", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveDiscardCheckBox.setText(QCoreApplication.translate("qemuLaunchWizard", u"Unmap", None))
+        self.driveDetectZeroesLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Detect Zeroes", None))
+        self.driveDetectZeroesComboBox.setItemText(0, QCoreApplication.translate("qemuLaunchWizard", u"Off", None))
+        self.driveDetectZeroesComboBox.setItemText(1, QCoreApplication.translate("qemuLaunchWizard", u"On", None))
+        self.driveDetectZeroesComboBox.setItemText(2, QCoreApplication.translate("qemuLaunchWizard", u"Unmap", None))
+
+#if QT_CONFIG(tooltip)
+        self.driveDetectZeroesComboBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Stores zero writes as zero clusters, Unmap discards them and needs Discard", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveIopsLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"IOPS Limit", None))
+#if QT_CONFIG(tooltip)
+        self.driveIopsSpinBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Total read and write operations per second the guest may issue", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveIopsSpinBox.setSpecialValueText(QCoreApplication.translate("qemuLaunchWizard", u"Unlimited", None))
+        self.driveBandwidthLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Bandwidth Limit", None))
+#if QT_CONFIG(tooltip)
+        self.driveBandwidthSpinBox.setToolTip(QCoreApplication.translate("qemuLaunchWizard", u"Total read and write throughput the guest may use", None))
+#endif // QT_CONFIG(tooltip)
+        self.driveBandwidthSpinBox.setSpecialValueText(QCoreApplication.translate("qemuLaunchWizard", u"Unlimited", None))
         self.qemuLaunchWizardNetworkPage.setTitle("")
         self.ipLineEdit.setText(QCoreApplication.translate("qemuLaunchWizard", u"000.000.000.000", None))
         self.gatewayLabel.setText(QCoreApplication.translate("qemuLaunchWizard", u"Gateway", None))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Times guest boot under each accelerator setting, to choose the -accel settings of an instance
+# The guest is launched with the command line qemuInstance builds, its serial console on stdout, and a boot is
+# timed from process start until --marker appears on the console; every TCG thread mode and translation cache
+# size is run, and KVM when the host can run the guest, results are written as JSON with the fastest setting
+#
+#   python3 benchmarks/benchboot.py --kernel Image --initrd rootfs.cpio --smp 4 --output boot.json
+#   python3 benchmarks/benchboot.py --kernel Image --tb-sizes 128,512 --threads multi --marker "Welcome"
+
+import argparse, json, os, platform, re, select, signal, subprocess, sys, time
+
+BENCHMARK_ROOT = os.path.dirname(os.path.realpath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+from benchstartup import summarize, gitRevision
+from afrl_gui.common import BOOT_MARKER
+from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.qemuaccelerator import ACCEL_KVM, ACCEL_TCG, kvmAvailable, kvmCpu, acceleratorOption
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Benchmark guest boot time under each QEMU accelerator setting")
+    parser.add_argument("--binary", default="qemu-system-aarch64", help="QEMU binary to boot the guest with")
+    parser.add_argument("--machine", default="virt", help="machine of the guest")
+    parser.add_argument("--cpu", default="cortex-a53", help="cpu of the guest, the KVM run uses host")
+    parser.add_argument("--kernel", required=True, help="kernel image to boot")
+    parser.add_argument("--initrd", help="initial ramdisk of the guest")
+    parser.add_argument("--append", default="console=ttyAMA0", help="kernel command line")
+    parser.add_argument("--image", help="raw disk image of the guest")
+    parser.add_argument("--smp", default="4", help="vCPUs of the guest")
+    parser.add_argument("--memory", type=int, default=1024, help="guest RAM in MB")
+    parser.add_argument("--threads", default="single,multi", help="comma separated TCG thread modes to run")
+    parser.add_argument("--tb-sizes", default="64,256,1024", help="comma separated translation cache sizes in MB")
+    parser.add_argument("--marker", default=BOOT_MARKER, help="regular expression on the console that ends a boot")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a boot is abandoned")
+    parser.add_argument("--repeat", type=int, default=3, help="timed boots of each setting")
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if omitted")
+    return parser.parse_args()
+
+
+def settings(args):
+    ''' Returns [(accelerator, tcgThreads, tbSize, cpu)] of every setting to run '''
+    runs = [(ACCEL_TCG, threads, int(tbSize), args.cpu) for threads in args.threads.split(",")
+            for tbSize in args.tb_sizes.split(",")]
+    if kvmAvailable():
+        runs.append((ACCEL_KVM, "", 0, args.cpu if kvmCpu(args.cpu) else "host"))  # KVM rejects named cpu models
+    return runs
+
+
+def commandLine(args, accelerator, tcgThreads, tbSize, cpu):
+    qemu = qemuInstance()
+    qemu.machine = args.machine
+    qemu.cpu = cpu
+    qemu.smpCores = args.smp
+    qemu.memory = args.memory
+    qemu.kernel = args.kernel
+    qemu.imageName = args.image or ""
+    qemu.accelerator = accelerator
+    qemu.tcgThreads = tcgThreads
+    qemu.tbSize = tbSize
+    cmd = [args.binary] + qemu.arguments()
+    if args.initrd:
+        cmd += ["-initrd", args.initrd]
+    return cmd + ["-append", args.append, "-display", "none", "-serial", "stdio", "-monitor", "none"], \
+        acceleratorOption(qemu)
+
+
+def timeBoot(cmd, marker, timeout):
+    ''' Returns the seconds from start until marker is on the console, None if QEMU exits or timeout expires '''
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    console = b""
+    try:
+        while True:
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0 or not select.select([process.stdout], [], [], remaining)[0]:
+                return None
+            data = os.read(process.stdout.fileno(), 65536)
+            if not data:
+                return None
+            console = console[-4096:] + data  # Enough overlap for a marker split across reads
+            if marker.search(console):
+                return time.perf_counter() - start
+    finally:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.wait()
+        process.stdout.close()
+
+
+def main():
+    args = parseArgs()
+    marker = re.compile(args.marker.encode("utf-8"))
+    results = {}
+    for (accelerator, tcgThreads, tbSize, cpu) in settings(args):
+        (cmd, option) = commandLine(args, accelerator, tcgThreads, tbSize, cpu)
+        times = []
+        for i in range(args.repeat):
+            seconds = timeBoot(cmd, marker, args.timeout)
+            if seconds is None:
+                print(f"ERROR: {option} did not reach \"{args.marker}\", see: {' '.join(cmd)}", file=sys.stderr)
+                break
+            times.append(seconds)
+        results[option] = summarize(times) if len(times) == args.repeat else None
+        if results[option]:
+            print(f"{option:40s} median {results[option]['median']:8.2f} s  min {results[option]['min']:8.2f} s",
+                  file=sys.stderr)
+    booted = [option for option in results if results[option]]
+    report = {"version": RESULTS_FORMAT_VERSION,
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "revision": gitRevision(),
+              "platform": platform.platform(),
+              "cpus": os.cpu_count(),
+              "smp": args.smp,
+              "memory": args.memory,
+              "repeat": args.repeat,
+              "fastest": min(booted, key=lambda o: results[o]["median"]) if booted else None,
+              "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as fout:
+            fout.write(text + "\n")
+    else:
+        print(text)
+    print(f"Fastest: -accel {report['fastest']}", file=sys.stderr)
+    return 0 if booted else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
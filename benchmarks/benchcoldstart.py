@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Measures GUI cold start: time from launching the interpreter to the first paint of the main window
+# Each run starts afrl_gui.app in a fresh process against the fake QEMU, one extra run under '-X importtime'
+# records the import time of every module on the startup path
+# Exits non zero when the median time to first paint misses the target
+#
+#   python3 benchmarks/benchcoldstart.py --output coldstart.json
+
+import argparse, json, os, statistics, subprocess, sys, tempfile, time, shutil
+
+from benchstartup import REPO_ROOT, prepareEnvironment, summarize, gitRevision
+
+FIRST_PAINT_TARGET_MS = 500  # Median time to first paint, interpreter start included
+APP_COMMAND = "import sys; from afrl_gui.app import run; sys.exit(run())"
+APP_TIMEOUT = 60  # Seconds before a run that never paints is abandoned
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Measure AFRL QEMU GUI time to first paint")
+    parser.add_argument("--repeat", type=int, default=5, help="timed application starts")
+    parser.add_argument("--target-ms", type=float, default=FIRST_PAINT_TARGET_MS, help="time to first paint target")
+    parser.add_argument("--imports", type=int, default=40, help="slowest imports to report, 0 reports all")
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if omitted")
+    parser.set_defaults(scale=1, noqmp=False)
+    return parser.parse_args()
+
+
+def startApplication(workDir, extraArgs=()):
+    ''' Runs the application until its first paint, returns (seconds to first paint, milestones, stderr) '''
+    traceFile = os.path.join(workDir, "startup-trace.json")
+    if os.path.exists(traceFile):
+        os.remove(traceFile)
+    env = dict(os.environ, AFRL_GUI_STARTUP_TRACE=traceFile, AFRL_GUI_STARTUP_TRACE_EXIT="1",
+               PYTHONPATH=os.pathsep.join(p for p in (REPO_ROOT, os.environ.get("PYTHONPATH")) if p))
+    launched = time.time()
+    process = subprocess.run([sys.executable, *extraArgs, "-c", APP_COMMAND], env=env, timeout=APP_TIMEOUT,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        with open(traceFile, 'r', encoding="utf-8") as fin:
+            milestones = json.load(fin)["milestones"]
+    except (OSError, ValueError):
+        raise RuntimeError(f"application exited ({process.returncode}) without painting:\n"
+                           f"{process.stderr.decode('utf-8', 'replace')}")
+    firstPaint = milestones[-1]["time"] - launched
+    return (firstPaint, milestones, process.stderr.decode("utf-8", "replace"))
+
+
+def parseImportTimes(stderr):
+    ''' Returns [{module, self, cumulative}] in seconds from python -X importtime output, slowest first '''
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        (selfTime, cumulative, module) = line[len("import time:"):].split("|")
+        imports.append({"module": module.strip(),
+                        "self": int(selfTime) / 1e6,
+                        "cumulative": int(cumulative) / 1e6})
+    imports.sort(key=lambda i: i["cumulative"], reverse=True)
+    return imports
+
+
+def main():
+    args = parseArgs()
+    output = os.path.realpath(args.output) if args.output else None
+    workDir = tempfile.mkdtemp(prefix="afrl-coldstart-")
+    try:
+        prepareEnvironment(args, workDir)
+        startApplication(workDir)  # Populates the capability cache and warms the OS file cache
+        runs = [startApplication(workDir) for i in range(args.repeat)]
+        (traceTime, traceMilestones, traceStderr) = startApplication(workDir, ("-X", "importtime"))
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    firstPaint = summarize([r[0] for r in runs])
+    milestones = {}
+    for (name, index) in ((m["name"], i) for (i, m) in enumerate(runs[0][1])):
+        milestones[name] = statistics.median(r[1][index]["elapsed"] for r in runs)
+    imports = parseImportTimes(traceStderr)
+    report = {"version": 1,
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "revision": gitRevision(),
+              "python": sys.version.split()[0],
+              "qpa": os.environ["QT_QPA_PLATFORM"],
+              "targetMs": args.target_ms,
+              "targetMet": firstPaint["median"] * 1000 <= args.target_ms,
+              "timeToFirstPaint": firstPaint,
+              "milestones": milestones,  # Median seconds since app.run started
+              "projectImports": [i for i in imports if i["module"].startswith("afrl_gui")],
+              "imports": imports[:args.imports] if args.imports else imports}
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding="utf-8") as fout:
+            fout.write(text + "\n")
+    else:
+        print(text)
+    print(f"time to first paint: median {firstPaint['median'] * 1000:.1f} ms, "
+          f"target {args.target_ms:.0f} ms {'met' if report['targetMet'] else 'MISSED'}", file=sys.stderr)
+    for (name, elapsed) in milestones.items():
+        print(f"  {name:30s} {elapsed * 1000:9.1f} ms", file=sys.stderr)
+    return 0 if report["targetMet"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
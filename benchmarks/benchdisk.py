@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Compares block I/O throughput of the drive cache modes and AIO engines on the local filesystem
+# Every setting gets a fresh qcow2 overlay over a scratch raw base image, laid out like the drive of an instance,
+# and qemu-img bench runs QEMU's block layer against it with the same cache= and aio= settings a guest drive
+# uses: writes to one overlay (allocating overlay clusters as a guest does), then reads through another fresh
+# overlay so they go to the base image rather than clusters just written; results are written as JSON
+# The base image is evicted from the host page cache before every read pass (posix_fadvise DONTNEED, which
+# drops clean pages only), so cached modes read from the disk as a freshly booted guest would
+#
+#   python3 benchmarks/benchdisk.py --dir /var/lib/afrl --output disk.json
+#   python3 benchmarks/benchdisk.py --caches none,directsync --aios native,io_uring --depth 32
+
+import argparse, json, os, platform, re, shutil, subprocess, sys, tempfile, time
+
+BENCHMARK_ROOT = os.path.dirname(os.path.realpath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+from benchstartup import summarize, gitRevision
+from afrl_gui.common import QEMU_IMG_BINARY
+from afrl_gui.qemudriveoptions import DRIVE_CACHES, DIRECT_CACHES, DRIVE_AIOS, DRIVE_AIO_NATIVE
+
+RESULTS_FORMAT_VERSION = 1
+MB = 1024 * 1024
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Benchmark drive cache modes and AIO engines with qemu-img bench")
+    parser.add_argument("--qemu-img", default=QEMU_IMG_BINARY, help="qemu-img binary")
+    parser.add_argument("--dir", default=".", help="directory on the filesystem to measure")
+    parser.add_argument("--size", type=int, default=256, help="MB of the scratch base image")
+    parser.add_argument("--caches", default=",".join(c for c in DRIVE_CACHES if c != "unsafe" and c),
+                        help="comma separated cache modes to run")
+    parser.add_argument("--aios", default=",".join(a for a in DRIVE_AIOS if a), help="comma separated AIO engines to run")
+    parser.add_argument("--count", type=int, default=4096, help="requests per run")
+    parser.add_argument("--buffer-size", type=int, default=64, help="KB per request")
+    parser.add_argument("--depth", type=int, default=16, help="requests in flight")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of each setting")
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if omitted")
+    return parser.parse_args()
+
+
+def settings(args):
+    ''' Returns [(cache, aio)] of every combination QEMU accepts '''
+    return [(cache, aio) for cache in args.caches.split(",") for aio in args.aios.split(",")
+            if aio != DRIVE_AIO_NATIVE or cache in DIRECT_CACHES]
+
+
+def createBase(path, size):
+    ''' Writes a raw image of incompressible data, so reads are of data rather than sparse holes '''
+    block = os.urandom(MB)
+    with open(path, 'wb') as fout:
+        for i in range(size):
+            fout.write(block)
+        fout.flush()
+        os.fsync(fout.fileno())
+
+
+def evictCache(path):
+    ''' Drops the clean pages of a file from the host page cache '''
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def createOverlay(args, base, overlay):
+    if os.path.exists(overlay):
+        os.remove(overlay)
+    run([args.qemu_img, "create", "-q", "-f", "qcow2", "-b", base, "-F", "raw", overlay])
+
+
+def run(cmd):
+    out = subprocess.run(cmd, capture_output=True)
+    if out.returncode != 0:
+        raise RuntimeError((out.stderr or out.stdout).decode("utf-8", "replace").strip())
+    return out.stdout.decode("utf-8", "replace")
+
+
+def bench(args, overlay, cache, aio, write):
+    ''' Returns the seconds qemu-img bench reports for one run '''
+    cmd = [args.qemu_img, "bench", "-f", "qcow2", "-t", cache, "-i", aio, "-c", str(args.count),
+           "-s", f"{args.buffer_size}K", "-d", str(args.depth), "-S", f"{args.buffer_size}K"]
+    start = time.perf_counter()
+    output = run(cmd + (["-w"] if write else []) + [overlay])
+    match = re.search(r"Run completed in ([\d.]+) seconds", output)
+    return float(match.group(1)) if match else time.perf_counter() - start
+
+
+def main():
+    args = parseArgs()
+    # Absolute, qemu-img resolves a relative backing path from the directory of the overlay
+    workDir = os.path.realpath(tempfile.mkdtemp(prefix="afrl-benchdisk-", dir=args.dir))
+    base = os.path.join(workDir, "base.img")
+    overlay = os.path.join(workDir, "overlay.qcow2")
+    megabytes = args.count * args.buffer_size / 1024
+    results = {}
+    try:
+        createBase(base, args.size)
+        for (cache, aio) in settings(args):
+            name = f"cache={cache},aio={aio}"
+            times = {"write": [], "read": []}
+            try:
+                for i in range(args.repeat):
+                    createOverlay(args, base, overlay)
+                    times["write"].append(bench(args, overlay, cache, aio, True))
+                    createOverlay(args, base, overlay)  # Empty, every read goes through to the base image
+                    evictCache(base)
+                    times["read"].append(bench(args, overlay, cache, aio, False))
+            except RuntimeError as e:
+                print(f"ERROR: {name} failed: {e}", file=sys.stderr)
+                results[name] = None
+                continue
+            results[name] = {mode: dict(summarize(t), throughput=megabytes / min(t)) for (mode, t) in times.items()}
+            print(f"{name:32s} write {results[name]['write']['throughput']:9.1f} MB/s  "
+                  f"read {results[name]['read']['throughput']:9.1f} MB/s", file=sys.stderr)
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+    completed = [name for name in results if results[name]]
+    report = {"version": RESULTS_FORMAT_VERSION,
+              "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "revision": gitRevision(),
+              "platform": platform.platform(),
+              "directory": os.path.realpath(args.dir),
+              "count": args.count,
+              "bufferSize": args.buffer_size * 1024,
+              "depth": args.depth,
+              "repeat": args.repeat,
+              "fastestWrite": max(completed, key=lambda n: results[n]["write"]["throughput"]) if completed else None,
+              "fastestRead": max(completed, key=lambda n: results[n]["read"]["throughput"]) if completed else None,
+              "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as fout:
+            fout.write(text + "\n")
+    else:
+        print(text)
+    return 0 if completed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Times the GUI startup hot path against the fake QEMU in fakeqemu.py under an offscreen Qt platform
+# Capability discovery (machine, cpu and device lists), settings form population and launch wizard construction
+# are each timed cold (empty capability cache, QEMU is run) and warm, results are written as JSON so runs
+# can be compared over time
+#
+#   python3 benchmarks/benchstartup.py --scale 10 --output results.json
+#   python3 benchmarks/benchstartup.py --noqmp   # help text fallback path
+
+import argparse, contextlib, json, os, platform, shutil, statistics, subprocess, sys, tempfile, time
+
+BENCHMARK_ROOT = os.path.dirname(os.path.realpath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_ROOT)
+RESULTS_FORMAT_VERSION = 1
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Benchmark AFRL QEMU GUI startup against a fake QEMU")
+    parser.add_argument("--scale", type=int, default=1, help="synthetic enlargement of the recorded QEMU output")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of each benchmark")
+    parser.add_argument("--noqmp", action="store_true", help="fail the QMP session, timing the help text fallback")
+    parser.add_argument("--device", default="e1000", help="device whose settings form is timed")
+    parser.add_argument("--machine", default="virt", help="machine whose settings form is timed")
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if omitted")
+    return parser.parse_args()
+
+
+def prepareEnvironment(args, workDir):
+    ''' Points the GUI at the fake QEMU, QEMU_BINARY is relative to the working directory '''
+    binary = os.path.join(workDir, "qemu-system-aarch64")
+    os.symlink(os.path.join(BENCHMARK_ROOT, "fakeqemu.py"), binary)
+    os.chdir(workDir)
+    os.environ["HOME"] = workDir  # Capability cache root is under HOME, read when afrl_gui.common is imported
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["FAKE_QEMU_SCALE"] = str(args.scale)
+    if args.noqmp:
+        os.environ["FAKE_QEMU_NOQMP"] = "1"
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+
+def timeRuns(repeat, setup, run, teardown=None):
+    ''' Returns the wall clock seconds of each run, setup and teardown are not timed '''
+    times = []
+    for i in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        result = run(state)
+        times.append(time.perf_counter() - start)
+        if teardown:
+            teardown(state, result)
+    return times
+
+
+def summarize(times):
+    return {"runs": len(times),
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+            "max": max(times)}
+
+
+def gitRevision():
+    try:
+        out = subprocess.run(["git", "-C", REPO_ROOT, "rev-parse", "HEAD"], capture_output=True)
+    except OSError:
+        return None
+    return out.stdout.decode("utf-8").strip() if out.returncode == 0 else None
+
+
+def runBenchmarks(args, workDir):
+    # Imported only once the environment points at the fake QEMU
+    from PySide6 import __version__ as pysideVersion
+    from PySide6.QtCore import qVersion
+    from PySide6.QtWidgets import QApplication
+    from afrl_gui.qemucapabilitycache import qemuCapabilityCache
+    from afrl_gui.qemuschemacache import qemuSchemaCache
+    from afrl_gui.qemumachinelist import qemuMachineList
+    from afrl_gui.qemucpulist import qemuCpuList
+    from afrl_gui.qemudevicelist import qemuDeviceList
+    from afrl_gui.devicesettingswidget import deviceSettingsWidget
+    from afrl_gui.machinesettingswidget import machineSettingsWidget
+    from afrl_gui.qemucapabilityregistry import qemuCapabilityRegistry
+    from afrl_gui.qemulaunchwizard import QemuLaunchWizard
+
+    app = QApplication.instance() or QApplication([])
+    results = {}
+    coldRoot = os.path.join(workDir, "cold")
+
+    def coldCache():
+        shutil.rmtree(coldRoot, ignore_errors=True)
+        return qemuCapabilityCache(cacheRoot=coldRoot)
+
+    def warmCache():
+        return qemuCapabilityCache(cacheRoot=coldRoot)  # Reloads what the previous cold run stored
+
+    def closeCache(cache, result):
+        cache.close()
+
+    sizes = {}
+    for (name, listClass) in (("qemuMachineList", qemuMachineList),
+                              ("qemuCpuList", qemuCpuList),
+                              ("qemuDeviceList", qemuDeviceList)):
+        results[f"{name}.cold"] = summarize(timeRuns(args.repeat, coldCache, listClass, closeCache))
+        results[f"{name}.warm"] = summarize(timeRuns(args.repeat, warmCache, listClass, closeCache))
+        paramList = listClass(warmCache())
+        if isinstance(paramList, qemuDeviceList):
+            sizes["devices"] = sum(len(l) for l in paramList.deviceLists())
+        else:
+            sizes[name] = len(paramList)
+
+    def widgetRun(widgetClass, name, schemaCache):
+        widget = widgetClass(name, cache=schemaCache.cache, schemaCache=schemaCache)
+        if not widget.settings:
+            raise RuntimeError(f"{widgetClass.__name__} {name} has no settings, check the fake QEMU")
+        return widget
+
+    def closeWidget(state, widget):
+        widget.deleteLater()
+        app.processEvents()
+
+    for (widgetClass, name) in ((deviceSettingsWidget, args.device), (machineSettingsWidget, args.machine)):
+        key = f"{widgetClass.__name__}.populateFormFields"
+        # Cold: schema queried from QEMU, warm: schema already in the in-memory LRU
+        results[f"{key}.cold"] = summarize(timeRuns(
+            args.repeat, lambda: qemuSchemaCache(coldCache()),
+            lambda s: widgetRun(widgetClass, name, s),
+            lambda s, w: (closeWidget(s, w), s.cache.close())))
+        warmSchemas = qemuSchemaCache(warmCache())
+        widgetRun(widgetClass, name, warmSchemas).deleteLater()
+        results[f"{key}.warm"] = summarize(timeRuns(
+            args.repeat, lambda: warmSchemas, lambda s: widgetRun(widgetClass, name, s), closeWidget))
+        warmSchemas.cache.close()
+
+    # The wizard uses the shared registry, which reads the default cache under HOME
+    registry = qemuCapabilityRegistry.instance()
+    start = time.perf_counter()
+    registry.load()
+    results["qemuCapabilityRegistry.load"] = summarize([time.perf_counter() - start])
+
+    def wizardRun(state):
+        wizard = QemuLaunchWizard(None)
+        wizard.show()
+        app.processEvents()  # First paint
+        return wizard
+
+    def closeWizard(state, wizard):
+        registry.schemaCache.stopPrefetch()  # Device schemas are prefetched once the device dropdown fills
+        wizard.close()
+        wizard.deleteLater()
+        app.processEvents()
+
+    results["QemuLaunchWizard"] = summarize(timeRuns(args.repeat, None, wizardRun, closeWizard))
+    registry.cache.close()
+
+    return {"version": RESULTS_FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": gitRevision(),
+            "python": platform.python_version(),
+            "pyside": pysideVersion,
+            "qt": qVersion(),
+            "platform": platform.platform(),
+            "qpa": os.environ["QT_QPA_PLATFORM"],
+            "mode": "help" if args.noqmp else "qmp",
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "sizes": sizes,
+            "results": results}
+
+
+def main():
+    args = parseArgs()
+    output = os.path.realpath(args.output) if args.output else None
+    workDir = tempfile.mkdtemp(prefix="afrl-bench-")
+    try:
+        prepareEnvironment(args, workDir)
+        with contextlib.redirect_stdout(sys.stderr):  # Keep the GUI's console messages out of the JSON
+            report = runBenchmarks(args, workDir)
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workDir, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding="utf-8") as fout:
+            fout.write(text + "\n")
+    else:
+        print(text)
+    for (name, r) in report["results"].items():
+        print(f"{name:50s} median {r['median'] * 1000:9.2f} ms  min {r['min'] * 1000:9.2f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
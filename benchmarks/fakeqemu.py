@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Scriptable stand-in for qemu-system-aarch64 used by the benchmarks and tests
+# Replays the recorded help text and QMP replies in fixtures/, enlarged synthetically when asked to
+# Launched as an instance (-qmp unix:...) it serves QMP and the serial console on their sockets instead: the guest
+# prints BOOT_MARKER, and stop, cont, migrate and -incoming to file: URIs and drive-backup behave like QEMU's
+#   FAKE_QEMU_FIXTURES  directory holding the recordings (default: fixtures/ next to this script)
+#   FAKE_QEMU_SCALE     every machine, cpu, device and property is repeated this many times (default: 1)
+#   FAKE_QEMU_NOQMP     when set the QMP session fails so the GUI falls back to the help text
+#   FAKE_QEMU_DELAY     seconds to sleep before answering, to model a slow QEMU start (default: 0)
+#   FAKE_QEMU_LOAD      seconds an instance takes to load an -incoming state (default: 0.2)
+
+import asyncio, json, os, re, sys, time
+
+FIXTURES = os.environ.get("FAKE_QEMU_FIXTURES", os.path.join(os.path.dirname(os.path.realpath(__file__)), "fixtures"))
+SCALE = max(1, int(os.environ.get("FAKE_QEMU_SCALE", "1")))
+DEVICE_NAME_PATTERN = re.compile(r'name "([^"]+)"')
+OPTION_NAME_PATTERN = re.compile(r"^(\s*(?:\{name\}\.)?)([\w-]+)=")
+STATE_MAGIC = b"QEVM"  # Start of QEMU migration streams
+
+
+def fixture(fileName):
+    with open(os.path.join(FIXTURES, fileName), 'r', encoding="utf-8") as fin:
+        return fin.read()
+
+
+def copyName(name, copy):
+    ''' Returns the name of synthetic copy number copy, copy 0 is the recorded name '''
+    return name if copy == 0 else f"{name}-x{copy}"
+
+
+def enlargeLines(lines, rename):
+    ''' Repeats each line SCALE times, renaming each copy with rename(line, copy) '''
+    out = []
+    for line in lines:
+        for copy in range(SCALE):
+            out.append(rename(line, copy))
+    return out
+
+
+def machineHelp():
+    lines = fixture("machine-help.txt").splitlines()
+    body = enlargeLines(lines[1:], lambda l, c: l if c == 0 else copyName(l.split()[0], c).ljust(20) + " " + l.split(maxsplit=1)[1])
+    return "\n".join(lines[:1] + body) + "\n"
+
+
+def cpuHelp():
+    lines = fixture("cpu-help.txt").splitlines()
+    body = enlargeLines(lines[1:], lambda l, c: "  " + copyName(l.strip(), c))
+    return "\n".join(lines[:1] + body) + "\n"
+
+
+def deviceHelp():
+    out = []
+    for line in fixture("device-help.txt").splitlines():
+        if not DEVICE_NAME_PATTERN.match(line):
+            out.append(line)
+            continue
+        out.extend(enlargeLines([line], lambda l, c: DEVICE_NAME_PATTERN.sub(lambda m: f'name "{copyName(m.group(1), c)}"', l, count=1)))
+    return "\n".join(out) + "\n"
+
+
+def optionsHelp(fileName, name):
+    lines = fixture(fileName).splitlines()
+    header = [l for l in lines if not OPTION_NAME_PATTERN.match(l)]
+    options = [l for l in lines if OPTION_NAME_PATTERN.match(l)]
+    options = enlargeLines(options, lambda l, c: OPTION_NAME_PATTERN.sub(lambda m: f"{m.group(1)}{copyName(m.group(2), c)}=", l, count=1))
+    return "\n".join(header + options).replace("{name}", name) + "\n"
+
+
+def enlargeReplies(replies, abstractKey=None):
+    ''' Repeats every reply dict SCALE times with renamed copies, abstract QOM types are not repeated '''
+    out = []
+    for reply in replies:
+        copies = 1 if abstractKey and reply.get(abstractKey) else SCALE
+        for copy in range(copies):
+            r = dict(reply)
+            r["name"] = copyName(reply["name"], copy)
+            out.append(r)
+    return out
+
+
+def runQmp():
+    replies = json.loads(fixture("qmp-replies.json"))
+
+    def send(message):
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+    send({"QMP": {"version": {"qemu": {"major": 7, "minor": 2, "micro": 0}, "package": "fake"}, "capabilities": []}})
+    for line in sys.stdin:
+        request = json.loads(line)
+        command = request.get("execute")
+        if command == "quit":
+            send({"return": {}})
+            break
+        if command == "qmp_capabilities":
+            send({"return": {}})
+        elif command == "qom-list-types":
+            send({"return": enlargeReplies(replies[command], "abstract")})
+        elif command in replies:
+            send({"return": enlargeReplies(replies[command])})
+        else:
+            send({"error": {"class": "CommandNotFound", "desc": f"The command {command} has not been found"}})
+
+
+def optionValue(args, option, key=None):
+    ''' Returns the value of an option, or of one of its key=value pairs, None if it is not given '''
+    if option not in args:
+        return None
+    value = args[args.index(option) + 1]
+    if key is None:
+        return value
+    pairs = dict(part.split("=", 1) for part in value.split(",") if "=" in part)
+    return pairs.get(key)
+
+
+class fakeInstance:
+    def __init__(self, args):
+        self.status = "running"
+        self.clients = []
+        self.migration = None  # Status of the last outgoing migration
+        self.incoming = optionValue(args, "-incoming")
+        self.state = b""  # Migration stream of the incoming state
+        self.serialPath = optionValue(args, "-chardev", "path")
+        self.qmpPath = optionValue(args, "-qmp").split(":", 1)[1].split(",")[0]
+
+    def event(self, name, data=None):
+        for writer in self.clients:
+            writer.write(json.dumps({"event": name, "data": data or {}, "timestamp": {}}).encode() + b"\n")
+
+    def execute(self, command, arguments):
+        ''' Returns the reply to a command, None for commands QEMU does not have '''
+        if command == "qmp_capabilities":
+            return {}
+        if command == "query-cpus-fast":
+            return [{"cpu-index": 0, "thread-id": os.getpid()}]
+        if command == "query-status":
+            return {"running": self.status == "running", "status": self.status}
+        if command in ("stop", "cont"):
+            (self.status, event) = ("paused", "STOP") if command == "stop" else ("running", "RESUME")
+            self.event(event)
+            return {}
+        if command == "migrate":
+            # The stream holds the run state, the destination continues in it
+            with open(arguments["uri"].split(":", 1)[1], 'wb') as fout:
+                fout.write(STATE_MAGIC + json.dumps({"status": self.status}).encode())
+            self.migration = "completed"
+            self.status = "postmigrate"
+            return {}
+        if command == "query-migrate":
+            return {"status": self.migration} if self.migration else {}
+        if command == "drive-backup":
+            with open(arguments["target"], 'wb') as fout:
+                fout.write(b"QFI\xfb")
+            asyncio.get_running_loop().call_later(0.1, self.event, "BLOCK_JOB_COMPLETED",
+                                                  {"device": arguments["job-id"], "type": "backup"})
+            return {}
+        return None
+
+    async def serveQmp(self, reader, writer):
+        self.clients.append(writer)
+        writer.write(json.dumps({"QMP": {"version": {"qemu": {"major": 8, "minor": 2, "micro": 0}}, "capabilities": []}}).encode() + b"\n")
+        async for line in reader:
+            request = json.loads(line)
+            command = request.get("execute")
+            reply = self.execute(command, request.get("arguments", {}))
+            if reply is None:
+                reply = {"error": {"class": "CommandNotFound", "desc": f"The command {command} has not been found"}}
+            else:
+                reply = {"return": reply}
+            writer.write(json.dumps(dict(reply, id=request.get("id"))).encode() + b"\n")
+            await writer.drain()
+            if command == "quit":
+                os._exit(0)
+        self.clients.remove(writer)
+
+    async def serveSerial(self, reader, writer):
+        writer.write(b"Booting Linux\r\nfake login: ")
+        while data := await reader.read(1024):
+            writer.write(data)  # Echo, like a guest shell
+            await writer.drain()
+
+    async def load(self):
+        await asyncio.sleep(float(os.environ.get("FAKE_QEMU_LOAD", "0.2")))
+        self.status = json.loads(self.state[len(STATE_MAGIC):])["status"]
+        if self.status == "running":
+            self.event("RESUME")  # Only a state saved running autostarts, QEMU sends no event otherwise
+
+    async def run(self):
+        if self.incoming is not None:
+            with open(self.incoming.split(":", 1)[1], 'rb') as fin:
+                self.state = fin.read()
+            if not self.state.startswith(STATE_MAGIC):
+                print(f"fake qemu: {self.incoming} is not a migration stream", file=sys.stderr)
+                return 1
+            self.status = "inmigrate"
+            asyncio.get_running_loop().create_task(self.load())
+        if self.serialPath is not None:
+            await asyncio.start_unix_server(self.serveSerial, self.serialPath)
+        server = await asyncio.start_unix_server(self.serveQmp, self.qmpPath)
+        async with server:
+            await server.serve_forever()
+
+
+def main(args):
+    time.sleep(float(os.environ.get("FAKE_QEMU_DELAY", "0")))
+    qmp = optionValue(args, "-qmp")
+    if qmp is not None and qmp.startswith("unix:"):
+        return asyncio.run(fakeInstance(args).run())
+    if "-qmp" in args:
+        if os.environ.get("FAKE_QEMU_NOQMP"):
+            return 1
+        runQmp()
+        return 0
+    if len(args) < 2:
+        print("fake qemu: only help queries and QMP sessions are supported", file=sys.stderr)
+        return 1
+    option, value = args[0], args[1]
+    if value in ("?", "help"):
+        help = {"-machine": machineHelp, "-cpu": cpuHelp, "-device": deviceHelp}.get(option)
+        if help is None:
+            return 1
+        sys.stdout.write(help())
+        return 0
+    name = value.split(",", 1)[0]
+    if option == "-device":
+        sys.stdout.write(optionsHelp("device-options.txt", name))
+    elif option == "-machine":
+        sys.stdout.write(optionsHelp("machine-options.txt", name))
+    else:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,29 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Shared fixtures, Qt runs on the offscreen platform so the tests need no display
+
+import os, sys, time
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+FAKE_QEMU = os.path.join(REPO_ROOT, "benchmarks", "fakeqemu.py")
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PySide6.QtCore import QCoreApplication
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def waitUntil(qapp, condition, timeout=10.0):
+    ''' Runs the event loop until condition() is true, returns False if timeout seconds pass first '''
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        qapp.processEvents()
+        time.sleep(0.01)
+    return True
@@ -0,0 +1,92 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Admission of guest RAM against synthetic /proc/meminfo, hugepage pools and mounts
+
+import pytest
+from afrl_gui.hostmemory import qemuMemoryAdmission, readMeminfo, hugepagePools, hugetlbfsMounts, parseSize, MB, \
+    MEMORY_BACKEND_HUGETLBFS
+from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.qemutelemetry import telemetryHistory
+
+
+def instance(name, memory, backend=""):
+    qemu = qemuInstance()
+    qemu.name = name
+    qemu.memory = memory
+    qemu.memoryBackend = backend
+    return qemu
+
+
+@pytest.fixture
+def host(tmp_path):
+    ''' Returns a function writing a host with availableMb of MemAvailable and hugepage pools
+        {page size in kB: (free, reserved)} '''
+    def write(availableMb, pools=None, mounts=""):
+        (tmp_path / "meminfo").write_text(f"MemTotal: {availableMb * 2048} kB\nMemAvailable: {availableMb * 1024} kB\n"
+                                          "HugePages_Free: 0\nHugepagesize: 2048 kB\n")
+        for (size, (free, reserved)) in (pools or {}).items():
+            directory = tmp_path / "hugepages" / f"hugepages-{size}kB"
+            directory.mkdir(parents=True)
+            (directory / "free_hugepages").write_text(f"{free}\n")
+            (directory / "resv_hugepages").write_text(f"{reserved}\n")
+        (tmp_path / "mounts").write_text(mounts)
+        return qemuMemoryAdmission(str(tmp_path / "meminfo"), str(tmp_path / "hugepages"), str(tmp_path / "mounts"),
+                                   headroom=512 * MB)
+    return write
+
+
+def test_meminfo_and_sizes(tmp_path):
+    (tmp_path / "meminfo").write_text("MemAvailable: 2048 kB\nHugePages_Free: 3\n")
+    assert readMeminfo(str(tmp_path / "meminfo")) == {"MemAvailable": 2 * MB, "HugePages_Free": 3}
+    assert [parseSize(s) for s in ("2M", "1G", "2048K", "4096")] == [2 * MB, 1024 * MB, 2 * MB, 4096]
+
+
+def test_guests_fit_next_to_the_headroom(host):
+    admission = host(4096)
+    assert admission.admit(instance("fits", 3584), []) == ""
+    refusal = admission.admit(instance("large", 3585), [])
+    assert "large needs 3585 MB of RAM but only 3584 MB is available" in refusal
+
+
+def test_ram_running_guests_have_not_touched_is_owed(host):
+    admission = host(4096)
+    running = instance("running", 2048)
+    running.telemetry = telemetryHistory(4)
+    running.telemetry.append(0.0, 512 * MB, 0.0)  # 1536 MB still to be touched
+    assert admission.admit(instance("next", 2048), [running]) == ""
+    assert "1536 MB still owed" in admission.admit(instance("next", 2049), [running])
+    # A guest is not owed to itself on relaunch
+    assert admission.admit(running, [running]) == ""
+
+
+def test_unknown_capacity_admits(tmp_path):
+    (tmp_path / "meminfo").write_text("MemTotal: 1024 kB\n")
+    assert qemuMemoryAdmission(str(tmp_path / "meminfo")).admit(instance("any", 1 << 20), []) == ""
+
+
+def test_hugepages_pick_a_mount_with_enough_free_pages(host):
+    mounts = "hugetlbfs /dev/hugepages hugetlbfs rw,pagesize=2M 0 0\n" \
+             "hugetlbfs /mnt/huge1g hugetlbfs rw,pagesize=1024M 0 0\n"
+    admission = host(1024, {2048: (256, 0), 1048576: (4, 1)}, mounts)
+    small = instance("small", 512, MEMORY_BACKEND_HUGETLBFS)
+    assert admission.admit(small, []) == ""
+    assert small.hugepagePath == "/dev/hugepages"
+    large = instance("large", 2048, MEMORY_BACKEND_HUGETLBFS)
+    assert admission.admit(large, []) == ""
+    assert large.hugepagePath == "/mnt/huge1g"
+    assert "needs 4096 MB of hugepages" in admission.admit(instance("huge", 4096, MEMORY_BACKEND_HUGETLBFS), [])
+    odd = instance("odd", 3, MEMORY_BACKEND_HUGETLBFS)
+    odd.hugepagePath = "/dev/hugepages"
+    assert "not a multiple of the 2 MB hugepages" in admission.admit(odd, [])
+
+
+def test_hugepages_need_a_mount(host):
+    admission = host(1024, {2048: (256, 0)})
+    assert "no hugetlbfs file system is mounted" in admission.admit(instance("g", 512, MEMORY_BACKEND_HUGETLBFS), [])
+
+
+def test_pools_and_mounts(tmp_path, host):
+    host(1024, {2048: (10, 4)}, "none /mnt/my\\040huge hugetlbfs rw 0 0\nproc /proc proc rw 0 0\n")
+    assert hugepagePools(str(tmp_path / "hugepages")) == {2 * MB: 6}
+    assert hugetlbfsMounts(str(tmp_path / "mounts"), 2 * MB) == [("/mnt/my huge", 2 * MB)]
@@ -0,0 +1,60 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Capability cache entries keyed by the identity of the QEMU binary
+
+import os
+from afrl_gui.qemucapabilitycache import qemuCapabilityCache
+
+
+def writeBinary(path, version):
+    ''' Writes a stand-in binary printing its version and counting its runs '''
+    path.write_text(f"#!/bin/sh\necho {version} \"$@\"\necho run >> {path}.runs\n")
+    path.chmod(0o755)
+
+
+def runs(path):
+    runFile = f"{path}.runs"
+    return len(open(runFile).read().split()) if os.path.exists(runFile) else 0
+
+
+def test_outputs_are_cached_across_sessions(tmp_path):
+    binary = tmp_path / "qemu"
+    writeBinary(binary, "v1")
+    cache = qemuCapabilityCache(str(binary), str(tmp_path / "cache"))
+    assert cache.output(["-machine", "help"]) == "v1 -machine help\n"
+    assert cache.output(["-machine", "help"]) == "v1 -machine help\n"
+    assert runs(binary) == 1
+    reloaded = qemuCapabilityCache(str(binary), str(tmp_path / "cache"))
+    assert reloaded.output(["-machine", "help"]) == "v1 -machine help\n"
+    assert runs(binary) == 1
+    assert reloaded.identity()["path"] == str(binary)
+
+
+def test_a_changed_binary_invalidates_the_entries(tmp_path):
+    binary = tmp_path / "qemu"
+    writeBinary(binary, "v1")
+    cache = qemuCapabilityCache(str(binary), str(tmp_path / "cache"))
+    cache.output(["-cpu", "help"])
+    stat = binary.stat()
+    writeBinary(binary, "v2")
+    os.utime(binary, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.output(["-cpu", "help"]) == "v2 -cpu help\n"
+    assert runs(binary) == 2
+
+
+def test_a_touched_binary_keeps_the_entries(tmp_path):
+    binary = tmp_path / "qemu"
+    writeBinary(binary, "v1")
+    cache = qemuCapabilityCache(str(binary), str(tmp_path / "cache"))
+    cache.put("key", [1, 2])
+    stat = binary.stat()
+    os.utime(binary, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert qemuCapabilityCache(str(binary), str(tmp_path / "cache")).get("key") == [1, 2]
+
+
+def test_a_missing_binary_caches_nothing(tmp_path):
+    cache = qemuCapabilityCache(str(tmp_path / "missing"), str(tmp_path / "cache"))
+    cache.put("key", "value")
+    assert cache.get("key") is None and cache.identity() is None
+    assert not os.path.exists(tmp_path / "cache")
@@ -0,0 +1,80 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Compilation of instances into launch arguments and -readconfig files
+
+import os
+from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.qemuconfigcompiler import compileArguments, compileConfig, writeConfig
+
+
+def guest(name="node"):
+    qemu = qemuInstance()
+    qemu.name = name
+    qemu.machine = "xlnx-zcu102"
+    qemu.kernel = "/images/Image"
+    qemu.accelerator = "tcg"
+    qemu.memory = 1024
+    qemu.devices = ["e1000"]
+    qemu.deviceSettings = [["netdev=net0"]]
+    return qemu
+
+
+def test_arguments_double_commas_in_values():
+    qemu = guest()
+    qemu.machineSettings = ["dtb=/images/a,b.dtb"]
+    arguments = compileArguments(qemu)
+    assert arguments[:2] == ["-machine", "xlnx-zcu102,dtb=/images/a,,b.dtb,kernel=/images/Image"]
+    assert arguments[arguments.index("-m") + 1] == "1024M"
+    assert arguments[arguments.index("-device") + 1] == "e1000,netdev=net0"
+
+
+def test_guest_definition_goes_to_the_config_file():
+    qemu = guest()
+    qemu.cpu = "cortex-a53"
+    qemu.imageName = "/images/sd.img"
+    qemu.qmpSocket = "/run/node/qmp.sock"
+    qemu.serialSocket = "/run/node/serial.sock"
+    qemu.incoming = "file:/snapshots/node.state"
+    (content, arguments) = compileConfig(qemu)
+    assert '[machine]\n  type = "xlnx-zcu102"\n  kernel = "/images/Image"\n' in content
+    assert '[memory]\n  size = "1024M"\n' in content
+    assert '[device]\n  driver = "e1000"\n  netdev = "net0"\n' in content
+    assert '[accel]\n  accel = "tcg"\n' in content
+    # The cpu model is not a config group, sockets and the incoming state differ per instance or per run
+    options = arguments[::2]
+    assert options == ["-cpu", "-drive", "-qmp", "-chardev", "-serial", "-incoming"]
+    assert arguments[arguments.index("-incoming") + 1] == "file:/snapshots/node.state"
+    assert "qmp" not in content and "serial" not in content
+
+
+def test_values_a_config_file_cannot_hold_stay_arguments():
+    qemu = guest()
+    qemu.deviceSettings = [['serial="quoted"']]
+    (content, arguments) = compileConfig(qemu)
+    assert "[device]" not in content
+    assert arguments[arguments.index("-device") + 1] == 'e1000,serial="quoted"'
+
+
+def test_smp_all_is_sized_by_the_cpu_set():
+    qemu = guest()
+    qemu.smpCores = "ALL"
+    qemu.cpuSet = [4, 5, 6]
+    arguments = compileArguments(qemu)
+    assert arguments[arguments.index("-smp") + 1] == "3"
+
+
+def test_identical_guests_share_a_config_file(tmp_path):
+    first = guest("node-1")
+    second = guest("node-2")
+    first.qmpSocket = "/run/node-1/qmp.sock"
+    second.qmpSocket = "/run/node-2/qmp.sock"
+    firstArguments = writeConfig(first, str(tmp_path))
+    secondArguments = writeConfig(second, str(tmp_path))
+    assert firstArguments[:2] == secondArguments[:2]
+    assert firstArguments[0] == "-readconfig" and os.path.exists(firstArguments[1])
+    assert firstArguments[2:] != secondArguments[2:]
+    third = guest("node-3")
+    third.memory = 2048
+    assert writeConfig(third, str(tmp_path))[1] != firstArguments[1]
+    assert len(os.listdir(tmp_path)) == 2
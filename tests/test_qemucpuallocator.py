@@ -0,0 +1,118 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Host CPU topology and the disjoint CPU sets handed to instances, against a synthetic sysfs
+
+import os, threading
+import pytest
+from afrl_gui.hosttopology import hostTopology, parseCpuList, formatCpuList
+from afrl_gui.qemucpuallocator import qemuCpuAllocator
+from afrl_gui.qemuinstance import qemuInstance
+
+
+def writeSysfs(root, nodes, threadsPerCore=2):
+    ''' Writes a sysfs tree of len(nodes) NUMA nodes with nodes[n] cores each, returns the CPU count '''
+    cpu = 0
+    for (node, cores) in enumerate(nodes):
+        first = cpu
+        for core in range(cores):
+            siblings = f"{cpu}-{cpu + threadsPerCore - 1}" if threadsPerCore > 1 else str(cpu)
+            for thread in range(threadsPerCore):
+                topology = root / "cpu" / f"cpu{cpu + thread}" / "topology"
+                topology.mkdir(parents=True)
+                (topology / "core_cpus_list").write_text(siblings + "\n")
+            cpu += threadsPerCore
+        (root / "node" / f"node{node}").mkdir(parents=True)
+        (root / "node" / f"node{node}" / "cpulist").write_text(f"{first}-{cpu - 1}\n")
+    return cpu
+
+
+def instance(name, smpCores):
+    qemu = qemuInstance()
+    qemu.name = name
+    qemu.smpCores = smpCores
+    return qemu
+
+
+@pytest.fixture
+def allocator(tmp_path):
+    # Two nodes of 4 cores, 2 SMT threads per core: node 0 is CPUs 0-7, node 1 is CPUs 8-15
+    cpuCount = writeSysfs(tmp_path, [4, 4])
+    return qemuCpuAllocator(topology=hostTopology(str(tmp_path), range(cpuCount)))
+
+
+def test_cpu_lists():
+    assert parseCpuList("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert formatCpuList([11, 0, 1, 2, 3, 8, 10]) == "0-3,8,10-11"
+
+
+def test_topology_groups_siblings_by_node(tmp_path):
+    writeSysfs(tmp_path, [2, 2])
+    topology = hostTopology(str(tmp_path), range(8))
+    assert topology.nodes == {0: [(0, 1), (2, 3)], 1: [(4, 5), (6, 7)]}
+    # CPUs outside the allowed set (taskset, cpusets) are left out of their cores
+    assert hostTopology(str(tmp_path), [0, 2, 3]).nodes == {0: [(0,), (2, 3)]}
+
+
+def test_instances_get_disjoint_whole_cores(allocator):
+    first = instance("first", "4")
+    second = instance("second", "3")
+    assert allocator.allocate(first) and allocator.allocate(second)
+    assert len(first.cpuSet) == 4 and len(second.cpuSet) == 4  # 3 vCPUs round up to two whole cores
+    assert not set(first.cpuSet) & set(second.cpuSet)
+    for qemu in (first, second):
+        assert all(cpu ^ 1 in qemu.cpuSet for cpu in qemu.cpuSet)  # SMT siblings stay together
+        assert len({cpu // 8 for cpu in qemu.cpuSet}) == 1  # On one node
+    assert allocator.freeCpuCount() == 8
+
+
+def test_tightest_node_fit(allocator):
+    large = instance("large", "6")
+    assert allocator.allocate(large)
+    small = instance("small", "2")
+    assert allocator.allocate(small)
+    assert {cpu // 8 for cpu in small.cpuSet} == {cpu // 8 for cpu in large.cpuSet}  # The node with 2 CPUs left
+
+
+def test_instances_span_nodes_only_when_no_node_fits(allocator):
+    qemu = instance("wide", "12")
+    assert allocator.allocate(qemu)
+    assert len(qemu.cpuSet) == 12 and {cpu // 8 for cpu in qemu.cpuSet} == {0, 1}
+
+
+def test_over_demand_runs_unpinned_and_release_frees(allocator):
+    first = instance("first", "16")
+    assert allocator.allocate(first)
+    second = instance("second", "1")
+    assert not allocator.allocate(second)
+    assert second.cpuSet == []
+    allocator.release(first)
+    assert allocator.freeCpuCount() == 16
+    assert allocator.allocate(second)
+
+
+def test_all_takes_the_node_with_most_free_cores(allocator):
+    assert allocator.allocate(instance("small", "2"))
+    qemu = instance("all", "ALL")
+    assert allocator.allocate(qemu)
+    assert len(qemu.cpuSet) == 8 and allocator.requestedCpus(qemu) == 8
+
+
+def test_every_thread_is_pinned(allocator, monkeypatch):
+    pinned = []
+    monkeypatch.setattr(os, "sched_setaffinity", lambda tid, cpus: pinned.append((tid, list(cpus))))
+    stop = threading.Event()
+    worker = threading.Thread(target=stop.wait)
+    worker.start()
+    try:
+        qemu = instance("threads", "2")
+        assert allocator.allocate(qemu)
+        qemu.pid = os.getpid()
+        allocator.pinProcess(qemu)
+        threads = {int(tid) for tid in os.listdir(f"/proc/{qemu.pid}/task")}
+    finally:
+        stop.set()
+        worker.join()
+    assert pinned[0] == (qemu.pid, qemu.cpuSet)  # The main thread first, so new threads start confined
+    assert {tid for (tid, cpus) in pinned} == threads
+    assert all(cpus == qemu.cpuSet for (tid, cpus) in pinned)
@@ -0,0 +1,68 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Search over the device catalog
+
+from afrl_gui.qemudeviceindex import qemuDeviceIndex
+
+
+class fakeDevice:
+    def __init__(self, argument, alias="", bus="", description=""):
+        self.values = (argument, alias, bus, description)
+
+    def argument(self):
+        return self.values[0]
+
+    def alias(self):
+        return self.values[1]
+
+    def bus(self):
+        return self.values[2]
+
+    def description(self):
+        return self.values[3]
+
+
+class fakeDeviceList:
+    ''' Devices grouped by type, like qemuDeviceList '''
+    def __init__(self, *types):
+        self.types = types
+
+    def deviceLists(self):
+        return self.types
+
+
+def catalog():
+    network = [fakeDevice("virtio-net-device", bus="virtio-bus"),
+               fakeDevice("e1000", description="Intel Gigabit Ethernet"),
+               fakeDevice("usb-net", bus="usb-bus", description="USB Network Interface")]
+    storage = [fakeDevice("virtio-blk-device", bus="virtio-bus"), fakeDevice("usb-storage", bus="usb-bus"),
+               fakeDevice("sd-card", alias="sd", bus="sd-bus")]
+    return qemuDeviceIndex(fakeDeviceList(network, storage))
+
+
+def test_every_device_is_indexed():
+    assert len(catalog()) == 6
+
+
+def test_name_prefix_matches_come_first():
+    index = catalog()
+    assert index.search("usb") == [(0, 2), (1, 1)]
+    # "net" starts no name but is a word of three devices, all words of a query have to match
+    assert index.search("net") == [(0, 2), (0, 0)]
+    assert index.search("virtio blk") == [(1, 0)]
+
+
+def test_words_match_anywhere_in_the_listing():
+    index = catalog()
+    assert index.search("gigabit") == [(0, 1)]
+    assert index.search("ETHER") == [(0, 1)]
+    assert index.search("sd") == [(1, 2)]  # By alias
+    assert index.search("virtio-bus") == [(1, 0), (0, 0)]
+
+
+def test_no_match():
+    index = catalog()
+    assert index.search("scsi") == []
+    assert index.search("usb gigabit") == []
+    assert index.search("  ") == []
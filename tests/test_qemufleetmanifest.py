@@ -0,0 +1,61 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Expansion and validation of fleet manifests
+
+import json, os
+import pytest
+from afrl_gui.qemufleetmanifest import qemuFleetManifest, manifestError
+
+
+def expand(data, baseDirectory="/fleet"):
+    return qemuFleetManifest(data, baseDirectory).instances()
+
+
+def test_groups_expand_with_defaults_and_overrides():
+    instances = expand({"defaults": {"machine": "xlnx-zcu102", "memory": 1024},
+                        "instances": [{"name": "node", "count": 3, "ipAddress": "10.0.0.10", "kernel": "images/Image",
+                                       "devices": [{"type": "e1000", "settings": ["netdev=net{index}"]}],
+                                       "overrides": {"1": {"memory": 2048}}},
+                                      {"name": "gateway", "ipAddress": "10.0.0.1"}]})
+    assert [q.name for q in instances] == ["node-1", "node-2", "node-3", "gateway"]
+    assert [q.memory for q in instances] == [1024, 2048, 1024, 1024]
+    assert [q.ipAddress.toString() for q in instances] == ["10.0.0.10", "10.0.0.11", "10.0.0.12", "10.0.0.1"]
+    assert instances[2].deviceSettings == [["netdev=net2"]]
+    assert instances[0].kernel == os.path.join("/fleet", "images/Image")
+    assert all(q.machine == "xlnx-zcu102" for q in instances)
+
+
+def test_launch_settings():
+    manifest = qemuFleetManifest({"launch": {"parallelism": 8, "rampUp": 0.5}, "instances": []})
+    assert (manifest.parallelism, manifest.rampUp) == (8, 0.5)
+    with pytest.raises(manifestError):
+        qemuFleetManifest({"launch": {"parallelism": 0}, "instances": []})
+
+
+@pytest.mark.parametrize("data, message", [
+    ({}, "'instances' list"),
+    ({"defaults": {"memroy": 512}, "instances": [{"name": "node"}]}, "defaults have unknown fields: memroy"),
+    ({"defaults": ["memory"], "instances": [{"name": "node"}]}, "defaults is not a mapping"),
+    ({"instances": [{"name": "node", "cnt": 2}]}, "instance group 0 has unknown fields: cnt"),
+    ({"instances": [{"count": 2}]}, "has no name"),
+    ({"instances": [{"name": "node"}, {"name": "node"}]}, "node is used more than once"),
+    ({"instances": [{"name": "node", "memory": "lots"}]}, "invalid value"),
+    ({"instances": [{"name": "node", "accelerator": "hvf"}]}, "accelerator must be"),
+    ({"instances": [{"name": "node", "imageOverlay": "copy"}]}, "imageOverlay must be"),
+    ({"instances": [{"name": "node", "ipAddress": "10.0.0.300"}]}, "invalid ipAddress"),
+    ({"instances": [{"name": "node-{idx}", "count": 2}]}, "invalid placeholder"),
+])
+def test_invalid_manifests_are_refused(data, message):
+    with pytest.raises(manifestError, match=message):
+        qemuFleetManifest(data).instances()
+
+
+def test_errors_name_the_manifest_file(tmp_path):
+    path = tmp_path / "fleet.json"
+    path.write_text(json.dumps({"defaults": {"memroy": 512}, "instances": [{"name": "node"}]}))
+    with pytest.raises(manifestError, match=f"fleet manifest {path}: defaults have unknown fields: memroy"):
+        qemuFleetManifest.load(str(path))
+    path.write_text("{not json")
+    with pytest.raises(manifestError, match="unable to read fleet manifest"):
+        qemuFleetManifest.load(str(path))
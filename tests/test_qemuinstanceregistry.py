@@ -0,0 +1,55 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Row order, name and pid indexes of the instance registry
+
+from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.qemuinstanceregistry import qemuInstanceRegistry
+
+
+def instance(name, pid=0):
+    qemu = qemuInstance()
+    qemu.name = name
+    qemu.pid = pid
+    return qemu
+
+
+def test_no_instance_limit_and_unique_names():
+    registry = qemuInstanceRegistry()
+    for i in range(100):
+        assert registry.add(instance(f"node-{i}")) == i
+    assert registry.add(instance("node-5")) == -1
+    assert len(registry) == 100 and "node-99" in registry
+
+
+def test_removal_moves_the_rows_below_up():
+    registry = qemuInstanceRegistry()
+    for name in ("a", "b", "c", "d"):
+        registry.add(instance(name))
+    assert registry.remove("b") == 1
+    assert [q.name for q in registry] == ["a", "c", "d"]
+    assert [registry.rowOf(name) for name in ("a", "b", "c", "d")] == [0, -1, 1, 2]
+    assert registry[1].name == "c" and registry.find("b") is None
+    assert registry.remove("b") == -1
+
+
+def test_pid_index_follows_process_starts_and_exits():
+    registry = qemuInstanceRegistry()
+    qemu = instance("node", pid=100)
+    registry.add(qemu)
+    assert registry.findPid(100) is qemu
+    qemu.pid = 200  # Relaunched
+    registry.updatePid(qemu)
+    assert registry.findPid(100) is None and registry.findPid(200) is qemu
+    qemu.pid = 0  # Exited
+    registry.updatePid(qemu)
+    assert registry.findPid(200) is None
+    qemu.pid = 300
+    registry.updatePid(qemu)
+    registry.remove("node")
+    assert registry.findPid(300) is None
+    # An instance that is not the registered one of its name does not change the index
+    registry.add(instance("node", pid=400))
+    stranger = instance("node", pid=500)
+    registry.updatePid(stranger)
+    assert registry.findPid(500) is None and registry.findPid(400).name == "node"
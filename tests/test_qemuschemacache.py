@@ -0,0 +1,54 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Bounded LRU of property schemas
+
+from conftest import waitUntil
+from afrl_gui.qemuschemacache import qemuSchemaCache
+
+
+class fakeSettings:
+    ''' Stands in for a settingsWidget subclass, counts the schema queries '''
+    paramStr = "-device"
+    queries = []
+
+    @classmethod
+    def querySettings(cls, cache, name):
+        cls.queries.append(name)
+        return None if name == "missing" else [f"{name} settings"]
+
+
+def test_schemas_are_loaded_once(qapp):
+    fakeSettings.queries = []
+    schemas = qemuSchemaCache(None, maxSize=4)
+    assert schemas.settings(fakeSettings, "e1000") == ["e1000 settings"]
+    assert schemas.settings(fakeSettings, "e1000") == ["e1000 settings"]
+    assert fakeSettings.queries == ["e1000"]
+
+
+def test_least_recently_used_schema_is_evicted(qapp):
+    fakeSettings.queries = []
+    schemas = qemuSchemaCache(None, maxSize=2)
+    schemas.settings(fakeSettings, "a")
+    schemas.settings(fakeSettings, "b")
+    schemas.settings(fakeSettings, "a")  # b is now the least recently used
+    schemas.settings(fakeSettings, "c")
+    assert len(schemas) == 2
+    assert ("-device", "a") in schemas and ("-device", "b") not in schemas
+
+
+def test_failed_loads_are_retried(qapp):
+    fakeSettings.queries = []
+    schemas = qemuSchemaCache(None)
+    assert schemas.settings(fakeSettings, "missing") is None
+    assert schemas.settings(fakeSettings, "missing") is None
+    assert fakeSettings.queries == ["missing", "missing"] and len(schemas) == 0
+
+
+def test_prefetch_loads_in_the_background(qapp):
+    fakeSettings.queries = []
+    schemas = qemuSchemaCache(None, maxSize=3)
+    schemas.prefetch(fakeSettings, ["a", "b", "c", "d"])  # Only maxSize names are queued
+    assert waitUntil(qapp, lambda: len(schemas) == 3)
+    schemas.stopPrefetch()
+    assert sorted(fakeSettings.queries) == ["a", "b", "c"]
@@ -0,0 +1,67 @@
+# Copyright (C) 2009 - 2022 National Aeronautics and Space Administration. All Foreign Rights are Reserved to the U.S. Government.
+# This Python file uses the following encoding: utf-8
+
+# Save and restore round trip against the fake QEMU in benchmarks/fakeqemu.py
+
+import os
+import pytest
+from conftest import FAKE_QEMU, waitUntil
+from afrl_gui.qemuinstance import qemuInstance
+from afrl_gui.qemusupervisor import qemuSupervisor, STATUS_STARTING, STATUS_RUNNING, STATUS_STOPPED
+from afrl_gui.qemuqmpclient import qemuQmpPool
+from afrl_gui.qemusnapshotstore import qemuSnapshotStore
+
+
+@pytest.fixture
+def launcher(qapp, tmp_path):
+    qmpPool = qemuQmpPool()
+    snapshots = qemuSnapshotStore(qmpPool, snapshotRoot=str(tmp_path / "snapshots"), binary=FAKE_QEMU)
+    supervisor = qemuSupervisor(binary=FAKE_QEMU, runtimeRoot=str(tmp_path / "run"), snapshots=snapshots,
+                                configRoot=str(tmp_path / "configs"))
+    supervisor.statusChanged.connect(qmpPool.updateInstance)
+    supervisor.statusChanged.connect(snapshots.updateInstance)
+    yield (supervisor, qmpPool, snapshots)
+    supervisor.stopAll()
+    waitUntil(qapp, lambda: len(supervisor) == 0)
+
+
+def test_restored_instance_runs(qapp, launcher):
+    (supervisor, qmpPool, snapshots) = launcher
+    qemu = qemuInstance()
+    qemu.name = "restore"
+    assert supervisor.launch(qemu)
+    assert waitUntil(qapp, lambda: qemu.runState == "running")
+
+    saved = []
+    snapshots.saved.connect(lambda instance, coldBoot: saved.append(instance))
+    assert snapshots.save(qemu)
+    assert waitUntil(qapp, lambda: saved)
+    assert waitUntil(qapp, lambda: qemu.runState == "running")  # Resumed once saved
+    assert snapshots.hasSnapshot(qemu)
+    supervisor.stop(qemu)
+    assert waitUntil(qapp, lambda: qemu.status == STATUS_STOPPED)
+
+    restored = []
+    snapshots.restored.connect(lambda instance, latency: restored.append(latency))
+    assert supervisor.launch(qemu)
+    assert qemu.incoming.startswith("file:")
+    assert waitUntil(qapp, lambda: restored)
+    assert qemu.runState == "running"
+    assert len(snapshots.metadata(snapshots.key(qemu))["restores"]) == 1
+    assert snapshots.save(qemu)  # No longer taken for a restore in progress
+    assert waitUntil(qapp, lambda: len(saved) == 2)
+    supervisor.stop(qemu)
+    assert waitUntil(qapp, lambda: qemu.status == STATUS_STOPPED)
+
+
+def test_unloadable_state_is_discarded(qapp, launcher):
+    (supervisor, qmpPool, snapshots) = launcher
+    qemu = qemuInstance()
+    qemu.name = "corrupt"
+    key = snapshots.key(qemu)
+    os.makedirs(os.path.dirname(snapshots.statePath(key)))
+    with open(snapshots.statePath(key), 'wb') as fout:
+        fout.write(b"not a state")
+    assert supervisor.launch(qemu)
+    assert waitUntil(qapp, lambda: qemu.status not in (STATUS_STARTING, STATUS_RUNNING))
+    assert not snapshots.hasSnapshot(qemu)